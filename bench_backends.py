@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia por consulta: backend Selenium vs backend CDP.
+Sirve el stand-in local de NowGoal (fake_nowgoal.py), abre cada backend
+contra él y mide cuánto tarda extract_match_data() en cada consulta:
+- en frío: sin la caché de huellas (snapshot_cache.py), se parsean todas las filas,
+- en caliente: consultas seguidas que reutilizan las filas sin cambios.
+
+Uso:
+    python bench_backends.py --matches 200 --polls 20
+    python bench_backends.py --backends cdp --matches 1000
+"""
+
+import sys
+import time
+import logging
+import argparse
+import statistics
+import tracemalloc
+
+from fake_nowgoal import FakeNowGoal, serve
+from structured_log import ROOT_LOGGER
+
+
+def bench_backend(backend, url, polls, warm=False):
+    """
+    Mide extract_match_data() para un backend.
+
+    Args:
+        warm (bool): Conservar la caché de huellas entre consultas. Por defecto se vacía
+                     antes de cada consulta para medir la extracción completa.
+
+    Returns:
+        tuple: (tiempos por consulta en segundos, partidos encontrados, pico de memoria Python en bytes)
+    """
+    from telegram import NowGoalScraper
+
+    scraper = NowGoalScraper(headless=True, backend=backend)
+    scraper.base_url = url
+    timings = []
+    found = 0
+    # Sin los mensajes del scraper mientras se mide
+    scraper_logger = logging.getLogger(ROOT_LOGGER)
+    previous_level = scraper_logger.level
+    scraper_logger.setLevel(logging.WARNING)
+    try:
+        scraper.setup_driver()
+        scraper.navigate_to_site()
+        scraper.click_hot_button()
+        # Si quien llama ya traza la memoria (bench_extraction), solo se reinicia el pico
+        own_tracing = not tracemalloc.is_tracing()
+        if own_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        if warm:
+            scraper.extract_match_data()  # primera consulta: llena la caché
+        for _ in range(polls):
+            if not warm:
+                scraper.snapshot.reset()
+            start = time.perf_counter()
+            matches = scraper.extract_match_data()
+            timings.append(time.perf_counter() - start)
+            found = len(matches)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        if own_tracing:
+            tracemalloc.stop()
+    finally:
+        scraper.cleanup()
+        scraper_logger.setLevel(previous_level)
+    return timings, found, peak_memory
+
+
+def summarize(timings):
+    """Devuelve (media, p50, p95) en milisegundos."""
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return statistics.mean(ms), statistics.median(ms), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Selenium vs CDP sobre una página local")
+    parser.add_argument("--leagues", type=int, default=10)
+    parser.add_argument("--matches", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--backends", default="selenium,cdp")
+    args = parser.parse_args()
+
+    model = FakeNowGoal(args.leagues, args.matches)
+    server, url = serve(model)
+    print(f"🌐 Stand-in de NowGoal en {url} ({args.leagues} ligas, {args.matches} partidos)")
+    print(f"{'backend':<10} {'caché':<8} {'partidos':>8} {'media ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+
+    try:
+        for backend in args.backends.split(','):
+            for label, warm in (("frío", False), ("caliente", True)):
+                try:
+                    timings, found, _ = bench_backend(backend.strip(), url, args.polls, warm=warm)
+                except Exception as e:
+                    print(f"{backend:<10} {label:<8} ❌ {e}")
+                    continue
+                mean, p50, p95 = summarize(timings)
+                print(f"{backend:<10} {label:<8} {found:>8} {mean:>10.1f} {p50:>10.1f} {p95:>10.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Escalado de la extracción con el tamaño de la tabla.
+Para cada tamaño arranca el stand-in local de NowGoal (fake_nowgoal.py) con ese número
+de partidos y mide latencia de extract_match_data() y memoria Python (tracemalloc) de cada tamaño:
+el pico durante las consultas y lo que sigue reservado al terminar.
+
+Uso:
+    python bench_extraction.py --backend cdp --sizes 10,100,1000,10000 --polls 5
+"""
+
+import sys
+import argparse
+import tracemalloc
+
+from fake_nowgoal import FakeNowGoal, serve
+from bench_backends import bench_backend, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y memoria de la extracción según el tamaño de #mintable")
+    parser.add_argument("--backend", default="selenium", help="selenium o cdp")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Números de partidos separados por comas")
+    parser.add_argument("--matches-per-league", type=int, default=20)
+    parser.add_argument("--polls", type=int, default=5)
+    parser.add_argument("--speed", type=float, default=60.0, help="Minutos simulados por minuto real")
+    args = parser.parse_args()
+
+    print(f"📏 Escalado de la extracción ({args.backend}, {args.polls} consultas en frío por tamaño)")
+    print(f"{'partidos':>8} {'extraídos':>9} {'media ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'ms/partido':>10} {'pico py KiB':>12} {'retenida KiB':>12}")
+
+    # Un único trazado para todos los tamaños: el pico se reinicia en cada caso (bench_backend)
+    tracemalloc.start()
+    for size in (int(s) for s in args.sizes.split(',')):
+        model = FakeNowGoal(leagues=max(1, size // args.matches_per_league), matches=size, speed=args.speed)
+        server, url = serve(model)
+        memory_before = tracemalloc.get_traced_memory()[0]
+        try:
+            timings, found, peak_memory = bench_backend(args.backend, url, args.polls)
+        except Exception as e:
+            print(f"{size:>8} ❌ {e}")
+            continue
+        finally:
+            server.shutdown()
+        mean, p50, p95 = summarize(timings)
+        retained = tracemalloc.get_traced_memory()[0] - memory_before
+        print(f"{size:>8} {found:>9} {mean:>10.1f} {p50:>10.1f} {p95:>10.1f} {mean / max(1, found):>10.3f} "
+              f"{peak_memory / 1024:>12.0f} {retained / 1024:>12.0f}")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
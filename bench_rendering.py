@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Rendimiento y corrección del renderizado de alertas (rendering.py).
+- Rendimiento: mensajes de partido por segundo con el renderizado anterior (un replace() por
+  carácter reservado y campo), con las plantillas compiladas sin caché y con la caché por estado,
+  en MarkdownV2 y en HTML.
+- Ida y vuelta: cada texto difícil se escapa, se valida con las reglas de Telegram
+  (fake_telegram.py) y su texto visible debe ser exactamente el original. Lo mismo para
+  los mensajes completos de todos los partidos. Sale con código 1 si algo falla.
+
+Uso:
+    python bench_rendering.py --alerts 5000 --repeat 3
+"""
+
+import sys
+import time
+import argparse
+
+import rendering
+from bench_telegram import TRICKY_NAMES, build_matches
+from fake_telegram import check_markdown_v2, markdown_v2_text, parse_html
+
+# Textos con todos los caracteres conflictivos de ambos modos
+ROUND_TRIP_TEXTS = TRICKY_NAMES + [
+    "\\", "\\\\", "a\\_b", "*bold*", "_it_", "__u__", "||spoiler||", "~s~", "`code`", "```pre```",
+    "[link](http://x.y)", "> cita", "1+1=2", "<b>no</b>", "Tom & Jerry", "&amp;", "\"quoted\"", "a'b",
+    "😀 emoji", "línea\nnueva", "".join(chr(c) for c in range(33, 127)),
+]
+
+
+def legacy_escape(text):
+    """Escapado anterior: un replace() por carácter reservado (sin escapar la barra invertida)."""
+    if text is None:
+        return "N/A"
+    text = str(text)
+    for char in rendering.MARKDOWN_V2_RESERVED_CHARS:
+        text = text.replace(char, '\\' + char)
+    return text
+
+
+def legacy_render_match(match, language=rendering.DEFAULT_LANGUAGE):
+    """Renderizado anterior: cada campo y cada texto fijo se escapan en cada mensaje."""
+    texts = rendering.get_texts(language)
+    esc = legacy_escape
+    home_score, away_score = rendering._split_score(match.get('score'))
+    message = (
+        f"\n⚽ *{esc(match.get('home_team'))} vs {esc(match.get('away_team'))}*\n\n"
+        f"📊 *{esc(texts['match_state'])}*\n"
+        f"• {esc(texts['score'])}: {esc(f'{home_score}-{away_score}')}\n"
+        f"• {esc(texts['minute'])}: {esc(match.get('minute_actual'))}\n"
+        f"• {esc(texts['corners'])}: {esc(match.get('corners_home', '0'))} \\- {esc(match.get('corners_away', '0'))}\n\n"
+        f"🎯 *{esc(texts['analysis'])}*\n"
+        f"• {esc(match.get('filter_reason', 'N/A'))}\n\n"
+        f"📈 *{esc(texts['odds'])}*\n"
+        f"• {esc(texts['home'])}: {esc(match.get('odds_full_time_home_win', 'N/A'))}\n"
+        f"• {esc(texts['draw'])}: {esc(match.get('odds_full_time_draw', 'N/A'))}\n"
+        f"• {esc(texts['away'])}: {esc(match.get('odds_full_time_away_win', 'N/A'))}\n\n"
+        f"🟨 *{esc(texts['yellow_cards'])}* L:{esc(match.get('yellow_home', '0'))} V:{esc(match.get('yellow_away', '0'))}\n"
+        f"🟥 *{esc(texts['red_cards'])}* L:{esc(match.get('red_home', '0'))} V:{esc(match.get('red_away', '0'))}"
+    )
+    if match.get('link') and match['link'] != 'N/A':
+        message += f"\n\n🔗 [{esc(texts['details'])}]({esc(match['link'])})"
+    return message
+
+
+def measure(render, matches, repeat):
+    """Mejor tiempo de `repeat` pasadas renderizando todos los partidos."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for match in matches:
+            render(match)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def visible_text(message, parse_mode):
+    """(error de Telegram o None, texto visible) de un mensaje."""
+    if parse_mode == 'HTML':
+        return parse_html(message)
+    return check_markdown_v2(message), markdown_v2_text(message)
+
+
+def round_trip_errors(matches):
+    """Comprueba escapado y mensajes completos en ambos modos. Devuelve la lista de fallos."""
+    errors = []
+    for parse_mode in rendering.PARSE_MODES:
+        renderer = rendering.MessageRenderer(parse_mode=parse_mode)
+        for text in ROUND_TRIP_TEXTS:
+            # Dentro de una entidad, como en los mensajes reales
+            message = renderer.render_league(text)
+            error, visible = visible_text(message, parse_mode)
+            if error or visible != f"🏆 {text.upper()}":
+                errors.append(f"{parse_mode} {text!r}: {error or repr(visible)}")
+        for match in matches:
+            message = renderer.render_match(match)
+            error, visible = visible_text(message, parse_mode)
+            expected = f"{match['home_team']} vs {match['away_team']}"
+            if error or expected not in visible or match['filter_reason'] not in visible:
+                errors.append(f"{parse_mode} partido {match['home_team']!r}: {error or 'texto visible incorrecto'}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento y comprobación de ida y vuelta del renderizado")
+    parser.add_argument("--alerts", type=int, default=5000, help="Partidos a renderizar por pasada")
+    parser.add_argument("--repeat", type=int, default=3, help="Pasadas por variante (se toma la mejor)")
+    parser.add_argument("--language", default=rendering.DEFAULT_LANGUAGE, choices=sorted(rendering.TEXTS))
+    args = parser.parse_args()
+
+    matches = build_matches(args.alerts)
+    for i, match in enumerate(matches):
+        match['away_team'] = ROUND_TRIP_TEXTS[i % len(ROUND_TRIP_TEXTS)]
+
+    print(f"🖨️ Renderizado de {args.alerts} alertas ({args.language}, mejor de {args.repeat} pasadas)")
+    print(f"{'variante':<38} {'ms':>9} {'alertas/s':>12} {'x':>6}")
+    legacy_seconds = measure(lambda m: legacy_render_match(m, args.language), matches, args.repeat)
+    variants = [("anterior (replace x18, MarkdownV2)", legacy_seconds)]
+    for parse_mode in rendering.PARSE_MODES:
+        uncached = rendering.MessageRenderer(args.language, parse_mode, cache_size=0)
+        variants.append((f"compilado sin caché ({parse_mode})", measure(uncached.render_match, matches, args.repeat)))
+        cached = rendering.MessageRenderer(args.language, parse_mode, cache_size=len(matches))
+        for match in matches:
+            cached.render_match(match)
+        variants.append((f"compilado, caché llena ({parse_mode})", measure(cached.render_match, matches, args.repeat)))
+    for name, seconds in variants:
+        print(f"{name:<38} {seconds * 1000:>9.1f} {len(matches) / seconds:>12.0f} {legacy_seconds / seconds:>6.1f}")
+
+    legacy_broken = sum(1 for text in ROUND_TRIP_TEXTS
+                        if markdown_v2_text(legacy_escape(text)) != text or check_markdown_v2(legacy_escape(text)))
+    errors = round_trip_errors(matches[:len(ROUND_TRIP_TEXTS) * 2])
+    print(f"🔁 Ida y vuelta: {len(ROUND_TRIP_TEXTS)} textos y {len(ROUND_TRIP_TEXTS) * 2} partidos por modo, "
+          f"{len(errors)} fallos (escapado anterior: {legacy_broken} textos alterados)")
+    for error in errors[:10]:
+        print(f"   ❌ {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark del envío de alertas contra la Bot API simulada (fake_telegram.py).
+Mide el rendimiento de envío y edición, los reintentos por 429 y los errores de
+escapado (MarkdownV2 o HTML) que produce el renderizado de mensajes.
+
+Uso:
+    python bench_telegram.py --chats 5 --matches 40 --latency 50
+    python bench_telegram.py --parse-mode HTML
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+from dispatcher import Destination, TelegramDispatcher
+from fake_telegram import FakeTelegramAPI, RateLimiter, serve
+from live_alerts import LiveAlertStore
+from structured_log import ROOT_LOGGER
+
+# Nombres con caracteres que deben escaparse en MarkdownV2
+TRICKY_NAMES = [
+    "Brighton & Hove Albion", "St. Pauli", "Paris S-G", "Inter (ITA)", "Team_With_Underscores",
+    "A*B United", "Club [Reserves]", "Real Madrid!", "Union #1", "FC Köln", "Back\\Slash FC",
+    "Plus+Minus", "Equal=Team", "Pipe|Team", "Brace{d}", "Tilde~Town", "Back`tick", "Greater>Less",
+]
+
+
+def build_matches(count):
+    """Partidos sintéticos ya filtrados, con nombres difíciles de escapar."""
+    matches = []
+    for i in range(count):
+        matches.append({
+            'league': f"LEAGUE {i // 10}",
+            'home_team': TRICKY_NAMES[i % len(TRICKY_NAMES)],
+            'away_team': f"Away-{i}.",
+            'score': '0 - 1',
+            'minute_actual': str(30 + i % 30),
+            'corners_home': str(4 + i % 5),
+            'corners_away': '2',
+            'yellow_home': '1', 'yellow_away': '0', 'red_home': '0', 'red_away': '0',
+            'odds_full_time_home_win': '2.10', 'odds_full_time_draw': '3.25', 'odds_full_time_away_win': '3.80',
+            'filter_reason': f"Local pierde por 1 gol(s) (0-1) con {4 + i % 5} córners (+{2 + i % 5} diferencia)",
+            'link': f"https://www.nowgoal.com/match/live-{i}",
+            'match_hash': f"bench{i}",
+        })
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento de envío contra la Bot API simulada")
+    parser.add_argument("--chats", type=int, default=3)
+    parser.add_argument("--matches", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=30, help="Latencia de la API simulada en ms")
+    parser.add_argument("--per-chat", type=int, default=1, help="Límite de la API por chat y segundo")
+    parser.add_argument("--rate", type=float, default=1.0, help="Mensajes/s que se permite el emisor por chat")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--parse-mode", default="MarkdownV2", choices=["MarkdownV2", "HTML"])
+    args = parser.parse_args()
+
+    api = FakeTelegramAPI(latency_ms=args.latency, rate_limiter=RateLimiter(per_chat_per_second=args.per_chat))
+    server, url = serve(api)
+    destinations = [Destination(f"-100{i}", name=f"chat{i}", rate_per_second=args.rate, burst=args.burst,
+                                parse_mode=args.parse_mode)
+                    for i in range(args.chats)]
+    live_store = LiveAlertStore(os.path.join(tempfile.mkdtemp(), "live_messages.json"), edit_interval=0)
+    dispatcher = TelegramDispatcher("bench-token", destinations, api_base=url, live_store=live_store)
+    matches = build_matches(args.matches)
+
+    print(f"🤖 Bot API simulada en {url} ({args.chats} chats, {args.matches} partidos, {args.latency:.0f} ms)")
+    # Sin los mensajes de envío del despachador mientras se mide
+    scraper_logger = logging.getLogger(ROOT_LOGGER)
+    previous_level = scraper_logger.level
+    scraper_logger.setLevel(logging.WARNING)
+    try:
+        start = time.perf_counter()
+        dispatcher.dispatch(matches, 30, 60, 4)
+        send_seconds = time.perf_counter() - start
+
+        for match in matches:
+            match['corners_home'] = str(int(match['corners_home']) + 1)
+        start = time.perf_counter()
+        dispatcher.update_live(matches)
+        edit_seconds = time.perf_counter() - start
+
+        stats = api.snapshot_stats()
+        totals = stats['totals']
+        sent, edited = totals.get('sent', 0), totals.get('edited', 0)
+        print(f"📤 Envío:   {sent} mensajes en {send_seconds:.2f}s ({sent / send_seconds:.1f} msg/s)")
+        print(f"✏️ Edición: {edited} mensajes en {edit_seconds:.2f}s ({edited / max(edit_seconds, 1e-9):.1f} msg/s)")
+        print(f"⏳ Respuestas 429: {totals.get('rate_limited', 0)} "
+              f"(reintentos del emisor: {sum(d.rate_limited for d in destinations)})")
+        print(f"❌ Errores de escapado {args.parse_mode}: {totals.get('parse_errors', 0)}")
+        seen = set()
+        for error in stats['parse_errors']:
+            if error['error'] not in seen:
+                seen.add(error['error'])
+                print(f"   - {error['error']}")
+    finally:
+        scraper_logger.setLevel(previous_level)
+        dispatcher.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
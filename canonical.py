@@ -0,0 +1,247 @@
+"""
+Índice canónico de equipos y ligas para las claves anti-duplicados.
+- Normaliza nombres (acentos, sufijos "(N)", puntuación, abreviaturas) con caché LRU.
+- Aplica una tabla de alias persistente (team_aliases.json) editable a mano.
+- Asigna a cada partido un ID entero estable (match_ids.json).
+En la ruta caliente, una clave ya vista se resuelve desde una caché LRU acotada.
+match_ids.json solo se reescribe al asignar IDs nuevos o, para las fechas de último uso,
+cada SAVE_INTERVAL segundos y al cerrar.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from functools import lru_cache
+
+from state_files import FileLock, atomic_write_json, merge_timestamps, update_json
+from structured_log import get_logger
+
+log = get_logger("state")
+
+ALIASES_FILE = "team_aliases.json"
+MATCH_IDS_FILE = "match_ids.json"
+# Segundos entre guardados de match_ids.json cuando solo cambiaron las fechas de último uso
+SAVE_INTERVAL = 300
+# Entradas (local, visitante, liga) resueltas que se conservan en la caché de la ruta caliente
+ENTRY_CACHE_SIZE = 16384
+
+# Sufijos entre paréntesis que NowGoal añade a los equipos: (N) campo neutral, (W) femenino...
+_SUFFIX_RE = re.compile(r'\s*\((?:n|w|r|u\d{2})\)\s*$', re.IGNORECASE)
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_SPACES_RE = re.compile(r'\s+')
+# Normalización anterior al índice canónico (solo para reconocer el historial antiguo)
+_LEGACY_STRIP_RE = re.compile(r'[^\w\s]')
+
+# Abreviaturas equivalentes
+_TOKEN_REPLACEMENTS = {
+    'utd': 'united',
+    'st': 'saint',
+    'ste': 'sainte',
+    'intl': 'international',
+    'int': 'international',
+    'dep': 'deportivo',
+    'atl': 'atletico',
+    'res': 'reserves',
+}
+
+# Prefijos/sufijos de club que unas vistas muestran y otras no
+_NOISE_TOKENS = {'fc', 'cf', 'afc', 'sc', 'fk', 'cd', 'ca', 'the'}
+
+
+@lru_cache(maxsize=16384)
+def normalize_name(name):
+    """
+    Normaliza un nombre de equipo o liga:
+    "Atlético Madrid (N)" -> "atletico madrid", "Man Utd FC" -> "man united".
+    """
+    if not name:
+        return ''
+    text = _SUFFIX_RE.sub('', name.strip())
+    # Quitar acentos
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _NON_WORD_RE.sub(' ', text.lower())
+
+    tokens = [_TOKEN_REPLACEMENTS.get(t, t) for t in text.split()]
+    significant = [t for t in tokens if t not in _NOISE_TOKENS]
+    # Si el nombre solo tenía "ruido" (p. ej. "FC"), conservarlo tal cual
+    return ' '.join(significant or tokens)
+
+
+def legacy_match_hash(match):
+    """
+    Hash anti-duplicados anterior al índice canónico (nombres sin puntuación, en minúsculas).
+    sent_matches.json puede conservar hashes de este tipo durante una ventana anti-duplicados
+    después de actualizar; se consultan para no reenviar esos partidos.
+    """
+    parts = (_LEGACY_STRIP_RE.sub('', match.get(field, '').strip()).lower().strip()
+             for field in ('home_team', 'away_team', 'league'))
+    return hashlib.md5("_".join(parts).encode()).hexdigest()
+
+
+class CanonicalIndex:
+    """Resuelve partidos a claves canónicas, hashes anti-duplicados e IDs enteros estables."""
+
+    def __init__(self, aliases_file=ALIASES_FILE, ids_file=MATCH_IDS_FILE, max_age_days=7,
+                 save_interval=SAVE_INTERVAL, entry_cache_size=ENTRY_CACHE_SIZE):
+        """
+        Args:
+            aliases_file (str): Tabla de alias {"teams": {alias: canónico}, "leagues": {...}}.
+            ids_file (str): Archivo con los IDs enteros asignados a cada partido.
+            max_age_days (int): Días sin ver un partido antes de olvidar su ID.
+            save_interval (float): Segundos entre guardados si no se asignaron IDs nuevos.
+            entry_cache_size (int): Tamaño de la caché LRU de partidos ya resueltos.
+        """
+        self.aliases_file = aliases_file
+        self.ids_file = ids_file
+        self.max_age_days = max_age_days
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+        self.dirty = False   # IDs nuevos sin guardar
+        self.recent = set()  # Claves vistas desde el último guardado (su last_seen se actualiza al guardar)
+        self.last_saved = time.monotonic()
+
+        aliases = self._load_json(aliases_file, {})
+        self.team_aliases = {normalize_name(k): normalize_name(v) for k, v in aliases.get('teams', {}).items()}
+        self.league_aliases = {normalize_name(k): normalize_name(v) for k, v in aliases.get('leagues', {}).items()}
+
+        ids = self._load_json(ids_file, {})
+        self.match_ids = ids.get('ids', {})
+        self.last_seen = ids.get('last_seen', {})
+        self.next_id = ids.get('next_id', max(self.match_ids.values(), default=0) + 1)
+
+        # Caché LRU de la ruta caliente: (local, visitante, liga) tal como vienen de la web -> entrada resuelta
+        self._cached_entry = lru_cache(maxsize=entry_cache_size)(self._resolve_names)
+
+    @staticmethod
+    def _load_json(filename, default):
+        try:
+            if os.path.exists(filename):
+                with open(filename, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            log.warning("⚠️ Error al cargar %s: %s", filename, e)
+        return default
+
+    def canonical_team(self, name):
+        normalized = normalize_name(name)
+        return self.team_aliases.get(normalized, normalized)
+
+    def canonical_league(self, name):
+        normalized = normalize_name(name)
+        return self.league_aliases.get(normalized, normalized)
+
+    def _resolve(self, match):
+        """Devuelve (clave canónica, hash, id) de un partido, usando la caché si ya se vio."""
+        entry = self._cached_entry(match.get('home_team', ''), match.get('away_team', ''), match.get('league', ''))
+        self.recent.add(entry[0])
+        return entry
+
+    def _resolve_names(self, home_team, away_team, league):
+        """Resuelve un partido no cacheado, asignándole un ID si es nuevo."""
+        match_key = "_".join((
+            self.canonical_team(home_team),
+            self.canonical_team(away_team),
+            self.canonical_league(league),
+        ))
+        with self.lock:
+            match_id = self.match_ids.get(match_key)
+            if match_id is None:
+                match_id = self.next_id
+                self.match_ids[match_key] = match_id
+                self.next_id += 1
+                self.dirty = True
+            self.last_seen[match_key] = time.time()
+        return match_key, hashlib.md5(match_key.encode()).hexdigest(), match_id
+
+    def match_key(self, match):
+        """Clave canónica legible "local_visitante_liga"."""
+        return self._resolve(match)[0]
+
+    def match_hash(self, match):
+        """Hash MD5 de la clave canónica (clave del historial sent_matches.json)."""
+        return self._resolve(match)[1]
+
+    def match_id(self, match):
+        """ID entero estable del partido."""
+        return self._resolve(match)[2]
+
+    def add_alias(self, alias, canonical, kind='team'):
+        """Registra un alias (p. ej. "Man Utd" -> "Manchester United") y lo guarda en disco."""
+        table = self.team_aliases if kind == 'team' else self.league_aliases
+        table[normalize_name(alias)] = normalize_name(canonical)
+        # Las entradas ya resueltas pueden depender del alias nuevo
+        self._cached_entry.cache_clear()
+        try:
+            with FileLock(self.aliases_file):
+                atomic_write_json(self.aliases_file, {'teams': self.team_aliases, 'leagues': self.league_aliases})
+        except Exception as e:
+            log.error("❌ Error al guardar tabla de alias: %s", e)
+
+    def save(self, force=False):
+        """
+        Guarda los IDs de partidos, olvidando los que no se ven desde hace max_age_days.
+        Se combina con match_ids.json bajo bloqueo: si otra ejecución ya asignó un ID a
+        la misma clave gana el de disco, y un ID repetido para otra clave se reasigna.
+        Sin IDs nuevos solo se escribe cada save_interval segundos, o con force=True
+        (al cerrar), y nunca si no se resolvió ningún partido desde el último guardado.
+
+        Args:
+            force (bool): Guardar aunque no haya pasado save_interval.
+        """
+        with self.lock:
+            if not self.dirty:
+                if not self.recent:
+                    return
+                if not force and time.monotonic() - self.last_saved < self.save_interval:
+                    return
+            self.dirty = False
+            self.last_saved = time.monotonic()
+            # Partidos vistos desde el último guardado, también los resueltos desde la caché
+            now = time.time()
+            recent, self.recent = self.recent, set()
+            for match_key in recent:
+                self.last_seen[match_key] = now
+        cutoff_time = now - self.max_age_days * 86400
+        with self.lock:
+            our_ids = dict(self.match_ids)
+            our_last_seen = dict(self.last_seen)
+            our_next_id = self.next_id
+
+        def merge(current):
+            ids = dict(current.get('ids', {}))
+            last_seen = merge_timestamps(current.get('last_seen', {}), our_last_seen)
+            next_id = max(current.get('next_id', 1), our_next_id)
+            used = set(ids.values())
+            for match_key, match_id in our_ids.items():
+                if match_key in ids:
+                    continue
+                if match_id in used:
+                    match_id = next_id
+                    next_id += 1
+                ids[match_key] = match_id
+                used.add(match_id)
+            for match_key in [k for k, t in last_seen.items() if t < cutoff_time]:
+                last_seen.pop(match_key, None)
+                ids.pop(match_key, None)
+            return {'next_id': next_id, 'ids': ids, 'last_seen': last_seen}
+
+        try:
+            data = update_json(self.ids_file, merge, indent=None)
+        except Exception as e:
+            log.error("❌ Error al guardar IDs de partidos: %s", e)
+            with self.lock:
+                self.dirty = True
+                self.recent |= recent
+            return
+        with self.lock:
+            self.match_ids = data['ids']
+            self.last_seen = data['last_seen']
+            self.next_id = data['next_id']
+        # Alguna entrada de la caché expiró o cambió de ID al combinar: volver a resolver
+        if any(data['ids'].get(match_key) != match_id for match_key, match_id in our_ids.items()):
+            self._cached_entry.cache_clear()
@@ -0,0 +1,448 @@
+"""
+Backend alternativo para NowGoalScraper que habla directamente con Chrome headless
+a través del websocket de Chrome DevTools Protocol (CDP), sin la capa HTTP de WebDriver.
+- La tabla completa se extrae con un único Runtime.evaluate (una ida y vuelta por consulta).
+- Los cambios de #mintable se reciben como eventos (MutationObserver + Runtime.addBinding)
+  en lugar de consultar la página periódicamente.
+- DOMSnapshot.captureSnapshot se usa para guardar una instantánea del DOM cuando la
+  extracción falla, útil para diagnosticar cambios de estructura del sitio.
+Requiere el paquete opcional `websocket-client`.
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from collections import defaultdict
+
+try:
+    import websocket
+except ImportError:  # Dependencia opcional: solo necesaria con SCRAPER_BACKEND=cdp
+    websocket = None
+
+from match_parsing import build_match_info
+from snapshot_cache import FINGERPRINT_FN_JS, row_key, table_fingerprint
+from structured_log import get_logger
+
+log = get_logger("browser")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+
+CHROME_CANDIDATES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"]
+
+# Nombre de la función que Chrome expone a la página para notificar cambios de la tabla
+TABLE_CHANGED_BINDING = "__nowgoalTableChanged"
+
+# Extrae todas las filas de #mintable en el navegador y devuelve los textos crudos.
+# Replica los selectores de NowGoalScraper.parse_match_row_with_css.
+# Cada fila lleva su huella (fp); si __FULL__ es false, las filas cuya huella ya se
+# envió en la consulta anterior se devuelven solo como {fp} (sin parsear ni serializar).
+EXTRACT_MATCHES_JS = r"""
+((full) => {
+""" + FINGERPRINT_FN_JS + r"""
+    const table = document.getElementById('mintable');
+    if (!table) return null;
+    const previous = full ? new Set() : (window.__nowgoalRowFps || new Set());
+    const fingerprints = [];
+    const text = (root, selector) => {
+        const el = root.querySelector(selector);
+        return el ? el.innerText : null;
+    };
+    const rows = [];
+    for (const row of table.getElementsByTagName('tr')) {
+        const cls = row.className || '';
+        if (cls.includes('Leaguestitle')) {
+            const name = row.querySelector('.LGname');
+            if (name) rows.push({league: name.innerText.trim()});
+            continue;
+        }
+        if (!cls.includes('tds')) continue;
+        const fp = __nowgoalHash(row.outerHTML);
+        fingerprints.push(fp);
+        if (previous.has(fp)) {
+            rows.push({fp: fp});
+            continue;
+        }
+        const timeEl = row.querySelector('td[name="timeData"]');
+        const home = row.querySelector('td[id^="ht_"] > a[id^="team1_"]');
+        const oddsTd = row.querySelector('td.oddstd');
+        rows.push({
+            fp: fp,
+            time: timeEl ? (timeEl.getAttribute('data-t') || timeEl.innerText.trim()) : null,
+            home_team: home ? home.innerText : null,
+            link: home ? home.href : null,
+            away_team: text(row, 'td[id^="gt_"] > a[id^="team2_"]'),
+            score: text(row, 'td.f-b b'),
+            status: text(row, 'td.status'),
+            half_time_score: text(row, 'span[id^="hht_"]'),
+            corners: text(row, 'span[id^="cr_"]'),
+            yellow_home: text(row, 'td[id^="ht_"] span.yellowcard'),
+            yellow_away: text(row, 'td[id^="gt_"] span.yellowcard'),
+            red_home: text(row, 'td[id^="ht_"] span.redcard'),
+            red_away: text(row, 'td[id^="gt_"] span.redcard'),
+            odds: oddsTd ? Array.from(oddsTd.querySelectorAll('p.odds1'), p => p.innerText) : [],
+        });
+    }
+    window.__nowgoalRowFps = new Set(fingerprints);
+    return rows;
+})(__FULL__)
+"""
+
+# Busca el botón Hot/Live con los mismos selectores alternativos que el backend Selenium y hace clic
+CLICK_LIVE_JS = r"""
+(() => {
+    let button = document.getElementById('li_FilterLive')
+        || document.querySelector("li[onclick*='FilterByOption(2)']");
+    if (!button) {
+        for (const span of document.querySelectorAll('li span')) {
+            if (span.textContent === 'Live') { button = span.closest('li'); break; }
+        }
+    }
+    if (!button) return false;
+    button.scrollIntoView(true);
+    button.click();
+    return true;
+})()
+"""
+
+# Instala (una sola vez) un MutationObserver sobre #mintable que avisa a Python por el binding
+WATCH_TABLE_JS = r"""
+(() => {
+    const table = document.getElementById('mintable');
+    if (!table) return false;
+    if (window.__nowgoalObserver && window.__nowgoalObservedTable === table) return true;
+    if (window.__nowgoalObserver) window.__nowgoalObserver.disconnect();
+    let scheduled = false;
+    window.__nowgoalObserver = new MutationObserver(() => {
+        if (scheduled) return;
+        scheduled = true;
+        // Agrupar las mutaciones de un mismo ciclo en un solo evento
+        setTimeout(() => { scheduled = false; window.%s('changed'); }, 0);
+    });
+    window.__nowgoalObserver.observe(table, {subtree: true, childList: true, characterData: true, attributes: true});
+    window.__nowgoalObservedTable = table;
+    return true;
+})()
+""" % TABLE_CHANGED_BINDING
+
+
+class CDPError(Exception):
+    """Error devuelto por Chrome DevTools o de la conexión con el navegador."""
+
+
+def find_chrome_binary():
+    """Devuelve la ruta de Chrome (CHROME_BIN o el primero encontrado en el PATH)."""
+    chrome_bin = os.getenv('CHROME_BIN')
+    if chrome_bin:
+        return chrome_bin
+    for candidate in CHROME_CANDIDATES:
+        path = shutil.which(candidate)
+        if path:
+            return path
+    raise CDPError("No se encontró Chrome. Define CHROME_BIN con la ruta del ejecutable")
+
+
+class CDPSession:
+    """Conexión websocket con una pestaña de Chrome: comandos con respuesta y eventos."""
+
+    def __init__(self, ws_url, timeout=30):
+        if websocket is None:
+            raise CDPError("El backend CDP requiere el paquete 'websocket-client' (pip install websocket-client)")
+        self.timeout = timeout
+        self.ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.listeners = defaultdict(list)
+        self.closed = False
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _read_loop(self):
+        """Lee mensajes del websocket y los reparte entre respuestas y eventos."""
+        while not self.closed:
+            try:
+                message = json.loads(self.ws.recv())
+            except websocket.WebSocketTimeoutException:
+                continue
+            except Exception:
+                break
+
+            if 'id' in message:
+                waiter = self.pending.pop(message['id'], None)
+                if waiter:
+                    waiter['response'] = message
+                    waiter['event'].set()
+            else:
+                for callback in list(self.listeners.get(message.get('method'), [])):
+                    try:
+                        callback(message.get('params', {}))
+                    except Exception as e:
+                        log.warning("⚠️ Error en listener CDP %s: %s", message.get('method'), e)
+
+        self.closed = True
+        # Despertar a quien esté esperando una respuesta que ya no llegará
+        for waiter in list(self.pending.values()):
+            waiter['event'].set()
+
+    def send(self, method, params=None, timeout=None):
+        """Envía un comando CDP y espera su resultado."""
+        if self.closed:
+            raise CDPError("La conexión con Chrome está cerrada")
+        with self.lock:
+            self.next_id += 1
+            message_id = self.next_id
+            waiter = {'event': threading.Event(), 'response': None}
+            self.pending[message_id] = waiter
+            self.ws.send(json.dumps({'id': message_id, 'method': method, 'params': params or {}}))
+
+        if not waiter['event'].wait(timeout or self.timeout):
+            self.pending.pop(message_id, None)
+            raise CDPError(f"Timeout esperando respuesta de {method}")
+        response = waiter['response']
+        if response is None:
+            raise CDPError(f"Conexión cerrada esperando respuesta de {method}")
+        if 'error' in response:
+            raise CDPError(f"{method}: {response['error'].get('message')}")
+        return response.get('result', {})
+
+    def on(self, event_name, callback):
+        """Registra un callback para un evento CDP (p. ej. 'Page.loadEventFired')."""
+        self.listeners[event_name].append(callback)
+
+    def close(self):
+        self.closed = True
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+class CDPBrowser:
+    """Lanza Chrome headless con el puerto de depuración remota y abre una sesión CDP."""
+
+    def __init__(self, headless=True, user_agent=USER_AGENT):
+        self.headless = headless
+        self.user_agent = user_agent
+        self.process = None
+        self.user_data_dir = None
+        self.session = None
+
+    def start(self, startup_timeout=20):
+        self.user_data_dir = tempfile.mkdtemp(prefix="nowgoal-cdp-")
+        args = [
+            find_chrome_binary(),
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self.user_data_dir}",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-blink-features=AutomationControlled",
+            "--disable-gpu",
+            "--window-size=1920,1080",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--remote-allow-origins=*",
+            f"--user-agent={self.user_agent}",
+        ]
+        if self.headless:
+            args.append("--headless=new")
+        args.append("about:blank")
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        # Chrome escribe el puerto elegido en DevToolsActivePort
+        port_file = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        deadline = time.time() + startup_timeout
+        port = None
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise CDPError(f"Chrome terminó al arrancar (código {self.process.returncode})")
+            try:
+                with open(port_file, 'r', encoding='utf-8') as f:
+                    port = int(f.readline().strip())
+                break
+            except (OSError, ValueError):
+                time.sleep(0.05)
+        if port is None:
+            raise CDPError("Timeout esperando el puerto de depuración de Chrome")
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/list", timeout=10) as response:
+            targets = json.load(response)
+        page = next((t for t in targets if t.get('type') == 'page'), None)
+        if page is None:
+            raise CDPError("Chrome no expuso ninguna pestaña")
+
+        self.session = CDPSession(page['webSocketDebuggerUrl'])
+        return self.session
+
+    def close(self):
+        if self.session:
+            self.session.close()
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class CDPScraperBackend:
+    """Operaciones de página que usa NowGoalScraper, implementadas sobre CDP."""
+
+    def __init__(self, headless=True):
+        self.browser = CDPBrowser(headless=headless)
+        self.session = None
+        self.load_event = threading.Event()
+        self.table_changed = threading.Event()
+
+    def start(self):
+        self.session = self.browser.start()
+        self.session.on('Page.loadEventFired', lambda params: self.load_event.set())
+        self.session.on('Runtime.bindingCalled', self._on_binding_called)
+        self.session.send('Page.enable')
+        self.session.send('Runtime.enable')
+        self.session.send('Runtime.addBinding', {'name': TABLE_CHANGED_BINDING})
+        self.session.send('Page.addScriptToEvaluateOnNewDocument', {
+            'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+        })
+
+    def _on_binding_called(self, params):
+        if params.get('name') == TABLE_CHANGED_BINDING:
+            self.table_changed.set()
+
+    def evaluate(self, expression, timeout=None):
+        """Evalúa una expresión JavaScript en la página y devuelve su valor."""
+        result = self.session.send('Runtime.evaluate', {
+            'expression': expression,
+            'returnByValue': True,
+            'awaitPromise': True,
+        }, timeout=timeout)
+        if 'exceptionDetails' in result:
+            raise CDPError(f"Error JavaScript: {result['exceptionDetails'].get('text')}")
+        return result.get('result', {}).get('value')
+
+    def navigate(self, url, timeout=15):
+        """Navega a la URL y espera al evento load."""
+        self.load_event.clear()
+        result = self.session.send('Page.navigate', {'url': url})
+        if result.get('errorText'):
+            raise CDPError(f"Error al navegar: {result['errorText']}")
+        if not self.load_event.wait(timeout):
+            raise CDPError("Timeout al cargar la página")
+
+    def wait_for(self, expression, timeout=15, interval=0.1):
+        """Espera hasta que la expresión JavaScript sea verdadera."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.evaluate(expression):
+                return True
+            time.sleep(interval)
+        return False
+
+    def click_live(self, timeout=15):
+        """Hace clic en el botón Hot/Live. Devuelve False si no aparece."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.evaluate(CLICK_LIVE_JS):
+                return True
+            time.sleep(0.2)
+        return False
+
+    def extract_matches(self, cache=None, league_filter=None, league_counts=None):
+        """
+        Extrae todos los partidos de #mintable con una sola llamada Runtime.evaluate.
+
+        Args:
+            cache (SnapshotCache): Si se indica, las filas sin cambios se toman de la caché
+                                   y cache.unchanged indica si la tabla entera no cambió.
+            league_filter (callable): Si se indica, solo se construyen los partidos de las ligas
+                                      para las que devuelve True.
+            league_counts (dict): Si se indica, se rellena con las filas de partido por liga.
+
+        Returns:
+            list | None: Partidos con el mismo formato que el backend Selenium,
+                         o None si la tabla no existe.
+        """
+        incremental = cache is not None and bool(cache.rows)
+        rows = self.evaluate(EXTRACT_MATCHES_JS.replace('__FULL__', 'false' if incremental else 'true'))
+        if rows is None:
+            return None
+        if incremental and self._has_unknown_rows(rows, cache, league_filter):
+            # La página y la caché se desincronizaron (p. ej. recarga): pedir todas las filas
+            rows = self.evaluate(EXTRACT_MATCHES_JS.replace('__FULL__', 'true'))
+            if rows is None:
+                return None
+        if cache is not None:
+            cache.check_table(table_fingerprint([raw.get('fp') or f"L:{raw['league']}" for raw in rows]))
+
+        matches = []
+        parsed = {}
+        current_league = "Liga no especificada"
+        for raw in rows:
+            if 'league' in raw:
+                current_league = raw['league']
+                continue
+            if league_counts is not None:
+                league_counts[current_league] = league_counts.get(current_league, 0) + 1
+            if league_filter and not league_filter(current_league):
+                continue
+            fp = raw.get('fp')
+            key = row_key(current_league, fp)
+            if cache is not None and 'home_team' not in raw:
+                _, match_info = cache.lookup_row(key)
+            else:
+                if cache is not None:
+                    cache.stats['row_misses'] += 1
+                match_info = build_match_info(raw, current_league)
+                if match_info and fp:
+                    match_info['row_key'] = key
+            parsed[key] = match_info
+            if match_info:
+                matches.append(match_info)
+        if cache is not None:
+            cache.store_rows(parsed)
+        return matches
+
+    @staticmethod
+    def _has_unknown_rows(rows, cache, league_filter=None):
+        """True si la página omitió filas (solo huella) que la caché no tiene y que hacen falta."""
+        current_league = "Liga no especificada"
+        for raw in rows:
+            if 'league' in raw:
+                current_league = raw['league']
+            elif league_filter and not league_filter(current_league):
+                continue
+            elif 'home_team' not in raw and row_key(current_league, raw.get('fp')) not in cache.rows:
+                return True
+        return False
+
+    def watch_table(self):
+        """Activa la notificación de cambios de #mintable. Devuelve False si la tabla no existe."""
+        return bool(self.evaluate(WATCH_TABLE_JS))
+
+    def wait_for_table_change(self, timeout):
+        """
+        Espera hasta `timeout` segundos a que cambie #mintable (evento, sin sondeo).
+
+        Returns:
+            bool: True si hubo cambios, False si se agotó el tiempo.
+        """
+        self.watch_table()
+        changed = self.table_changed.wait(timeout)
+        self.table_changed.clear()
+        return changed
+
+    def capture_snapshot(self, filename):
+        """Guarda una instantánea del DOM (DOMSnapshot.captureSnapshot) para diagnóstico."""
+        snapshot = self.session.send('DOMSnapshot.captureSnapshot', {'computedStyles': []}, timeout=60)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        return filename
+
+    def close(self):
+        self.browser.close()
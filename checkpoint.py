@@ -0,0 +1,235 @@
+"""
+Checkpoint binario del estado en memoria del scraper, para arrancar en caliente.
+Cada ejecución de GitHub Actions (o un proceso reiniciado) empieza de cero salvo
+sent_matches.json; con el checkpoint continúa donde se quedó la anterior:
+- índice anti-duplicados (match_hash -> momento del envío),
+- historial de ritmo por partido (momentum.py),
+- bandeja de salida: alertas ya reclamadas en el anti-duplicados que aún no se enviaron,
+- planificador: última decisión y entradas previstas en la ventana (predictor.py).
+
+Formato (versión 1), pensado para ocupar poco y cargarse en milisegundos:
+    cabecera  ">4sHHII": "NGCK", versión, reservado, longitud y CRC32 del contenido
+    contenido zlib de secciones "etiqueta (4 bytes) + longitud (u32) + datos":
+      META  JSON {saved_at, run_id, pid}
+      DEDU  n × (md5 en 16 bytes, f64 momento del envío)
+      MOMT  por partido: clave (u16 + UTF-8), f64 visto, i16 goles, i16 minuto del último gol
+            (-1 = desconocido), u16 n, n × (u16 minuto, u16 córners local, u16 córners visitante)
+      OUTB  JSON [[momento reclamado, partido], ...]
+      SCHD  JSON del planificador
+Las secciones desconocidas se ignoran; un checkpoint de otra versión, truncado o con
+CRC incorrecto se descarta con un aviso (arranque en frío, nunca un error).
+"""
+
+import os
+import json
+import time
+import zlib
+import struct
+
+from state_files import atomic_write_bytes
+from structured_log import get_logger
+
+log = get_logger("state")
+
+CHECKPOINT_VERSION = 1
+MAGIC = b"NGCK"
+DEFAULT_CHECKPOINT_FILE = "scraper_state.ckpt"
+DEFAULT_CHECKPOINT_INTERVAL = 60
+
+_HEADER = struct.Struct(">4sHHII")
+_SECTION = struct.Struct(">4sI")
+_DEDUP_ENTRY = struct.Struct(">16sd")
+_MOMENTUM_HEAD = struct.Struct(">dhhH")
+_SAMPLE = struct.Struct(">HHH")
+_KEY_LENGTH = struct.Struct(">H")
+
+
+class CheckpointError(ValueError):
+    """El checkpoint no se puede leer (formato, versión o contenido dañado)."""
+
+
+def _encode_dedup(sent):
+    parts = []
+    for match_hash, sent_at in sent.items():
+        try:
+            digest = bytes.fromhex(match_hash)
+        except (TypeError, ValueError):
+            continue
+        if len(digest) == 16:
+            parts.append(_DEDUP_ENTRY.pack(digest, sent_at))
+    return b"".join(parts)
+
+
+def _decode_dedup(data):
+    return {digest.hex(): sent_at for digest, sent_at in _DEDUP_ENTRY.iter_unpack(data)}
+
+
+def _encode_momentum(tracks):
+    parts = []
+    for key, (samples, goals, last_goal_minute, seen_at) in tracks.items():
+        encoded_key = key.encode('utf-8')[:0xFFFF]
+        parts.append(_KEY_LENGTH.pack(len(encoded_key)))
+        parts.append(encoded_key)
+        parts.append(_MOMENTUM_HEAD.pack(seen_at, -1 if goals is None else goals,
+                                         -1 if last_goal_minute is None else last_goal_minute, len(samples)))
+        parts.extend(_SAMPLE.pack(*sample) for sample in samples)
+    return b"".join(parts)
+
+
+def _decode_momentum(data):
+    tracks = {}
+    offset = 0
+    while offset < len(data):
+        (key_length,) = _KEY_LENGTH.unpack_from(data, offset)
+        offset += _KEY_LENGTH.size
+        key = data[offset:offset + key_length].decode('utf-8')
+        offset += key_length
+        seen_at, goals, last_goal_minute, count = _MOMENTUM_HEAD.unpack_from(data, offset)
+        offset += _MOMENTUM_HEAD.size
+        end = offset + count * _SAMPLE.size
+        samples = list(_SAMPLE.iter_unpack(data[offset:end]))
+        offset = end
+        tracks[key] = (samples, None if goals < 0 else goals,
+                       None if last_goal_minute < 0 else last_goal_minute, seen_at)
+    return tracks
+
+
+def _encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# Sección -> (clave del estado, codificar, decodificar)
+_SECTIONS = {
+    b"META": ('meta', _encode_json, json.loads),
+    b"DEDU": ('dedup', _encode_dedup, _decode_dedup),
+    b"MOMT": ('momentum', _encode_momentum, _decode_momentum),
+    b"OUTB": ('outbox', _encode_json, json.loads),
+    b"SCHD": ('scheduler', _encode_json, json.loads),
+}
+
+
+def encode_checkpoint(state):
+    """
+    Serializa el estado al formato binario.
+
+    Args:
+        state (dict): Claves meta, dedup, momentum, outbox y scheduler (todas opcionales).
+
+    Returns:
+        bytes
+    """
+    body = []
+    for tag, (key, encode, _) in _SECTIONS.items():
+        if state.get(key) is None:
+            continue
+        data = encode(state[key])
+        body.append(_SECTION.pack(tag, len(data)))
+        body.append(data)
+    payload = zlib.compress(b"".join(body), 6)
+    return _HEADER.pack(MAGIC, CHECKPOINT_VERSION, 0, len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_checkpoint(data):
+    """
+    Lee un checkpoint de encode_checkpoint().
+
+    Returns:
+        dict: Estado con las secciones presentes.
+
+    Raises:
+        CheckpointError: Si el formato, la versión o el contenido no son válidos.
+    """
+    if len(data) < _HEADER.size:
+        raise CheckpointError("archivo truncado")
+    magic, version, _, length, crc = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CheckpointError("no es un checkpoint del scraper")
+    if version != CHECKPOINT_VERSION:
+        raise CheckpointError(f"versión {version} no compatible (se esperaba {CHECKPOINT_VERSION})")
+    payload = data[_HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise CheckpointError("contenido truncado o dañado")
+
+    try:
+        body = zlib.decompress(payload)
+        state = {}
+        offset = 0
+        while offset < len(body):
+            tag, size = _SECTION.unpack_from(body, offset)
+            offset += _SECTION.size
+            section = _SECTIONS.get(tag)
+            if section is not None:
+                state[section[0]] = section[2](body[offset:offset + size])
+            offset += size
+    except (zlib.error, struct.error, ValueError) as e:
+        raise CheckpointError(f"contenido no válido: {e}") from e
+    return state
+
+
+class CheckpointStore:
+    """Archivo de checkpoint con guardado periódico."""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_FILE, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        Args:
+            path (str): Archivo del checkpoint ("" o None = desactivado).
+            interval (float): Segundos mínimos entre dos guardados periódicos.
+        """
+        self.path = path or None
+        self.interval = interval
+        self.last_saved = 0.0
+        self.stats = {'saves': 0, 'bytes': 0, 'save_ms': 0.0, 'load_ms': None}
+
+    @classmethod
+    def from_env(cls):
+        """Según CHECKPOINT_FILE (vacío = desactivado) y CHECKPOINT_INTERVAL."""
+        return cls(path=os.getenv('CHECKPOINT_FILE', DEFAULT_CHECKPOINT_FILE),
+                   interval=float(os.getenv('CHECKPOINT_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL)))
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def load(self):
+        """
+        Carga el checkpoint si existe.
+
+        Returns:
+            dict | None: Estado guardado, o None si no hay checkpoint válido.
+        """
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                state = decode_checkpoint(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, CheckpointError) as e:
+            log.warning("⚠️ Checkpoint %s ignorado: %s", self.path, e)
+            return None
+        self.stats['load_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return state
+
+    def due(self, now=None):
+        """True si toca el guardado periódico."""
+        now = time.time() if now is None else now
+        return self.enabled and now - self.last_saved >= self.interval
+
+    def save(self, state):
+        """Escribe el checkpoint de forma atómica. Un error se registra y no interrumpe el scraper."""
+        if not self.enabled:
+            return False
+        started = time.perf_counter()
+        try:
+            data = encode_checkpoint(state)
+            atomic_write_bytes(self.path, data)
+        except Exception as e:
+            log.error("❌ Error al guardar el checkpoint %s: %s", self.path, e)
+            return False
+        self.last_saved = time.time()
+        self.stats['saves'] += 1
+        self.stats['bytes'] = len(data)
+        self.stats['save_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        log.debug("💾 Checkpoint guardado: %s bytes en %.1f ms", len(data), self.stats['save_ms'])
+        return True
@@ -0,0 +1,223 @@
+"""
+Configuración de reglas y envío recargable en caliente (scraper_config.json).
+- Umbrales del filtro, estrategias activas, destinos de Telegram e intervalos de consulta.
+- Se valida entera antes de aplicarla: un archivo con errores se ignora (con aviso) y
+  se sigue con la configuración anterior.
+- En modo continuo se comprueba la fecha del archivo en cada consulta; los cambios se
+  aplican sin reiniciar Chrome ni perder el estado (caché de filas, alertas en vivo, IDs).
+Sin archivo se usan MIN_MINUTE, MAX_MINUTE y MIN_CORNERS del entorno y los intervalos POLL_*.
+"""
+
+import os
+import copy
+import json
+
+import rendering
+from structured_log import get_logger
+
+log = get_logger("config")
+
+DEFAULT_CONFIG_FILE = "scraper_config.json"
+
+STRATEGIES = ("local_pierde_con_corners", "visitante_pierde_con_corners")
+
+
+class ConfigError(ValueError):
+    """El archivo de configuración no es válido (el mensaje lista todos los problemas)."""
+
+
+def default_config():
+    """Configuración por defecto, completada con las variables de entorno."""
+    return {
+        'filters': {
+            'min_minute': int(os.getenv('MIN_MINUTE', '30')),
+            'max_minute': int(os.getenv('MAX_MINUTE', '60')),
+            'min_corners': int(os.getenv('MIN_CORNERS', '4')),
+            'max_goal_deficit': 1,
+            # Ritmo reciente (momentum.py): 0 / null = criterio desactivado
+            'min_recent_corners': 0,
+            'min_corner_trend': None,
+            'min_minutes_since_goal': 0,
+        },
+        'strategies': {name: True for name in STRATEGIES},
+        # None = destinos de TELEGRAM_DESTINATIONS / telegram_destinations.json / TELEGRAM_CHAT_ID
+        'destinations': None,
+        'polling': {
+            'fast_interval': float(os.getenv('POLL_FAST_INTERVAL', '15')),
+            'base_interval': float(os.getenv('POLL_BASE_INTERVAL', '60')),
+            'heartbeat_interval': float(os.getenv('POLL_HEARTBEAT_INTERVAL', '300')),
+            'min_interval': 5.0,
+        },
+    }
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_int(errors, section, data, key, minimum=0):
+    value = data.get(key)
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        errors.append(f"{section}.{key} debe ser un entero >= {minimum} (valor: {value!r})")
+
+
+def _check_destination(errors, index, item):
+    where = f"destinations[{index}]"
+    if not isinstance(item, dict):
+        errors.append(f"{where} debe ser un objeto")
+        return
+    if not item.get('chat_id'):
+        errors.append(f"{where}.chat_id es obligatorio")
+    if item.get('language', rendering.DEFAULT_LANGUAGE) not in rendering.TEXTS:
+        errors.append(f"{where}.language debe ser uno de {sorted(rendering.TEXTS)}")
+    if item.get('parse_mode') is not None and item['parse_mode'] not in rendering.PARSE_MODES:
+        errors.append(f"{where}.parse_mode debe ser uno de {list(rendering.PARSE_MODES)}")
+    for key in ('min_minute', 'max_minute', 'min_corners', 'burst'):
+        if item.get(key) is not None and (not isinstance(item[key], int) or isinstance(item[key], bool)):
+            errors.append(f"{where}.{key} debe ser un entero")
+    if item.get('rate_per_second') is not None and not (_is_number(item['rate_per_second'])
+                                                        and item['rate_per_second'] > 0):
+        errors.append(f"{where}.rate_per_second debe ser un número > 0")
+    for key in ('leagues', 'exclude_leagues'):
+        if item.get(key) is not None and not (isinstance(item[key], list)
+                                              and all(isinstance(l, str) for l in item[key])):
+            errors.append(f"{where}.{key} debe ser una lista de nombres de liga")
+
+
+def validate_config(data):
+    """
+    Valida un archivo de configuración y lo combina con los valores por defecto.
+
+    Args:
+        data (dict): Contenido del archivo (las secciones y claves ausentes toman el valor por defecto).
+
+    Returns:
+        dict: Configuración completa.
+
+    Raises:
+        ConfigError: Con la lista de todos los errores encontrados.
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("la configuración debe ser un objeto JSON")
+    config = default_config()
+    errors = []
+
+    unknown = set(data) - set(config)
+    if unknown:
+        errors.append(f"secciones desconocidas: {', '.join(sorted(unknown))}")
+
+    for section in ('filters', 'strategies', 'polling'):
+        values = data.get(section, {})
+        if not isinstance(values, dict):
+            errors.append(f"{section} debe ser un objeto")
+            continue
+        unknown = set(values) - set(config[section])
+        if unknown:
+            errors.append(f"{section}: claves desconocidas: {', '.join(sorted(unknown))}")
+        config[section].update({k: v for k, v in values.items() if k in config[section]})
+
+    filters = config['filters']
+    for key in ('min_minute', 'max_minute', 'min_corners'):
+        _check_int(errors, 'filters', filters, key)
+    _check_int(errors, 'filters', filters, 'max_goal_deficit', minimum=1)
+    _check_int(errors, 'filters', filters, 'min_minutes_since_goal')
+    if not _is_number(filters['min_recent_corners']) or filters['min_recent_corners'] < 0:
+        errors.append(f"filters.min_recent_corners debe ser un número >= 0 (valor: {filters['min_recent_corners']!r})")
+    if filters['min_corner_trend'] is not None and not _is_number(filters['min_corner_trend']):
+        errors.append(f"filters.min_corner_trend debe ser un número o null (valor: {filters['min_corner_trend']!r})")
+    if not errors and filters['min_minute'] > filters['max_minute']:
+        errors.append("filters.min_minute no puede ser mayor que filters.max_minute")
+
+    strategies = config['strategies']
+    if any(not isinstance(enabled, bool) for enabled in strategies.values()):
+        errors.append("strategies: cada estrategia debe ser true o false")
+    elif not any(strategies.values()):
+        errors.append("strategies: debe haber al menos una estrategia activa")
+
+    polling = config['polling']
+    for key, value in polling.items():
+        if not _is_number(value) or value < 0 or (value == 0 and key != 'min_interval'):
+            errors.append(f"polling.{key} debe ser un número positivo (valor: {value!r})")
+    if not errors and not polling['fast_interval'] <= polling['base_interval'] <= polling['heartbeat_interval']:
+        errors.append("polling: debe cumplirse fast_interval <= base_interval <= heartbeat_interval")
+
+    destinations = data.get('destinations')
+    if destinations is not None:
+        if not isinstance(destinations, list) or not destinations:
+            errors.append("destinations debe ser una lista no vacía (o no definirse)")
+        else:
+            for index, item in enumerate(destinations):
+                _check_destination(errors, index, item)
+            config['destinations'] = destinations
+
+    if errors:
+        raise ConfigError("; ".join(errors))
+    return config
+
+
+def load_config(path=None):
+    """
+    Carga y valida el archivo de configuración. Sin archivo devuelve la configuración por defecto.
+
+    Raises:
+        ConfigError: Si el archivo existe pero no es válido.
+    """
+    path = path or os.getenv('SCRAPER_CONFIG', DEFAULT_CONFIG_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return default_config()
+    except ValueError as e:
+        raise ConfigError(f"JSON no válido: {e}") from e
+    return validate_config(data)
+
+
+class ConfigWatcher:
+    """Vigila el archivo de configuración y devuelve la nueva versión cuando cambia y es válida."""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Archivo a vigilar. Por defecto SCRAPER_CONFIG o scraper_config.json.
+        """
+        self.path = path or os.getenv('SCRAPER_CONFIG', DEFAULT_CONFIG_FILE)
+        self.signature = self._signature()
+        try:
+            self.config = load_config(self.path)
+        except ConfigError as e:
+            log.warning("⚠️ %s no es válido, se usan los valores por defecto: %s", self.path, e)
+            self.config = default_config()
+        self.reloads = 0
+        self.rejected = 0
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self):
+        """
+        Comprueba si el archivo cambió (un os.stat por llamada).
+
+        Returns:
+            dict | None: La configuración nueva si cambió y es válida; None en otro caso.
+        """
+        signature = self._signature()
+        if signature == self.signature:
+            return None
+        self.signature = signature
+        try:
+            config = load_config(self.path)
+        except (ConfigError, OSError) as e:
+            self.rejected += 1
+            log.error("❌ Configuración %s rechazada, se mantiene la anterior: %s", self.path, e)
+            return None
+        if config == self.config:
+            return None
+        self.config = config
+        self.reloads += 1
+        log.info("🔄 Configuración recargada desde %s", self.path)
+        return copy.deepcopy(config)
@@ -0,0 +1,445 @@
+"""
+Despachador de alertas de Telegram a múltiples chats (canales y grupos).
+- Cada mensaje se renderiza una sola vez por idioma y modo de formato (MarkdownV2 o HTML).
+- Los envíos a los distintos destinos se hacen en paralelo.
+- Cada chat tiene su propio limitador de velocidad y su propio aislamiento de fallos:
+  un chat bloqueado o lento no retrasa a los demás.
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import rendering
+from live_alerts import match_state
+from structured_log import get_logger
+
+log = get_logger("telegram")
+
+TELEGRAM_API_BASE = "https://api.telegram.org"
+DESTINATIONS_FILE = "telegram_destinations.json"
+
+# Errores de la API que indican que el chat ya no es alcanzable (bot expulsado, chat inexistente...)
+FATAL_STATUS_CODES = (401, 403, 404)
+
+# Respuestas 400 de editMessageText que no son errores reales
+EDIT_NOT_MODIFIED = "message is not modified"
+# Respuestas 400 de editMessageText que indican que el mensaje ya no existe
+EDIT_MESSAGE_GONE = ("message to edit not found", "message can't be edited")
+
+
+class TokenBucket:
+    """
+    Limitador de velocidad tipo token bucket, seguro entre hilos.
+    Con el bucket vacío, el siguiente token empieza a contarse cuando termina la petición
+    anterior (completed()), no cuando salió: la latencia variable de la red no acerca dos
+    mensajes en el servidor por debajo del límite.
+    """
+
+    def __init__(self, rate_per_second=1.0, burst=1):
+        self.rate = float(rate_per_second)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def completed(self):
+        """Marca el fin de una petición: si no quedan tokens, la recarga cuenta desde ahora."""
+        with self.lock:
+            if self.tokens < 1:
+                self.tokens = min(self.tokens, 0.0)
+                self.updated_at = time.monotonic()
+
+    def pause(self, seconds):
+        """Vacía el bucket durante `seconds` segundos (p. ej. tras un 429 con retry_after)."""
+        with self.lock:
+            self.tokens = -seconds * self.rate
+            self.updated_at = time.monotonic()
+
+
+class Destination:
+    """Un chat de Telegram con sus propios filtros, idioma y límite de envío."""
+
+    def __init__(self, chat_id, name=None, language=rendering.DEFAULT_LANGUAGE, min_minute=None,
+                 max_minute=None, min_corners=None, leagues=None, exclude_leagues=None,
+                 rate_per_second=1.0, burst=1, parse_mode=None):
+        """
+        Args:
+            chat_id (str): ID del chat, grupo o canal.
+            name (str): Nombre descriptivo para los logs.
+            language (str): Idioma de los mensajes ('es' o 'en').
+            min_minute (int): Minuto mínimo propio del destino (None = usar el global).
+            max_minute (int): Minuto máximo propio del destino (None = usar el global).
+            min_corners (int): Córners mínimos del equipo perdiendo (None = usar el global).
+            leagues (list): Si se indica, solo se envían partidos de estas ligas.
+            exclude_leagues (list): Ligas que nunca se envían a este destino.
+            rate_per_second (float): Mensajes por segundo permitidos en este chat.
+            burst (int): Ráfaga máxima de mensajes seguidos (1 = sin ráfagas).
+            parse_mode (str): 'MarkdownV2' o 'HTML' (None = TELEGRAM_PARSE_MODE o MarkdownV2).
+        """
+        self.chat_id = str(chat_id)
+        self.name = name or self.chat_id
+        self.language = language if language in rendering.TEXTS else rendering.DEFAULT_LANGUAGE
+        self.parse_mode = rendering.resolve_parse_mode(parse_mode)
+        self.min_minute = min_minute
+        self.max_minute = max_minute
+        self.min_corners = min_corners
+        self.leagues = {l.lower() for l in leagues} if leagues else None
+        self.exclude_leagues = {l.lower() for l in exclude_leagues} if exclude_leagues else set()
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.disabled = False
+        self.last_error = None
+        self.rate_limited = 0
+
+    @classmethod
+    def from_dict(cls, data):
+        """Crea un destino a partir de un diccionario de configuración."""
+        return cls(
+            chat_id=data['chat_id'],
+            name=data.get('name'),
+            language=data.get('language', rendering.DEFAULT_LANGUAGE),
+            min_minute=data.get('min_minute'),
+            max_minute=data.get('max_minute'),
+            min_corners=data.get('min_corners'),
+            leagues=data.get('leagues'),
+            exclude_leagues=data.get('exclude_leagues'),
+            rate_per_second=data.get('rate_per_second', 1.0),
+            burst=data.get('burst', 1),
+            parse_mode=data.get('parse_mode'),
+        )
+
+    def accepts(self, match):
+        """Indica si un partido (ya filtrado globalmente) pasa los filtros propios del destino."""
+        league = match.get('league', '').strip().lower()
+        if self.leagues is not None and league not in self.leagues:
+            return False
+        if league in self.exclude_leagues:
+            return False
+
+        if self.min_minute is not None or self.max_minute is not None:
+            try:
+                minute = int(match.get('minute_actual', ''))
+            except ValueError:
+                return False
+            if self.min_minute is not None and minute < self.min_minute:
+                return False
+            if self.max_minute is not None and minute > self.max_minute:
+                return False
+
+        if self.min_corners is not None:
+            losing_corners = _losing_team_corners(match)
+            if losing_corners is None or losing_corners < self.min_corners:
+                return False
+
+        return True
+
+
+def _losing_team_corners(match):
+    """Devuelve los córners del equipo que va perdiendo, o None si no hay perdedor."""
+    try:
+        home_goals, away_goals = map(int, match.get('score', '').split(' - '))
+        home_corners = int(match.get('corners_home', '0'))
+        away_corners = int(match.get('corners_away', '0'))
+    except ValueError:
+        return None
+    if home_goals < away_goals:
+        return home_corners
+    if away_goals < home_goals:
+        return away_corners
+    return None
+
+
+def load_destinations(default_chat_id=None):
+    """
+    Carga los destinos de Telegram.
+    Orden de prioridad:
+    1. Variable de entorno TELEGRAM_DESTINATIONS (lista JSON).
+    2. Archivo telegram_destinations.json.
+    3. Un único destino con TELEGRAM_CHAT_ID / default_chat_id.
+    """
+    raw = os.getenv('TELEGRAM_DESTINATIONS')
+    try:
+        if raw:
+            data = json.loads(raw)
+        elif os.path.exists(DESTINATIONS_FILE):
+            with open(DESTINATIONS_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = None
+    except (ValueError, OSError) as e:
+        log.warning("⚠️ Error al cargar destinos de Telegram: %s", e)
+        data = None
+
+    if data:
+        return [Destination.from_dict(item) for item in data if item.get('chat_id')]
+
+    chat_id = os.getenv('TELEGRAM_CHAT_ID') or default_chat_id
+    return [Destination(chat_id)] if chat_id else []
+
+
+class TelegramDispatcher:
+    """Envía las alertas a todos los destinos en paralelo."""
+
+    def __init__(self, bot_token, destinations, api_base=None, timeout=15, max_retries=3, max_workers=None,
+                 live_store=None):
+        """
+        Args:
+            bot_token (str): Token del bot de Telegram.
+            destinations (list): Lista de Destination.
+            api_base (str): URL base de la API (por defecto TELEGRAM_API_BASE o api.telegram.org).
+            timeout (float): Timeout por petición en segundos.
+            max_retries (int): Reintentos por mensaje ante 429 o errores de red.
+            max_workers (int): Hilos de envío en paralelo (por defecto uno por destino).
+            live_store (LiveAlertStore): Registro de mensajes para editarlos en vivo (opcional).
+        """
+        self.bot_token = bot_token
+        self.destinations = list(destinations)
+        self.api_base = (api_base or os.getenv('TELEGRAM_API_BASE') or TELEGRAM_API_BASE).rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.requested_workers = max_workers
+        self.max_workers = max_workers or max(1, len(self.destinations))
+        self.live_store = live_store
+        self.session = requests.Session()
+
+    def set_destinations(self, destinations):
+        """Sustituye los destinos conservando la sesión HTTP (p. ej. tras recargar la configuración)."""
+        self.destinations = list(destinations)
+        self.max_workers = self.requested_workers or max(1, len(self.destinations))
+
+    def close(self):
+        """Cierra la sesión HTTP y sus conexiones abiertas."""
+        self.session.close()
+
+    def _api_url(self, method):
+        return f"{self.api_base}/bot{self.bot_token}/{method}"
+
+    def _post(self, destination, method, payload):
+        """
+        Llama a la API para un destino respetando su límite de velocidad.
+        Reintenta en errores 429 (respetando retry_after) y en errores de red.
+
+        Returns:
+            dict | None: El campo 'result' de la respuesta, o None si falló.
+        """
+        payload = dict(payload, chat_id=destination.chat_id)
+        destination.last_error = None
+        for attempt in range(1, self.max_retries + 1):
+            destination.bucket.acquire()
+            try:
+                response = self.session.post(self._api_url(method), data=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                destination.bucket.completed()
+                log.warning("   ⚠️ [%s] Error de red (intento %s/%s): %s",
+                            destination.name, attempt, self.max_retries, e)
+                time.sleep(min(2 ** attempt, 10))
+                continue
+            destination.bucket.completed()
+
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                except ValueError:
+                    retry_after = 1
+                log.info("   ⏳ [%s] Límite de Telegram, reintentando en %ss", destination.name, retry_after)
+                destination.rate_limited += 1
+                destination.bucket.pause(retry_after)
+                continue
+
+            if response.status_code in FATAL_STATUS_CODES:
+                log.warning("   ⛔ [%s] Destino deshabilitado: %s - %s",
+                            destination.name, response.status_code, response.text)
+                destination.disabled = True
+                return None
+
+            if response.status_code != 200:
+                try:
+                    destination.last_error = response.json().get('description', '')
+                except ValueError:
+                    destination.last_error = response.text
+                if method == "editMessageText" and EDIT_NOT_MODIFIED in destination.last_error:
+                    return {}
+                log.error("   ❌ [%s] Error de la API de Telegram: %s - %s",
+                          destination.name, response.status_code, response.text)
+                return None
+
+            try:
+                return response.json().get('result') or {}
+            except ValueError:
+                return {}
+
+        log.error("   ❌ [%s] Se agotaron los reintentos", destination.name)
+        return None
+
+    def send_message(self, destination, text):
+        """Envía un mensaje a un destino. Devuelve el resultado de la API o None."""
+        return self._post(destination, "sendMessage", {
+            "text": text,
+            "parse_mode": destination.parse_mode,
+            "disable_web_page_preview": True
+        })
+
+    def edit_message(self, destination, message_id, text):
+        """Edita un mensaje ya enviado. Devuelve el resultado de la API o None."""
+        return self._post(destination, "editMessageText", {
+            "message_id": message_id,
+            "text": text,
+            "parse_mode": destination.parse_mode,
+            "disable_web_page_preview": True
+        })
+
+    def _render_all(self, matches, header_args):
+        """Renderiza una sola vez, por idioma y modo de formato, el encabezado, las ligas y los partidos."""
+        rendered = {}
+        report_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        for language, parse_mode in {(d.language, d.parse_mode) for d in self.destinations}:
+            renderer = rendering.get_renderer(language, parse_mode)
+            messages = rendered[(language, parse_mode)] = {
+                'header': renderer.render_header(report_time=report_time, **header_args),
+                'leagues': {},
+                'matches': [],
+            }
+            for match in matches:
+                league = match.get('league', '')
+                if league not in messages['leagues']:
+                    messages['leagues'][league] = renderer.render_league(league)
+                messages['matches'].append(renderer.render_match(match))
+        return rendered
+
+    def _deliver(self, destination, matches, rendered):
+        """Envía la secuencia encabezado/liga/partidos a un único destino."""
+        stats = {'destination': destination.name, 'sent': 0, 'failed': 0, 'disabled': False}
+        messages = rendered[(destination.language, destination.parse_mode)]
+
+        selected = [(i, m) for i, m in enumerate(matches) if destination.accepts(m)]
+        if not selected:
+            return stats
+
+        if self.send_message(destination, messages['header']) is None:
+            stats['failed'] += 1
+            stats['disabled'] = destination.disabled
+            return stats
+
+        current_league = None
+        for index, match in selected:
+            if destination.disabled:
+                break
+            if match.get('league', '') != current_league:
+                current_league = match.get('league', '')
+                if self.send_message(destination, messages['leagues'][current_league]) is None:
+                    stats['failed'] += 1
+
+            result = self.send_message(destination, messages['matches'][index])
+            if result is None:
+                stats['failed'] += 1
+            else:
+                stats['sent'] += 1
+                if self.live_store is not None and match.get('match_hash'):
+                    self.live_store.remember(destination.chat_id, match['match_hash'],
+                                             result.get('message_id'), match_state(match))
+
+        stats['disabled'] = destination.disabled
+        return stats
+
+    def dispatch(self, matches, min_minute, max_minute, min_corners):
+        """
+        Envía los partidos a todos los destinos activos en paralelo.
+
+        Returns:
+            list: Estadísticas por destino (enviados, fallidos, deshabilitado).
+        """
+        active = [d for d in self.destinations if not d.disabled]
+        if not matches or not active:
+            return []
+
+        rendered = self._render_all(matches, {
+            'min_minute': min_minute,
+            'max_minute': max_minute,
+            'min_corners': min_corners,
+        })
+
+        results = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(active))) as executor:
+            futures = {executor.submit(self._deliver, d, matches, rendered): d for d in active}
+            for future, destination in futures.items():
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # Un fallo inesperado en un destino no afecta al resto
+                    log.error("❌ [%s] Error inesperado al enviar alertas: %s", destination.name, e)
+                    results.append({'destination': destination.name, 'sent': 0, 'failed': len(matches), 'disabled': destination.disabled})
+
+        for stats in results:
+            log.info("   📨 [%s] Enviados: %s | Fallidos: %s%s", stats['destination'], stats['sent'], stats['failed'],
+                     " | DESHABILITADO" if stats['disabled'] else "", extra=stats)
+        return results
+
+    def _edit_live(self, destination, matches):
+        """Edita los mensajes de un destino cuyos partidos cambiaron de estado."""
+        stats = {'destination': destination.name, 'edited': 0, 'failed': 0}
+        renderer = rendering.get_renderer(destination.language, destination.parse_mode)
+        for match in matches:
+            if destination.disabled:
+                break
+            match_hash = match.get('match_hash')
+            state = match_state(match)
+            if not match_hash or not self.live_store.should_edit(destination.chat_id, match_hash, state):
+                continue
+
+            record = self.live_store.get(destination.chat_id, match_hash)
+            if self.edit_message(destination, record['message_id'], renderer.render_match(match)) is None:
+                stats['failed'] += 1
+                if destination.last_error and any(e in destination.last_error for e in EDIT_MESSAGE_GONE):
+                    self.live_store.forget(destination.chat_id, match_hash)
+                else:
+                    self.live_store.mark_attempted(destination.chat_id, match_hash)
+            else:
+                stats['edited'] += 1
+                self.live_store.mark_edited(destination.chat_id, match_hash, state)
+        return stats
+
+    def update_live(self, matches):
+        """
+        Edita en el sitio las alertas ya enviadas cuyos partidos cambiaron
+        (marcador, córners o rojas), como máximo una vez por intervalo.
+
+        Returns:
+            list: Estadísticas por destino (editados, fallidos).
+        """
+        active = [d for d in self.destinations if not d.disabled]
+        if self.live_store is None or not matches or not active:
+            return []
+
+        # Cada texto se renderiza una vez por idioma y modo: los destinos que comparten ambos
+        # reutilizan el mensaje de la caché del renderizador (clave: estado del partido)
+        results = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(active))) as executor:
+            futures = {executor.submit(self._edit_live, d, matches): d for d in active}
+            for future, destination in futures.items():
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    log.error("❌ [%s] Error inesperado al editar alertas: %s", destination.name, e)
+
+        for stats in results:
+            if stats['edited'] or stats['failed']:
+                log.info("   ✏️ [%s] Editados: %s | Fallidos: %s",
+                         stats['destination'], stats['edited'], stats['failed'], extra=stats)
+        return results
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la página en vivo de NowGoal para pruebas de carga y escalado.
+Genera #mintable con el mismo marcado que espera extract_match_data():
+filas "Leaguestitle" con ".LGname", filas "tr.tds" con td[name="timeData"], td.status,
+equipos (td[id^="ht_"] > a[id^="team1_"] ...), marcador (td.f-b b), span[id^="hht_"],
+span[id^="cr_"], tarjetas y cuotas (td.oddstd p.odds1), más el botón li_FilterLive.
+
+El estado de cada partido (minuto, marcador, córners, tarjetas) evoluciona con el tiempo
+de forma determinista a partir de una semilla, y la página refresca #mintable sola.
+
+Uso:
+    python fake_nowgoal.py --leagues 50 --matches 2000 --speed 10 --port 8765
+Rutas:
+    /            página completa
+    /mintable    solo las filas de la tabla (?live=1 para solo partidos en juego)
+    /state.json  estado actual de todos los partidos (para validar la extracción)
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+MIN_MATCHES = 10
+MAX_MATCHES = 10000
+
+# Minutos simulados: 45 de primera parte, 15 de descanso, 45 de segunda parte
+FIRST_HALF_END = 45
+SECOND_HALF_START = 60
+FULL_TIME = 105
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>NowGoal (stand-in)</title></head>
+<body>
+<ul id="filter">
+  <li id="li_FilterAll" class="on" onclick="FilterByOption(1)"><span>All</span></li>
+  <li id="li_FilterLive" onclick="FilterByOption(2)"><span>Live</span></li>
+</ul>
+<table id="mintable">%(rows)s</table>
+<script>
+let liveOnly = false;
+function refreshTable() {
+    fetch('/mintable' + (liveOnly ? '?live=1' : ''))
+        .then(r => r.text())
+        .then(html => { document.getElementById('mintable').innerHTML = html; });
+}
+function FilterByOption(option) {
+    liveOnly = option === 2;
+    document.getElementById('li_FilterLive').className = liveOnly ? 'on' : '';
+    document.getElementById('li_FilterAll').className = liveOnly ? '' : 'on';
+    refreshTable();
+}
+setInterval(refreshTable, %(refresh_ms)d);
+</script>
+</body></html>
+"""
+
+
+class SimulatedMatch:
+    """Un partido cuyos eventos (goles, córners, tarjetas) están fijados por la semilla."""
+
+    def __init__(self, match_id, league, kickoff_offset, rng):
+        self.match_id = match_id
+        self.league = league
+        self.home_team = f"Home Team {match_id}"
+        # Algunos equipos locales llevan el sufijo de campo neutral, como en NowGoal
+        if match_id % 17 == 0:
+            self.home_team += " (N)"
+        self.away_team = f"Away Team {match_id}"
+        self.kickoff_offset = kickoff_offset  # minutos simulados respecto al arranque del servidor
+        self.events = {
+            name: sorted(rng.randint(1, 90) for _ in range(rng.randint(low, high)))
+            for name, (low, high) in {
+                'goals_home': (0, 3), 'goals_away': (0, 3),
+                'corners_home': (0, 10), 'corners_away': (0, 10),
+                'yellow_home': (0, 4), 'yellow_away': (0, 4),
+                'red_home': (0, 1), 'red_away': (0, 1),
+            }.items()
+        }
+        self.odds = [f"{rng.uniform(1.2, 8.0):.2f}".replace('.', ',') for _ in range(3)]
+
+    def clock(self, elapsed_minutes):
+        """Devuelve (estado, minuto de juego) para los minutos simulados desde el arranque."""
+        since_kickoff = elapsed_minutes - self.kickoff_offset
+        if since_kickoff < 0:
+            return 'pending', 0
+        if since_kickoff < FIRST_HALF_END:
+            return 'live', int(since_kickoff) + 1
+        if since_kickoff < SECOND_HALF_START:
+            return 'ht', 45
+        if since_kickoff < FULL_TIME:
+            return 'live', int(since_kickoff - SECOND_HALF_START) + 46
+        return 'ft', 90
+
+    def count(self, name, minute):
+        return sum(1 for m in self.events[name] if m <= minute)
+
+    def snapshot(self, elapsed_minutes, start_time):
+        """Estado actual del partido como diccionario."""
+        state, minute = self.clock(elapsed_minutes)
+        kickoff = start_time + self.kickoff_offset * 60
+        data = {
+            'match_id': self.match_id,
+            'league': self.league,
+            'home_team': self.home_team,
+            'away_team': self.away_team,
+            'state': state,
+            'minute': minute,
+            'kickoff': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(kickoff)),
+        }
+        for name in self.events:
+            data[name] = self.count(name, minute) if state != 'pending' else 0
+        data['ht_home'] = self.count('goals_home', min(minute, 45)) if state != 'pending' else 0
+        data['ht_away'] = self.count('goals_away', min(minute, 45)) if state != 'pending' else 0
+        return data
+
+    def render_row(self, elapsed_minutes, start_time):
+        """Fila <tr class="tds"> con el marcado de NowGoal."""
+        d = self.snapshot(elapsed_minutes, start_time)
+        i = self.match_id
+        if d['state'] == 'pending':
+            status, score, corners, half_time = '', '-', '-', ''
+        else:
+            status = {'ht': 'HT', 'ft': 'FT'}.get(d['state'], str(d['minute']))
+            score = f"{d['goals_home']} - {d['goals_away']}"
+            corners = f"{d['corners_home']}-{d['corners_away']}"
+            half_time = f"{d['ht_home']} - {d['ht_away']}" if d['minute'] > 45 else ''
+
+        def cards(css, count):
+            return f'<span class="{css}">{count}</span>' if count else ''
+
+        return (
+            f'<tr class="tds" id="tr1_{i}" data-state="{d["state"]}">'
+            f'<td name="timeData" data-t="{d["kickoff"]}">{d["kickoff"][11:16]}</td>'
+            f'<td class="status">{status}</td>'
+            f'<td id="ht_{i}">{cards("redcard", d["red_home"])}{cards("yellowcard", d["yellow_home"])}'
+            f'<a id="team1_{i}" href="/match/live-{i}">{self.home_team}</a></td>'
+            f'<td class="f-b"><b>{score}</b></td>'
+            f'<td id="gt_{i}"><a id="team2_{i}" href="/match/live-{i}">{self.away_team}</a>'
+            f'{cards("yellowcard", d["yellow_away"])}{cards("redcard", d["red_away"])}</td>'
+            f'<td><span id="hht_{i}">{half_time}</span></td>'
+            f'<td><span id="cr_{i}">{corners}</span></td>'
+            f'<td class="oddstd">{"".join(f"<p class=odds1>{o}</p>" for o in self.odds)}</td>'
+            f'</tr>'
+        )
+
+
+class FakeNowGoal:
+    """Modelo de la tabla en vivo: ligas, partidos y reloj simulado."""
+
+    def __init__(self, leagues=20, matches=500, speed=1.0, seed=42):
+        """
+        Args:
+            leagues (int): Número de ligas.
+            matches (int): Número de partidos (entre 10 y 10000).
+            speed (float): Minutos simulados por minuto real (1.0 = tiempo real).
+            seed (int): Semilla para que las pruebas sean reproducibles.
+        """
+        if not MIN_MATCHES <= matches <= MAX_MATCHES:
+            raise ValueError(f"matches debe estar entre {MIN_MATCHES} y {MAX_MATCHES}")
+        leagues = max(1, min(leagues, matches))
+        self.speed = speed
+        self.start_time = time.time()
+        rng = random.Random(seed)
+
+        self.leagues = [f"LEAGUE {chr(65 + l % 26)}{l}" for l in range(leagues)]
+        self.matches = []
+        for match_id in range(1, matches + 1):
+            league = self.leagues[(match_id - 1) * leagues // matches]
+            # Repartir los inicios para que siempre haya partidos en todas las fases
+            kickoff_offset = rng.uniform(-FULL_TIME, 60)
+            self.matches.append(SimulatedMatch(match_id, league, kickoff_offset, rng))
+
+    def elapsed_minutes(self):
+        return (time.time() - self.start_time) / 60 * self.speed
+
+    def render_rows(self, live_only=False):
+        """Filas de #mintable (cabecera de liga + partidos) en el estado actual."""
+        elapsed = self.elapsed_minutes()
+        rows = []
+        current_league = None
+        for match in self.matches:
+            if live_only and match.clock(elapsed)[0] not in ('live', 'ht'):
+                continue
+            if match.league != current_league:
+                current_league = match.league
+                rows.append(f'<tr class="Leaguestitle"><td colspan="8"><span class="LGname">{current_league}</span></td></tr>')
+            rows.append(match.render_row(elapsed, self.start_time))
+        return ''.join(rows)
+
+    def render_page(self, refresh_ms=5000):
+        return PAGE_TEMPLATE % {'rows': self.render_rows(), 'refresh_ms': refresh_ms}
+
+    def state(self):
+        elapsed = self.elapsed_minutes()
+        return [m.snapshot(elapsed, self.start_time) for m in self.matches]
+
+
+def serve(model, host="127.0.0.1", port=0, refresh_ms=5000, background=True):
+    """
+    Arranca el servidor HTTP del stand-in.
+
+    Returns:
+        tuple: (servidor, url base)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body, content_type):
+            body = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/':
+                self._send(model.render_page(refresh_ms), "text/html; charset=utf-8")
+            elif url.path == '/mintable':
+                live_only = parse_qs(url.query).get('live') == ['1']
+                self._send(model.render_rows(live_only), "text/html; charset=utf-8")
+            elif url.path == '/state.json':
+                self._send(json.dumps(model.state()), "application/json")
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    url = f"http://{host}:{server.server_port}/"
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in local de la página en vivo de NowGoal")
+    parser.add_argument("--leagues", type=int, default=20)
+    parser.add_argument("--matches", type=int, default=500, help=f"{MIN_MATCHES}-{MAX_MATCHES}")
+    parser.add_argument("--speed", type=float, default=1.0, help="Minutos simulados por minuto real")
+    parser.add_argument("--refresh", type=int, default=5000, help="Refresco de #mintable en ms")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    model = FakeNowGoal(args.leagues, args.matches, args.speed, args.seed)
+    server, url = serve(model, args.host, args.port, args.refresh, background=False)
+    print(f"🌐 NowGoal stand-in en {url} ({len(model.leagues)} ligas, {len(model.matches)} partidos, x{args.speed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
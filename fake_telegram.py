@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la Bot API de Telegram (sendMessage y editMessageText)
+para medir el envío de alertas sin tocar la API real.
+- Valida el texto MarkdownV2 con las mismas reglas que Telegram: caracteres reservados
+  sin escapar, entidades sin cerrar, escapes dentro de código y de URLs.
+- Valida también el modo HTML: etiquetas admitidas y cerradas, y <, > y & escapados.
+- Aplica límites realistas por chat y globales, respondiendo 429 con retry_after.
+- Añade una latencia configurable a cada respuesta.
+
+Uso:
+    python fake_telegram.py --port 8081 --latency 80
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 python telegram.py
+Rutas:
+    POST /bot<token>/sendMessage
+    POST /bot<token>/editMessageText
+    GET  /stats    contadores de mensajes, 429 y errores de formato
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import defaultdict, deque
+from html.parser import HTMLParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+MAX_MESSAGE_LENGTH = 4096
+
+# Caracteres que Telegram exige escapar fuera de entidades en MarkdownV2
+RESERVED_CHARS = set('_*[]()~`>#+-=|{}.!')
+
+ENTITY_NAMES = {'*': 'Bold', '_': 'Italic', '__': 'Underline', '~': 'Strikethrough', '||': 'Spoiler', '[': 'TextUrl'}
+
+
+def _byte_offset(text, index):
+    return len(text[:index].encode('utf-8'))
+
+
+def check_markdown_v2(text):
+    """
+    Valida un texto MarkdownV2 como lo hace Telegram.
+
+    Returns:
+        str | None: Descripción del error (como la de la API), o None si el texto es válido.
+    """
+    stack = []  # (entidad, índice de apertura)
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+
+        if c == '\\':
+            # Cualquier carácter con código 1-126 puede escaparse en cualquier sitio
+            if i + 1 < n and 1 <= ord(text[i + 1]) <= 126:
+                i += 2
+                continue
+            i += 1
+            continue
+
+        if c == '`':
+            delimiter = '```' if text.startswith('```', i) else '`'
+            name = 'Pre' if delimiter == '```' else 'Code'
+            j = i + len(delimiter)
+            while j < n:
+                if text[j] == '\\' and j + 1 < n and text[j + 1] in '`\\':
+                    j += 2
+                    continue
+                if text.startswith(delimiter, j):
+                    break
+                j += 1
+            else:
+                return f"can't parse entities: Can't find end of {name} entity at byte offset {_byte_offset(text, i)}"
+            i = j + len(delimiter)
+            continue
+
+        if c == '_' and text.startswith('__', i):
+            token = '__'
+        elif c == '|' and text.startswith('||', i):
+            token = '||'
+        elif c in '*_~':
+            token = c
+        elif c == '[':
+            stack.append(('[', i))
+            i += 1
+            continue
+        elif c == ']':
+            if not stack or stack[-1][0] != '[':
+                return (f"can't parse entities: Character ']' is reserved and must be escaped "
+                        f"with the preceding '\\'")
+            stack.pop()
+            if i + 1 >= n or text[i + 1] != '(':
+                # "[texto]" sin URL: Telegram lo acepta como texto plano
+                i += 1
+                continue
+            # Dentro de la URL solo hay que escapar ')' y '\'
+            j = i + 2
+            while j < n and text[j] != ')':
+                j += 2 if text[j] == '\\' else 1
+            if j >= n:
+                return f"can't parse entities: Can't find end of a url at byte offset {_byte_offset(text, i + 1)}"
+            i = j + 1
+            continue
+        elif c == '>' and (i == 0 or text[i - 1] == '\n'):
+            # Cita al comienzo de línea
+            i += 1
+            continue
+        elif c in RESERVED_CHARS:
+            return (f"can't parse entities: Character '{c}' is reserved and must be escaped "
+                    f"with the preceding '\\'")
+        else:
+            i += 1
+            continue
+
+        if stack and stack[-1][0] == token:
+            stack.pop()
+        else:
+            stack.append((token, i))
+        i += len(token)
+
+    if stack:
+        token, index = stack[-1]
+        return (f"can't parse entities: Can't find end of {ENTITY_NAMES.get(token, token)} entity "
+                f"at byte offset {_byte_offset(text, index)}")
+    return None
+
+
+def markdown_v2_text(text):
+    """
+    Texto visible de un mensaje MarkdownV2 válido: sin marcas de formato, escapes ni URLs.
+    Sirve para comprobar que el escapado no pierde ni añade caracteres.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '\\' and i + 1 < n and 1 <= ord(text[i + 1]) <= 126:
+            out.append(text[i + 1])
+            i += 2
+        elif c == '`':
+            delimiter = '```' if text.startswith('```', i) else '`'
+            j = i + len(delimiter)
+            while j < n and not text.startswith(delimiter, j):
+                if text[j] == '\\' and j + 1 < n and text[j + 1] in '`\\':
+                    j += 1
+                out.append(text[j])
+                j += 1
+            i = j + len(delimiter)
+        elif c == ']' and i + 1 < n and text[i + 1] == '(':
+            j = i + 2
+            while j < n and text[j] != ')':
+                j += 2 if text[j] == '\\' else 1
+            i = j + 1
+        elif c in '*_~[]' or (c == '|' and text.startswith('||', i)):
+            i += 2 if c == '|' else 1
+        elif c == '>' and (i == 0 or text[i - 1] == '\n'):
+            i += 1  # Cita al comienzo de línea
+        else:
+            out.append(c)
+            i += 1
+    return ''.join(out)
+
+
+# Etiquetas que acepta el modo HTML de Telegram y entidades con nombre admitidas
+HTML_TAGS = {'b', 'strong', 'i', 'em', 'u', 'ins', 's', 'strike', 'del', 'a', 'code', 'pre', 'span',
+             'tg-spoiler', 'tg-emoji', 'blockquote'}
+HTML_ENTITIES = {'lt': '<', 'gt': '>', 'amp': '&', 'quot': '"'}
+
+
+class _TelegramHTMLParser(HTMLParser):
+    """Analiza un mensaje HTML con las reglas de Telegram y acumula su texto visible."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.parts = []
+        self.error = None
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = f"can't parse entities: {error}"
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in HTML_TAGS:
+            self._fail(f"Unsupported start tag \"{tag}\"")
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack[-1] != tag:
+            self._fail(f"Unmatched end tag \"{tag}\"")
+            return
+        self.stack.pop()
+
+    def handle_data(self, data):
+        for char in '<>&':
+            if char in data:
+                self._fail(f"Character '{char}' must be escaped as an HTML entity")
+        self.parts.append(data)
+
+    def handle_entityref(self, name):
+        if name not in HTML_ENTITIES:
+            self._fail(f"Unsupported HTML entity \"&{name};\"")
+        self.parts.append(HTML_ENTITIES.get(name, ''))
+
+    def handle_charref(self, name):
+        try:
+            self.parts.append(chr(int(name[1:], 16) if name[:1] in 'xX' else int(name)))
+        except ValueError:
+            self._fail(f"Invalid numeric HTML entity \"&#{name};\"")
+
+
+def parse_html(text):
+    """
+    Valida un texto HTML como lo hace Telegram.
+
+    Returns:
+        tuple: (descripción del error o None, texto visible)
+    """
+    parser = _TelegramHTMLParser()
+    parser.feed(text)
+    parser.close()
+    if parser.rawdata:
+        parser._fail("Unclosed start tag")
+    if parser.stack:
+        parser._fail(f"Can't find end tag corresponding to start tag \"{parser.stack[-1]}\"")
+    return parser.error, ''.join(parser.parts)
+
+
+def check_html(text):
+    """Valida un texto HTML. Devuelve la descripción del error o None si es válido."""
+    return parse_html(text)[0]
+
+
+class RateLimiter:
+    """Límites de envío de Telegram con ventanas deslizantes."""
+
+    def __init__(self, per_chat_per_second=1, per_group_per_minute=20, global_per_second=30):
+        self.per_chat_per_second = per_chat_per_second
+        self.per_group_per_minute = per_group_per_minute
+        self.global_per_second = global_per_second
+        self.chat_history = defaultdict(deque)
+        self.global_history = deque()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _count_since(history, since):
+        while history and history[0] <= since:
+            history.popleft()
+        return len(history)
+
+    def check(self, chat_id):
+        """
+        Registra un mensaje si se permite.
+
+        Returns:
+            int: 0 si se permite, o los segundos de retry_after.
+        """
+        now = time.monotonic()
+        is_group = str(chat_id).startswith('-')
+        with self.lock:
+            history = self.chat_history[chat_id]
+            if self._count_since(self.global_history, now - 1) >= self.global_per_second:
+                return 1
+            # La ventana por minuto también sirve para la de por segundo
+            sent_last_minute = self._count_since(history, now - 60)
+            if is_group and sent_last_minute >= self.per_group_per_minute:
+                return max(1, int(history[0] + 60 - now) + 1)
+            recent = sum(1 for t in history if t > now - 1)
+            if recent >= self.per_chat_per_second:
+                return 1
+            history.append(now)
+            self.global_history.append(now)
+            return 0
+
+
+class FakeTelegramAPI:
+    """Estado del bot simulado: mensajes por chat, límites y estadísticas."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, banned_chats=(), rate_limiter=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.banned_chats = {str(c) for c in banned_chats}
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.messages = defaultdict(dict)  # chat_id -> {message_id: texto}
+        self.next_message_id = defaultdict(int)
+        self.stats = defaultdict(int)
+        self.chat_stats = defaultdict(lambda: defaultdict(int))
+        self.parse_errors = deque(maxlen=100)
+        self.lock = threading.Lock()
+
+    def _error(self, code, description, **parameters):
+        body = {'ok': False, 'error_code': code, 'description': description}
+        if parameters:
+            body['parameters'] = parameters
+        return code, body
+
+    def handle(self, method, params):
+        """Procesa una llamada de la API. Devuelve (código HTTP, cuerpo JSON)."""
+        if self.latency_ms or self.jitter_ms:
+            time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+
+        chat_id = str(params.get('chat_id', ''))
+        text = params.get('text', '')
+        with self.lock:
+            self.stats[f'{method}_requests'] += 1
+            self.chat_stats[chat_id]['requests'] += 1
+
+        if method not in ('sendMessage', 'editMessageText'):
+            return self._error(404, "Not Found")
+        if not chat_id:
+            return self._error(400, "Bad Request: chat_id is empty")
+        if chat_id in self.banned_chats:
+            return self._error(403, "Forbidden: bot was kicked from the channel chat")
+
+        retry_after = self.rate_limiter.check(chat_id)
+        if retry_after:
+            with self.lock:
+                self.stats['rate_limited'] += 1
+                self.chat_stats[chat_id]['rate_limited'] += 1
+            return self._error(429, f"Too Many Requests: retry after {retry_after}", retry_after=retry_after)
+
+        if not text:
+            return self._error(400, "Bad Request: message text is empty")
+        if len(text) > MAX_MESSAGE_LENGTH:
+            return self._error(400, "Bad Request: message is too long")
+        parse_mode = params.get('parse_mode')
+        if parse_mode in ('MarkdownV2', 'HTML'):
+            error = check_markdown_v2(text) if parse_mode == 'MarkdownV2' else check_html(text)
+            if error:
+                with self.lock:
+                    self.stats['parse_errors'] += 1
+                    self.parse_errors.append({'chat_id': chat_id, 'error': error, 'text': text})
+                return self._error(400, f"Bad Request: {error}")
+
+        with self.lock:
+            if method == 'sendMessage':
+                self.next_message_id[chat_id] += 1
+                message_id = self.next_message_id[chat_id]
+                self.messages[chat_id][message_id] = text
+                self.stats['sent'] += 1
+                self.chat_stats[chat_id]['sent'] += 1
+            else:
+                try:
+                    message_id = int(params.get('message_id', 0))
+                except ValueError:
+                    message_id = 0
+                if message_id not in self.messages[chat_id]:
+                    return self._error(400, "Bad Request: message to edit not found")
+                if self.messages[chat_id][message_id] == text:
+                    return self._error(400, "Bad Request: message is not modified: specified new message "
+                                            "content and reply markup are exactly the same as a current "
+                                            "content and reply markup of the message")
+                self.messages[chat_id][message_id] = text
+                self.stats['edited'] += 1
+                self.chat_stats[chat_id]['edited'] += 1
+
+        return 200, {'ok': True, 'result': {
+            'message_id': message_id,
+            'chat': {'id': chat_id},
+            'date': int(time.time()),
+            'text': text,
+        }}
+
+    def snapshot_stats(self):
+        with self.lock:
+            return {
+                'totals': dict(self.stats),
+                'chats': {chat: dict(values) for chat, values in self.chat_stats.items()},
+                'parse_errors': list(self.parse_errors),
+            }
+
+
+def serve(api, host="127.0.0.1", port=0, background=True):
+    """
+    Arranca el servidor HTTP de la API simulada.
+
+    Returns:
+        tuple: (servidor, URL base para TELEGRAM_API_BASE)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _params(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                raw = self.rfile.read(length).decode('utf-8')
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    params.update(json.loads(raw))
+                else:
+                    params.update({k: v[0] for k, v in parse_qs(raw, keep_blank_values=True).items()})
+            return url.path, params
+
+        def _dispatch(self):
+            path, params = self._params()
+            if path == '/stats':
+                return self._reply(200, api.snapshot_stats())
+            parts = path.strip('/').split('/')
+            if len(parts) != 2 or not parts[0].startswith('bot'):
+                return self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+            code, body = api.handle(parts[1], params)
+            self._reply(code, body)
+
+        do_GET = _dispatch
+        do_POST = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    url = f"http://{host}:{server.server_port}"
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot API de Telegram simulada (sendMessage/editMessageText)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0, help="Latencia base por petición en ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Latencia aleatoria adicional en ms")
+    parser.add_argument("--per-chat", type=int, default=1, help="Mensajes por segundo por chat")
+    parser.add_argument("--per-group-minute", type=int, default=20, help="Mensajes por minuto en grupos/canales")
+    parser.add_argument("--global-rate", type=int, default=30, help="Mensajes por segundo en total")
+    parser.add_argument("--banned", default="", help="Chats (separados por comas) que responden 403")
+    args = parser.parse_args()
+
+    api = FakeTelegramAPI(
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        banned_chats=[c for c in args.banned.split(',') if c],
+        rate_limiter=RateLimiter(args.per_chat, args.per_group_minute, args.global_rate),
+    )
+    server, url = serve(api, args.host, args.port, background=False)
+    print(f"🤖 Bot API simulada en {url} (usa TELEGRAM_API_BASE={url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+        print(json.dumps(api.snapshot_stats()['totals'], indent=2))
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Análisis rápido del historial de alertas enviadas (sent_matches.json).
+El índice se construye una sola vez (timestamps ordenados + contadores por liga
+y estrategia) y después cada consulta es O(log N) o proporcional al resultado:
+- conteos por hora con búsqueda binaria en lugar de recorrer todo el historial,
+- percentiles de antigüedad por posición en la lista ordenada,
+- últimas N alertas sin volver a ordenar.
+La liga y la estrategia de cada alerta se obtienen de las exportaciones NDJSON
+(exports/), cruzando por match_hash.
+"""
+
+import os
+import gzip
+import json
+import time
+from bisect import bisect_right
+from collections import Counter
+from operator import itemgetter
+
+UNKNOWN = "desconocida"
+
+# Prefijo del motivo de filtro (is_losing_with_corner_advantage) -> estrategia
+STRATEGY_PREFIXES = (
+    ("Local pierde", "local_pierde_con_corners"),
+    ("Visitante pierde", "visitante_pierde_con_corners"),
+)
+
+
+def match_strategy(filter_reason):
+    """Devuelve el nombre de la estrategia que disparó la alerta según su motivo."""
+    for prefix, strategy in STRATEGY_PREFIXES:
+        if filter_reason and filter_reason.startswith(prefix):
+            return strategy
+    return UNKNOWN
+
+
+def load_alert_metadata(directory="exports", prefix="nowgoal", wanted=None):
+    """
+    Lee las exportaciones NDJSON (también las comprimidas) en una sola pasada.
+
+    Args:
+        directory (str): Carpeta de las exportaciones.
+        prefix (str): Prefijo de los segmentos.
+        wanted (set): Si se indica, solo se guardan esos match_hash.
+
+    Returns:
+        dict: match_hash -> (liga, estrategia). Gana el registro más reciente.
+    """
+    metadata = {}
+    if not os.path.isdir(directory):
+        return metadata
+    names = sorted(n for n in os.listdir(directory)
+                   if n.startswith(f"{prefix}-") and (n.endswith('.ndjson') or n.endswith('.ndjson.gz')))
+    for name in names:
+        path = os.path.join(directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    # Descartar rápido los resúmenes de ejecución sin parsearlos
+                    if '"match_hash"' not in line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    match_hash = record.get('match_hash')
+                    if match_hash and (wanted is None or match_hash in wanted):
+                        metadata[match_hash] = (record.get('league') or UNKNOWN,
+                                                match_strategy(record.get('filter_reason')))
+        except OSError as e:
+            print(f"⚠️ No se pudo leer {path}: {e}")
+    return metadata
+
+
+class HistoryIndex:
+    """Índice ordenado por tiempo del historial de alertas."""
+
+    def __init__(self, sent_matches, metadata=None):
+        """
+        Args:
+            sent_matches (dict): match_hash -> timestamp de envío (formato de sent_matches.json).
+            metadata (dict): match_hash -> (liga, estrategia), opcional.
+        """
+        items = sorted(sent_matches.items(), key=itemgetter(1))
+        self.hashes, self.timestamps = (list(column) for column in zip(*items)) if items else ([], [])
+        self.metadata = metadata or {}
+        self.by_league = Counter()
+        self.by_strategy = Counter()
+        # Solo se recorren las alertas con metadatos; el resto cuenta como desconocida
+        known = 0
+        for match_hash, (league, strategy) in self.metadata.items():
+            if match_hash in sent_matches:
+                self.by_league[league] += 1
+                self.by_strategy[strategy] += 1
+                known += 1
+        if known < len(items):
+            self.by_league[UNKNOWN] += len(items) - known
+            self.by_strategy[UNKNOWN] += len(items) - known
+
+    @classmethod
+    def from_files(cls, sent_matches_file="sent_matches.json", exports_dir="exports"):
+        """Construye el índice desde sent_matches.json y las exportaciones NDJSON."""
+        sent_matches = {}
+        if os.path.exists(sent_matches_file):
+            with open(sent_matches_file, 'r', encoding='utf-8') as f:
+                sent_matches = json.load(f)
+        metadata = load_alert_metadata(exports_dir, wanted=set(sent_matches)) if exports_dir else {}
+        return cls(sent_matches, metadata)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def count_between(self, start, end):
+        """Alertas con start < timestamp <= end, en O(log N)."""
+        return bisect_right(self.timestamps, end) - bisect_right(self.timestamps, start)
+
+    def count_since(self, since):
+        """Alertas posteriores a `since`, en O(log N)."""
+        return len(self.timestamps) - bisect_right(self.timestamps, since)
+
+    def hourly_counts(self, hours=24, now=None):
+        """
+        Alertas por hora hacia atrás desde `now`.
+
+        Returns:
+            list: counts[i] = alertas enviadas hace entre i y i+1 horas.
+        """
+        now = time.time() if now is None else now
+        # hours + 1 búsquedas binarias: bordes de las ventanas de una hora
+        edges = [bisect_right(self.timestamps, now - i * 3600) for i in range(hours + 1)]
+        return [edges[i] - edges[i + 1] for i in range(hours)]
+
+    def age_percentiles(self, percentiles=(50, 90, 99), now=None):
+        """
+        Antigüedad (en horas) de las alertas en los percentiles pedidos, en O(1) cada uno.
+
+        Returns:
+            dict: percentil -> horas.
+        """
+        if not self.timestamps:
+            return {}
+        now = time.time() if now is None else now
+        last = len(self.timestamps) - 1
+        result = {}
+        for p in percentiles:
+            # El percentil p de antigüedad es el percentil 100-p de los timestamps
+            index = round((100 - p) / 100 * last)
+            result[p] = (now - self.timestamps[index]) / 3600
+        return result
+
+    def recent(self, n=10):
+        """Las n alertas más recientes como [(match_hash, timestamp)], sin reordenar."""
+        start = max(0, len(self.hashes) - n)
+        return list(zip(reversed(self.hashes[start:]), reversed(self.timestamps[start:])))
+
+    def top_leagues(self, n=10):
+        return self.by_league.most_common(n)
+
+    def top_strategies(self, n=10):
+        return self.by_strategy.most_common(n)
@@ -0,0 +1,148 @@
+"""
+Registro de alertas "en vivo" de Telegram.
+Guarda el message_id de cada alerta enviada (por chat y partido) para poder
+editar ese mismo mensaje con editMessageText cuando cambia el marcador o los córners,
+en lugar de enviar un mensaje nuevo.
+Las ediciones se agrupan: como máximo una edición por partido y chat en cada intervalo.
+"""
+
+import os
+import time
+import threading
+
+from state_files import read_json, update_json
+from structured_log import get_logger
+
+log = get_logger("telegram")
+
+LIVE_MESSAGES_FILE = "live_messages.json"
+
+
+def match_state(match):
+    """
+    Devuelve la "firma" del estado de un partido que justifica editar la alerta.
+    Solo marcador, córners y tarjetas rojas: el minuto cambia en cada consulta
+    y por sí solo no merece una edición.
+    """
+    return [
+        match.get('score', ''),
+        match.get('corners_home', '0'),
+        match.get('corners_away', '0'),
+        match.get('red_home', '0'),
+        match.get('red_away', '0'),
+    ]
+
+
+class LiveAlertStore:
+    """Mapa persistente (chat_id, match_hash) -> mensaje de Telegram enviado."""
+
+    def __init__(self, filename=LIVE_MESSAGES_FILE, edit_interval=None, max_age_hours=6):
+        """
+        Args:
+            filename (str): Archivo JSON donde se guardan los mensajes enviados.
+            edit_interval (float): Segundos mínimos entre dos ediciones del mismo mensaje.
+                                   Por defecto TELEGRAM_EDIT_INTERVAL o 60.
+            max_age_hours (float): Antigüedad máxima de un mensaje para seguir editándolo.
+        """
+        self.filename = filename
+        if edit_interval is None:
+            edit_interval = float(os.getenv('TELEGRAM_EDIT_INTERVAL', '60'))
+        self.edit_interval = edit_interval
+        self.max_age_hours = max_age_hours
+        self.lock = threading.Lock()
+        self.records = self.load()
+        # Claves olvidadas en esta ejecución: no deben volver desde el archivo al combinar
+        self.forgotten = set()
+
+    @staticmethod
+    def key(chat_id, match_hash):
+        return f"{chat_id}:{match_hash}"
+
+    def load(self):
+        """Carga los mensajes registrados desde disco."""
+        try:
+            return read_json(self.filename)
+        except Exception as e:
+            log.warning("⚠️ Error al cargar archivo de mensajes en vivo: %s", e)
+            return {}
+
+    def save(self):
+        """Guarda los mensajes registrados, descartando los demasiado antiguos."""
+        self.prune()
+        cutoff_time = time.time() - self.max_age_hours * 3600
+        with self.lock:
+            records = dict(self.records)
+            forgotten = set(self.forgotten)
+
+        def merge(current):
+            # Registros de otras ejecuciones + los propios; por clave gana la última actualización
+            merged = {k: r for k, r in current.items()
+                      if k not in forgotten and r.get('sent_at', 0) > cutoff_time}
+            for key, record in records.items():
+                if record.get('last_update', 0) >= merged.get(key, {}).get('last_update', 0):
+                    merged[key] = record
+            return merged
+
+        try:
+            merged = update_json(self.filename, merge)
+            with self.lock:
+                for key, record in merged.items():
+                    self.records.setdefault(key, record)
+        except Exception as e:
+            log.error("❌ Error al guardar archivo de mensajes en vivo: %s", e)
+
+    def prune(self):
+        """Elimina los mensajes enviados hace más de max_age_hours."""
+        cutoff_time = time.time() - self.max_age_hours * 3600
+        with self.lock:
+            self.records = {k: r for k, r in self.records.items() if r.get('sent_at', 0) > cutoff_time}
+
+    def get(self, chat_id, match_hash):
+        with self.lock:
+            return self.records.get(self.key(chat_id, match_hash))
+
+    def remember(self, chat_id, match_hash, message_id, state):
+        """Registra el mensaje recién enviado para un partido."""
+        if message_id is None:
+            return
+        now = time.time()
+        with self.lock:
+            self.records[self.key(chat_id, match_hash)] = {
+                'message_id': message_id,
+                'state': state,
+                'sent_at': now,
+                'last_update': now,
+            }
+
+    def should_edit(self, chat_id, match_hash, state, now=None):
+        """
+        Indica si hay que editar el mensaje: el estado cambió desde la última edición
+        y ya pasó el intervalo mínimo. Si el estado cambia varias veces dentro del
+        intervalo, solo se envía el último (ediciones agrupadas).
+        """
+        record = self.get(chat_id, match_hash)
+        if not record or record.get('state') == state:
+            return False
+        now = time.time() if now is None else now
+        return (now - record.get('last_update', 0)) >= self.edit_interval
+
+    def mark_edited(self, chat_id, match_hash, state):
+        """Actualiza el estado tras una edición correcta."""
+        with self.lock:
+            record = self.records.get(self.key(chat_id, match_hash))
+            if record:
+                record['state'] = state
+                record['last_update'] = time.time()
+
+    def mark_attempted(self, chat_id, match_hash):
+        """Marca un intento fallido para no reintentar antes del siguiente intervalo."""
+        with self.lock:
+            record = self.records.get(self.key(chat_id, match_hash))
+            if record:
+                record['last_update'] = time.time()
+
+    def forget(self, chat_id, match_hash):
+        """Elimina el registro (p. ej. si el mensaje fue borrado del chat)."""
+        with self.lock:
+            self.records.pop(self.key(chat_id, match_hash), None)
+            self.forgotten.add(self.key(chat_id, match_hash))
@@ -0,0 +1,306 @@
+"""
+Tablero en memoria de los partidos de la última consulta, servido por HTTP local (solo lectura).
+Hasta ahora, para conocer el estado actual había que leer la exportación JSON (que se
+sobrescribe) o la salida de consola. El modo continuo mantiene aquí todos los partidos
+de la última consulta, indexados por liga, tramo de minutos y veredicto del filtro:
+- Cada consulta construye una vista nueva e inmutable y la publica cambiando una referencia:
+  las lecturas no toman bloqueos ni tocan disco, y nunca disparan una consulta a NowGoal.
+- Las respuestas se serializan una sola vez por vista y URL; las siguientes lecturas
+  devuelven los mismos bytes.
+- ETag derivado del contenido: si la tabla no cambió entre consultas, el ETag tampoco,
+  y un cliente con If-None-Match recibe 304 sin cuerpo.
+
+Rutas (GET o HEAD):
+    /matches?league=ENG PR&bucket=30-44&verdict=alerta&min_minute=30&max_minute=60
+        league se puede repetir; bucket: 0-14, 15-29, ..., 75-89, 90+ o sin_minuto;
+        verdict: alerta o descartado.
+    /summary   recuento por liga, tramo y veredicto
+    /health    versión y antigüedad del tablero
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from match_parsing import new_match_info
+from momentum import INDICATOR_FIELDS
+from structured_log import get_logger
+
+log = get_logger("board")
+
+BUCKET_SIZE = 15
+LAST_BUCKET = 90
+NO_MINUTE_BUCKET = "sin_minuto"
+VERDICTS = ("alerta", "descartado")
+BOARD_FIELDS = ('match_id', 'match_hash') + tuple(new_match_info('')) + ('filter_reason',) + INDICATOR_FIELDS
+QUERY_PARAMS = ('league', 'bucket', 'verdict', 'min_minute', 'max_minute')
+# Respuestas distintas guardadas por vista (URLs con filtros diferentes)
+MAX_CACHED_RESPONSES = 256
+
+
+def minute_bucket(minute):
+    """Tramo de 15 minutos ("30-44", "90+") de un minuto, o "sin_minuto"."""
+    if minute is None:
+        return NO_MINUTE_BUCKET
+    if minute >= LAST_BUCKET:
+        return f"{LAST_BUCKET}+"
+    start = minute // BUCKET_SIZE * BUCKET_SIZE
+    return f"{start}-{start + BUCKET_SIZE - 1}"
+
+
+def _parse_minute(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class BoardQueryError(ValueError):
+    """Parámetro de consulta no válido (respuesta 400)."""
+
+
+class _BoardView:
+    """Vista inmutable del tablero en una consulta, con sus índices y respuestas ya serializadas."""
+
+    __slots__ = ('version', 'updated_at', 'etag', 'records', 'minutes', 'by_league', 'by_bucket',
+                 'by_verdict', 'responses')
+
+    def __init__(self, version, updated_at, records, etag):
+        self.version = version
+        self.updated_at = updated_at
+        self.etag = etag
+        self.records = records
+        self.minutes = [_parse_minute(record['minute_actual']) for record in records]
+        self.by_league = {}
+        self.by_bucket = {}
+        self.by_verdict = {}
+        for position, record in enumerate(records):
+            self.by_league.setdefault(record['league'], []).append(position)
+            self.by_bucket.setdefault(record['bucket'], []).append(position)
+            self.by_verdict.setdefault(record['verdict'], []).append(position)
+        self.responses = {}
+
+
+class LiveBoard:
+    """Partidos de la última consulta, indexados para leerlos sin bloqueos."""
+
+    def __init__(self):
+        self.view = _BoardView(0, None, [], '"0"')
+        self.lock = threading.Lock()  # solo entre escritores
+
+    def update(self, matches, alerts, now=None):
+        """
+        Publica los partidos de una consulta.
+
+        Args:
+            matches (list): Todos los partidos ya filtrados (con match_id, match_hash y filter_reason).
+            alerts (list): Los que cumplen el criterio.
+
+        Returns:
+            bool: True si el contenido cambió (nueva versión y nuevo ETag).
+        """
+        alert_hashes = {match.get('match_hash') for match in alerts}
+        records = []
+        for match in matches:
+            record = {field: match.get(field) for field in BOARD_FIELDS}
+            record['bucket'] = minute_bucket(_parse_minute(match.get('minute_actual')))
+            record['verdict'] = VERDICTS[0] if match.get('match_hash') in alert_hashes else VERDICTS[1]
+            records.append(record)
+        records.sort(key=lambda r: (r['league'] or '', _parse_minute(r['minute_actual']) or -1,
+                                    r['home_team'] or ''))
+        digest = hashlib.md5(json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        etag = f'"{digest.hexdigest()[:20]}"'
+
+        with self.lock:
+            if etag == self.view.etag:
+                return False
+            now = time.time() if now is None else now
+            self.view = _BoardView(self.view.version + 1, now, records, etag)
+        log.debug("🗂️ Tablero v%s: %s partidos, %s alertas", self.view.version, len(records), len(alert_hashes))
+        return True
+
+    @staticmethod
+    def _select(view, league=None, bucket=None, verdict=None, min_minute=None, max_minute=None):
+        """Posiciones de los partidos que cumplen los filtros, en el orden del tablero."""
+        candidates = None
+        for index, values in ((view.by_league, league), (view.by_bucket, bucket), (view.by_verdict, verdict)):
+            if not values:
+                continue
+            positions = set()
+            for value in values:
+                positions.update(index.get(value, ()))
+            candidates = positions if candidates is None else candidates & positions
+        positions = range(len(view.records)) if candidates is None else sorted(candidates)
+        if min_minute is None and max_minute is None:
+            return list(positions)
+        low = -1 if min_minute is None else min_minute
+        high = float('inf') if max_minute is None else max_minute
+        return [p for p in positions if view.minutes[p] is not None and low <= view.minutes[p] <= high]
+
+    def query(self, league=None, bucket=None, verdict=None, min_minute=None, max_minute=None):
+        """
+        Partidos del tablero que cumplen todos los filtros indicados.
+
+        Args:
+            league (list): Ligas admitidas.
+            bucket (list): Tramos de minutos admitidos (minute_bucket).
+            verdict (list): "alerta" y/o "descartado".
+            min_minute (int): Minuto mínimo.
+            max_minute (int): Minuto máximo.
+
+        Returns:
+            list: Registros del tablero (no modificar: son compartidos).
+        """
+        view = self.view
+        positions = self._select(view, league, bucket, verdict, min_minute, max_minute)
+        return [view.records[p] for p in positions]
+
+    def summary(self, view=None):
+        """Recuento de partidos por liga, tramo y veredicto."""
+        view = view or self.view
+        return {
+            'version': view.version,
+            'updated_at': view.updated_at,
+            'matches': len(view.records),
+            'leagues': {league: len(p) for league, p in sorted(view.by_league.items())},
+            'buckets': {bucket: len(p) for bucket, p in sorted(view.by_bucket.items())},
+            'verdicts': {verdict: len(p) for verdict, p in sorted(view.by_verdict.items())},
+        }
+
+    @staticmethod
+    def parse_query(query_string):
+        """Filtros de la URL de /matches. Lanza BoardQueryError si alguno no es válido."""
+        params = parse_qs(query_string, keep_blank_values=False)
+        unknown = set(params) - set(QUERY_PARAMS)
+        if unknown:
+            raise BoardQueryError(f"parámetros desconocidos: {', '.join(sorted(unknown))}")
+        filters = {key: params.get(key) for key in ('league', 'bucket', 'verdict')}
+        for verdict in filters['verdict'] or ():
+            if verdict not in VERDICTS:
+                raise BoardQueryError(f"verdict debe ser uno de {list(VERDICTS)}")
+        for key in ('min_minute', 'max_minute'):
+            value = params.get(key, [None])[-1]
+            filters[key] = None if value is None else _parse_minute(value)
+            if value is not None and filters[key] is None:
+                raise BoardQueryError(f"{key} debe ser un entero")
+        return filters
+
+    def response(self, path, query_string=""):
+        """
+        Cuerpo JSON de una ruta, serializado una sola vez por vista y URL.
+
+        Returns:
+            tuple: (ETag, bytes), o None si la ruta no existe.
+
+        Raises:
+            BoardQueryError: Si los filtros de /matches no son válidos.
+        """
+        view = self.view
+        cache_key = (path, query_string)
+        cached = view.responses.get(cache_key)
+        if cached is not None:
+            return view.etag, cached
+
+        if path == '/matches':
+            filters = self.parse_query(query_string)
+            records = [view.records[p] for p in self._select(view, **filters)]
+            body = {'version': view.version, 'updated_at': view.updated_at, 'count': len(records),
+                    'matches': records}
+        elif path == '/summary':
+            body = self.summary(view)
+        elif path == '/health':
+            age = None if view.updated_at is None else round(time.time() - view.updated_at, 1)
+            # La antigüedad cambia en cada lectura: no se guarda ni lleva ETag
+            return None, json.dumps({'version': view.version, 'age_seconds': age}).encode('utf-8')
+        else:
+            return None
+
+        data = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(view.responses) >= MAX_CACHED_RESPONSES:
+            view.responses.clear()
+        view.responses[cache_key] = data
+        return view.etag, data
+
+
+class BoardServer:
+    """Servidor HTTP local de solo lectura del tablero, en un hilo de fondo."""
+
+    def __init__(self, board, host="127.0.0.1", port=8780):
+        """
+        Args:
+            board (LiveBoard): Tablero a servir.
+            host (str): Interfaz de escucha (por defecto solo local).
+            port (int): Puerto (0 = uno libre).
+        """
+        self.board = board
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}/"
+        self.thread = None
+
+    @classmethod
+    def from_env(cls, board, port=None):
+        """Servidor según BOARD_HOST y BOARD_PORT (o el puerto indicado). None si está desactivado."""
+        if port is None:
+            port = os.getenv('BOARD_PORT', '')
+        if port in ('', None):
+            return None
+        return cls(board, host=os.getenv('BOARD_HOST', '127.0.0.1'), port=int(port))
+
+    def _handler(self):
+        board = self.board
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body=b"", etag=None, head=False):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-cache")
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+            def _serve(self, head):
+                url = urlparse(self.path)
+                try:
+                    result = board.response(url.path.rstrip('/') or '/summary', url.query)
+                except BoardQueryError as e:
+                    self._send(400, json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8'), head=head)
+                    return
+                if result is None:
+                    self._send(404, b'{"error":"ruta desconocida"}', head=head)
+                    return
+                etag, body = result
+                if_none_match = self.headers.get('If-None-Match')
+                if etag and if_none_match and (if_none_match.strip() == '*'
+                                               or etag in (tag.strip() for tag in if_none_match.split(','))):
+                    self._send(304, etag=etag, head=True)
+                    return
+                self._send(200, body, etag=etag, head=head)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def log_message(self, format, *args):
+                log.debug("🌐 %s %s", self.address_string(), format % args)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="board", daemon=True)
+        self.thread.start()
+        log.info("🗂️ Tablero en vivo en %smatches", self.url)
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,90 +1,384 @@
 #!/usr/bin/env python3
 """
-NowGoal Scraper Optimizado para GitHub Actions
+NowGoal Scraper - línea de comandos unificada
 Extrae datos de partidos en vivo y envía alertas a Telegram
+
+Uso:
+    python main.py                      # igual que `run` (una ejecución completa)
+    python main.py run --backend cdp --profile
+    python main.py daemon --interval 60
+    python main.py daemon --board-port 8780  # + tablero en vivo en http://127.0.0.1:8780/matches
+    python main.py coordinator --shards 4   # + 4 procesos `python main.py worker`
+    python main.py sources nowgoal exports/otra_fuente.ndjson
+    python main.py history stats
+    python main.py history clean --hours 12
+    python main.py history reset --yes
+    python main.py replay nowgoal_matches_losing_with_corner_advantage.json
+    python main.py bench telegram --chats 5
+
+Los módulos pesados (Selenium, webdriver_manager, requests) solo se importan
+en los subcomandos que los necesitan: `history` arranca en milisegundos.
 """
 
 import os
 import sys
-import time
-import json
-import logging
-from datetime import datetime
-from config import validate_config, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, DEBUG_MODE, HEADLESS_MODE
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.DEBUG if DEBUG_MODE else logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scraper.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-logger = logging.getLogger(__name__)
-
-def main():
-    """Función principal del scraper"""
+import copy
+import argparse
+
+from structured_log import get_logger, setup_logging, shutdown_logging
+
+log = get_logger("scraper")
+
+BENCHMARKS = {
+    'backends': 'bench_backends',
+    'extraction': 'bench_extraction',
+    'rendering': 'bench_rendering',
+    'telegram': 'bench_telegram',
+}
+
+def build_scraper(args):
+    """
+    Crea el NowGoalScraper con las opciones comunes de run/daemon/replay.
+    Los filtros e intervalos salen de scraper_config.json (o del entorno); las opciones
+    indicadas en la línea de comandos tienen prioridad al arrancar.
+    """
+    # Importación tardía: solo los subcomandos que procesan partidos pagan este coste
+    from telegram import NowGoalScraper
+    from profiling import RunProfiler
+    from config import ConfigWatcher
+
+    watcher = ConfigWatcher(getattr(args, 'config', None))
+    config = copy.deepcopy(watcher.config)
+    for key in ('min_minute', 'max_minute', 'min_corners'):
+        if getattr(args, key) is None:
+            setattr(args, key, config['filters'][key])
+        config['filters'][key] = getattr(args, key)
+    for key, option in (('base_interval', 'interval'), ('min_interval', 'min_interval')):
+        if hasattr(args, option) and getattr(args, option) is None:
+            setattr(args, option, config['polling'][key])
+
+    # Headless en GitHub Actions, con ventana en local (salvo --headless)
+    headless = args.headless or os.getenv('GITHUB_ACTIONS', 'false').lower() == 'true'
+    scraper = NowGoalScraper(
+        headless=headless,
+        min_minute=args.min_minute,
+        max_minute=args.max_minute,
+        min_corners=args.min_corners,
+        backend=getattr(args, 'backend', None),
+        profiler=RunProfiler.from_env(getattr(args, 'profile', None)),
+    )
+    scraper.apply_config(config)
+    scraper.config_watcher = watcher
+    return scraper
+
+
+def build_scheduler(args, scraper):
+    """Planificador adaptativo con los intervalos de la configuración (None con --fixed)."""
+    if args.fixed:
+        return None
+    from scheduler import AdaptivePollScheduler
+
+    polling = scraper.config_watcher.config['polling']
+    scheduler = AdaptivePollScheduler.from_env(args.min_minute, args.max_minute, base_interval=args.interval)
+    scheduler.configure(fast_interval=polling['fast_interval'], heartbeat_interval=polling['heartbeat_interval'])
+    return scheduler
+
+
+def start_board(args, scraper):
+    """Tablero en vivo por HTTP local (--board-port o BOARD_PORT). None si está desactivado."""
+    from live_board import BoardServer, LiveBoard
+
+    board = LiveBoard()
+    server = BoardServer.from_env(board, args.board_port)
+    if server is None:
+        return None
+    scraper.board = board
+    return server.start()
+
+
+def print_banner(scraper):
+    print("=" * 50)
+    print("   WEB SCRAPER NOWGOAL.COM")
+    print(f"   (Equipo perdiendo por máximo {scraper.max_goal_deficit} gol(es) con ≥{scraper.min_corners} córners, "
+          f"Min. {scraper.min_minute}-{scraper.max_minute})")
+    print("=" * 50)
+
+
+def cmd_run(args):
+    """Una ejecución completa: abrir navegador, extraer, filtrar, exportar y enviar."""
+    scraper = build_scraper(args)
+    print_banner(scraper)
+    scraper.run_scraping(export_json=not args.no_export, send_telegram=not args.no_telegram)
+    log.info("\n🎉 Proceso completado!")
+    return 0
+
+
+def cmd_daemon(args):
+    """Consulta la tabla en bucle con el navegador abierto."""
+    scraper = build_scraper(args)
+    print_banner(scraper)
+    scheduler = build_scheduler(args, scraper)
+    board = start_board(args, scraper)
     try:
-        logger.info("🚀 Iniciando NowGoal Scraper...")
-        logger.info(f"📅 Fecha y hora: {datetime.now()}")
-        logger.info(f"🔧 Modo debug: {DEBUG_MODE}")
-        logger.info(f"🔧 Modo headless: {HEADLESS_MODE}")
-        
-        # Validar configuración
-        validate_config()
-        logger.info("✅ Configuración validada correctamente")
-        
-        # Importar el scraper (importación tardía para evitar errores de dependencias)
-        try:
-            from nowgoal_scraper import NowGoalScraper
-        except ImportError:
-            logger.error("❌ No se pudo importar NowGoalScraper")
-            # Si no existe, usar una versión simplificada
-            run_simple_test()
-            return
-        
-        # Ejecutar scraper
-        scraper = NowGoalScraper(headless=HEADLESS_MODE)
-        matches = scraper.run_scraping(export_json=True)
-        
-        if matches:
-            logger.info(f"✅ Scraping completado. Se encontraron {len(matches)} partidos")
-            
-            # Aquí puedes agregar lógica adicional para procesar los partidos
-            # y enviar alertas específicas a Telegram
-            
-        else:
-            logger.warning("⚠️ No se encontraron partidos")
-            
-    except Exception as e:
-        logger.error(f"❌ Error durante la ejecución: {e}")
-        sys.exit(1)
-
-def run_simple_test():
-    """Ejecuta una prueba simple para verificar que todo funciona"""
-    logger.info("🧪 Ejecutando prueba simple...")
-    
-    # Probar conexión a Telegram
-    import requests
-    
-    test_message = f"🧪 **Prueba de NowGoal Scraper**\\n📅 {datetime.now()}\\n✅ GitHub Actions funcionando correctamente"
-    
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    params = {
-        'chat_id': TELEGRAM_CHAT_ID,
-        'text': test_message,
-        'parse_mode': 'MarkdownV2'
-    }
-    
+        scraper.run_daemon(
+            interval=args.interval,
+            scheduler=scheduler,
+            min_interval=args.min_interval,
+            max_polls=args.max_polls,
+            export_json=not args.no_export,
+            send_telegram=not args.no_telegram,
+            pipelined=not args.sequential,
+        )
+    finally:
+        if board is not None:
+            board.close()
+    return 0
+
+
+def cmd_coordinator(args):
+    """Reparte cada consulta por ligas entre los workers y une sus resultados."""
+    from sharding import WorkTable, run_coordinator
+
+    scraper = build_scraper(args)
+    print_banner(scraper)
+    scheduler = build_scheduler(args, scraper)
+    board = start_board(args, scraper)
     try:
-        response = requests.get(url, params=params, timeout=30)
-        if response.status_code == 200:
-            logger.info("✅ Mensaje de prueba enviado a Telegram correctamente")
+        run_coordinator(
+            scraper,
+            WorkTable(args.db, lease=args.lease),
+            shard_count=args.shards,
+            interval=args.interval,
+            min_interval=args.min_interval,
+            poll_timeout=args.poll_timeout,
+            max_polls=args.max_polls,
+            export_json=not args.no_export,
+            send_telegram=not args.no_telegram,
+            scheduler=scheduler,
+        )
+    finally:
+        if board is not None:
+            board.close()
+    return 0
+
+
+def cmd_worker(args):
+    """Procesa las ligas que le asigna el coordinador."""
+    from sharding import WorkTable, run_worker
+
+    scraper = build_scraper(args)
+    run_worker(scraper, WorkTable(args.db, lease=args.lease), worker_id=args.worker_id, max_tasks=args.max_tasks)
+    return 0
+
+
+def cmd_sources(args):
+    """Consulta varias fuentes en paralelo y procesa los partidos fusionados."""
+    from sources import BrowserSource, RecordedFileSource, SourceMerger, run_sources
+
+    scraper = build_scraper(args)
+    print_banner(scraper)
+    sources = []
+    for spec in args.sources:
+        if spec == 'nowgoal':
+            sources.append(BrowserSource(scraper))
+        elif os.path.exists(spec):
+            sources.append(RecordedFileSource(spec))
         else:
-            logger.error(f"❌ Error al enviar mensaje: {response.status_code} - {response.text}")
+            log.error("❌ Fuente desconocida: %s (usa 'nowgoal' o la ruta de una exportación)", spec)
+            return 1
+    scheduler = build_scheduler(args, scraper)
+    board = start_board(args, scraper)
+    try:
+        run_sources(
+            scraper,
+            SourceMerger(sources, scraper.canonical, timeout=args.source_timeout),
+            interval=args.interval,
+            min_interval=args.min_interval,
+            max_polls=args.max_polls,
+            export_json=not args.no_export,
+            send_telegram=not args.no_telegram,
+            scheduler=scheduler,
+        )
+    finally:
+        if board is not None:
+            board.close()
+    return 0
+
+
+def cmd_replay(args):
+    """Reprocesa partidos grabados sin abrir el navegador."""
+    from sources import load_recorded_matches
+
+    try:
+        matches = load_recorded_matches(args.file)
+    except (OSError, ValueError) as e:
+        print(f"❌ No se pudo leer {args.file}: {e}")
+        return 1
+    print(f"📼 Reproduciendo {len(matches)} partidos de {args.file}")
+    scraper = build_scraper(args)
+    filtered = scraper.replay_matches(matches, export_json=args.export, send_telegram=args.send_telegram)
+    log.info("\n🎉 %s partidos cumplen el criterio", len(filtered))
+    return 0
+
+
+def cmd_history(args):
+    """Gestión no interactiva del historial de partidos enviados."""
+    import manage_duplicates
+
+    if args.action == 'stats':
+        manage_duplicates.show_statistics(args.file, exports_dir=args.exports or None, top=args.top)
+    elif args.action == 'show':
+        manage_duplicates.show_current_history(args.file, limit=args.limit)
+    elif args.action == 'clean':
+        manage_duplicates.clean_old_records(args.hours, args.file)
+    elif args.action == 'reset':
+        if not args.yes:
+            print("❌ Operación cancelada: usa --yes para confirmar el reseteo del historial")
+            return 1
+        manage_duplicates.reset_history(True, args.file)
+    return 0
+
+
+def cmd_bench(args):
+    """Ejecuta uno de los benchmarks con sus propios argumentos."""
+    import importlib
+
+    module = importlib.import_module(BENCHMARKS[args.name])
+    sys.argv = [f"{module.__name__}.py"] + args.bench_args
+    return module.main() or 0
+
+
+def add_filter_arguments(parser):
+    parser.add_argument("--config", help="Archivo de configuración (equivale a SCRAPER_CONFIG, por defecto scraper_config.json)")
+    parser.add_argument("--min-minute", type=int, help="Por defecto el de la configuración (30)")
+    parser.add_argument("--max-minute", type=int, help="Por defecto el de la configuración (60)")
+    parser.add_argument("--min-corners", type=int,
+                        help="Córners mínimos del equipo que va perdiendo")
+
+
+def add_scraping_arguments(parser):
+    add_filter_arguments(parser)
+    parser.add_argument("--backend", choices=['selenium', 'cdp'],
+                        help="Backend del navegador (equivale a SCRAPER_BACKEND)")
+    parser.add_argument("--headless", action="store_true", help="Navegador sin ventana")
+    parser.add_argument("--profile", nargs='?', const='cprofile', choices=['cprofile', 'sampling'],
+                        help="Perfila la ejecución (equivale a SCRAPER_PROFILE)")
+    parser.add_argument("--no-telegram", action="store_true", help="No enviar alertas a Telegram")
+    parser.add_argument("--no-export", action="store_true", help="No exportar JSON/NDJSON")
+
+
+def add_board_arguments(parser):
+    parser.add_argument("--board-port", type=int,
+                        help="Servir el tablero en vivo por HTTP local en este puerto (equivale a BOARD_PORT)")
+
+
+def add_shard_arguments(parser):
+    parser.add_argument("--db", help="Tabla de trabajo SQLite compartida (equivale a SHARD_DB, por defecto shards.db)")
+    parser.add_argument("--lease", type=float,
+                        help="Segundos antes de reasignar una tarea sin terminar (equivale a SHARD_LEASE)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Web scraper NowGoal.com con alertas a Telegram")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run = subparsers.add_parser("run", help="Una ejecución completa (por defecto)")
+    add_scraping_arguments(run)
+    run.set_defaults(func=cmd_run)
+
+    daemon = subparsers.add_parser("daemon", help="Consultar en bucle con el navegador abierto")
+    add_scraping_arguments(daemon)
+    daemon.add_argument("--interval", type=float,
+                        help="Segundos entre consultas (intervalo base del planificador adaptativo; por defecto el de la configuración)")
+    daemon.add_argument("--fixed", action="store_true", help="Intervalo fijo, sin planificador adaptativo")
+    daemon.add_argument("--min-interval", type=float, help="Segundos mínimos entre consultas (por defecto 5)")
+    daemon.add_argument("--max-polls", type=int, help="Salir tras N consultas")
+    daemon.add_argument("--sequential", action="store_true",
+                        help="Filtrar y enviar en el mismo hilo que la extracción (sin ejecución en cadena)")
+    add_board_arguments(daemon)
+    daemon.set_defaults(func=cmd_daemon)
+
+    coordinator = subparsers.add_parser("coordinator", help="Repartir las ligas de cada consulta entre workers")
+    add_scraping_arguments(coordinator)
+    add_shard_arguments(coordinator)
+    coordinator.add_argument("--shards", type=int, default=0, help="Shards por consulta (0 = uno por worker activo)")
+    coordinator.add_argument("--interval", type=float,
+                             help="Segundos entre consultas (intervalo base del planificador adaptativo; por defecto el de la configuración)")
+    coordinator.add_argument("--fixed", action="store_true", help="Intervalo fijo, sin planificador adaptativo")
+    coordinator.add_argument("--min-interval", type=float, help="Segundos mínimos entre consultas (por defecto 5)")
+    coordinator.add_argument("--poll-timeout", type=float, help="Espera máxima de los shards de una consulta")
+    coordinator.add_argument("--max-polls", type=int, help="Salir tras N consultas")
+    add_board_arguments(coordinator)
+    coordinator.set_defaults(func=cmd_coordinator)
+
+    worker = subparsers.add_parser("worker", help="Extraer las ligas asignadas por el coordinador")
+    add_scraping_arguments(worker)
+    add_shard_arguments(worker)
+    worker.add_argument("--worker-id", help="Nombre del worker (por defecto <host>-<pid>)")
+    worker.add_argument("--max-tasks", type=int, help="Salir tras N tareas")
+    worker.set_defaults(func=cmd_worker)
+
+    sources = subparsers.add_parser("sources", help="Fusionar varias fuentes de partidos consultadas en paralelo")
+    add_scraping_arguments(sources)
+    sources.add_argument("sources", nargs='+', metavar="fuente",
+                         help="'nowgoal' (navegador) o ruta de una exportación JSON/NDJSON grabada")
+    sources.add_argument("--interval", type=float,
+                         help="Segundos entre consultas (intervalo base del planificador adaptativo; por defecto el de la configuración)")
+    sources.add_argument("--fixed", action="store_true", help="Intervalo fijo, sin planificador adaptativo")
+    sources.add_argument("--min-interval", type=float, help="Segundos mínimos entre consultas (por defecto 5)")
+    sources.add_argument("--max-polls", type=int, help="Salir tras N consultas")
+    sources.add_argument("--source-timeout", type=float,
+                         help="Espera máxima por fuente en cada consulta (equivale a SOURCE_TIMEOUT)")
+    add_board_arguments(sources)
+    sources.set_defaults(func=cmd_sources)
+
+    history = subparsers.add_parser("history", help="Historial de partidos enviados")
+    history.add_argument("action", choices=['stats', 'show', 'clean', 'reset'])
+    history.add_argument("--file", default="sent_matches.json", help="Archivo de historial")
+    history.add_argument("--hours", type=float, default=24, help="clean: horas de antigüedad a conservar")
+    history.add_argument("--limit", type=int, default=20, help="show: registros más recientes a mostrar (0 = todos)")
+    history.add_argument("--exports", default="exports",
+                         help="stats: carpeta NDJSON para ligas/estrategias ('' = no usar)")
+    history.add_argument("--top", type=int, default=10, help="stats: ligas, estrategias y alertas recientes a mostrar")
+    history.add_argument("--yes", "-y", action="store_true", help="reset: confirmar sin preguntar")
+    history.set_defaults(func=cmd_history)
+
+    replay = subparsers.add_parser("replay", help="Reprocesar una exportación JSON/NDJSON sin navegador")
+    replay.add_argument("file", help="Exportación JSON, NDJSON o NDJSON .gz")
+    add_filter_arguments(replay)
+    replay.add_argument("--send-telegram", action="store_true", help="Enviar también las alertas")
+    replay.add_argument("--export", action="store_true", help="Volver a exportar los partidos filtrados")
+    replay.set_defaults(func=cmd_replay, headless=True)
+
+    bench = subparsers.add_parser("bench", help="Benchmarks (backends, extraction, rendering, telegram)")
+    bench.add_argument("name", choices=sorted(BENCHMARKS))
+    bench.add_argument("bench_args", nargs=argparse.REMAINDER, help="Argumentos del benchmark")
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    """Función principal del scraper"""
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    # Sin subcomando se hace una ejecución completa (compatibilidad con `python main.py`)
+    if not argv or argv[0].startswith('-') and argv[0] not in ('-h', '--help'):
+        argv = ['run'] + argv
+    args = parser.parse_args(argv)
+    # Salida del scraper por la cola de logging (hilo escritor de fondo, ver structured_log.py)
+    setup_logging()
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        log.info("\n👋 Interrumpido")
+        return 130
     except Exception as e:
-        logger.error(f"❌ Error de conexión a Telegram: {e}")
+        log.error("❌ Error durante la ejecución: %s", e)
+        return 1
+    finally:
+        shutdown_logging()
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -6,8 +6,14 @@ Script de utilidad para gestionar el historial de partidos enviados
 import os
 import json
 import time
+import heapq
 from datetime import datetime
 
+from history_analytics import HistoryIndex, load_alert_metadata
+from state_files import FileLock, atomic_write_json, update_json
+
+SENT_MATCHES_FILE = "sent_matches.json"
+
 def show_duplicates_menu():
     """Muestra el menú de opciones para gestionar duplicados"""
     print("=" * 60)
@@ -20,9 +26,8 @@ def show_duplicates_menu():
     print("5. Salir")
     print("=" * 60)
 
-def load_sent_matches():
+def load_sent_matches(sent_matches_file=SENT_MATCHES_FILE):
     """Carga el archivo de partidos enviados"""
-    sent_matches_file = "sent_matches.json"
     try:
         if os.path.exists(sent_matches_file):
             with open(sent_matches_file, 'r', encoding='utf-8') as f:
@@ -32,20 +37,25 @@ def load_sent_matches():
         print(f"❌ Error al cargar archivo: {e}")
         return {}
 
-def save_sent_matches(sent_matches):
-    """Guarda el archivo de partidos enviados"""
-    sent_matches_file = "sent_matches.json"
+def save_sent_matches(sent_matches, sent_matches_file=SENT_MATCHES_FILE):
+    """Guarda el archivo de partidos enviados (escritura atómica bajo bloqueo)"""
     try:
-        with open(sent_matches_file, 'w', encoding='utf-8') as f:
-            json.dump(sent_matches, f, indent=2, ensure_ascii=False)
+        with FileLock(sent_matches_file):
+            atomic_write_json(sent_matches_file, sent_matches)
         return True
     except Exception as e:
         print(f"❌ Error al guardar archivo: {e}")
         return False
 
-def show_current_history():
-    """Muestra el historial actual"""
-    sent_matches = load_sent_matches()
+def show_current_history(sent_matches_file=SENT_MATCHES_FILE, limit=None):
+    """
+    Muestra el historial actual
+
+    Args:
+        sent_matches_file (str): Archivo de historial.
+        limit (int): Registros más recientes a mostrar (None = todos).
+    """
+    sent_matches = load_sent_matches(sent_matches_file)
     current_time = time.time()
     
     if not sent_matches:
@@ -55,8 +65,11 @@ def show_current_history():
     print(f"📋 Historial de partidos enviados ({len(sent_matches)} registros):")
     print("-" * 80)
     
-    # Ordenar por tiempo (más recientes primero)
-    sorted_matches = sorted(sent_matches.items(), key=lambda x: x[1], reverse=True)
+    # Ordenar por tiempo (más recientes primero); con límite solo se seleccionan los N últimos
+    if limit:
+        sorted_matches = heapq.nlargest(limit, sent_matches.items(), key=lambda x: x[1])
+    else:
+        sorted_matches = sorted(sent_matches.items(), key=lambda x: x[1], reverse=True)
     
     for i, (match_hash, timestamp) in enumerate(sorted_matches, 1):
         time_diff = current_time - timestamp
@@ -70,98 +83,124 @@ def show_current_history():
         date_str = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
         print(f"   {i:2d}. Hash: {match_hash[:12]}... | {date_str} (hace {time_str})")
 
-def clean_old_records():
-    """Limpia registros antiguos"""
-    sent_matches = load_sent_matches()
+def clean_old_records(hours_to_keep=None, sent_matches_file=SENT_MATCHES_FILE):
+    """
+    Limpia registros antiguos
+
+    Args:
+        hours_to_keep (float): Antigüedad máxima en horas. Si es None se pregunta al usuario.
+        sent_matches_file (str): Archivo de historial.
+    """
+    sent_matches = load_sent_matches(sent_matches_file)
     if not sent_matches:
         print("ℹ️ No hay registros para limpiar")
         return
     
     print("🧹 Limpieza de registros antiguos...")
-    print("¿Cuántas horas de antigüedad máximo? (por defecto 24): ", end="")
-    
-    try:
-        hours_input = input().strip()
-        hours_to_keep = int(hours_input) if hours_input else 24
-    except ValueError:
-        hours_to_keep = 24
+    if hours_to_keep is None:
+        print("¿Cuántas horas de antigüedad máximo? (por defecto 24): ", end="")
+        try:
+            hours_input = input().strip()
+            hours_to_keep = int(hours_input) if hours_input else 24
+        except ValueError:
+            hours_to_keep = 24
     
     current_time = time.time()
     cutoff_time = current_time - (hours_to_keep * 3600)
-    
-    original_count = len(sent_matches)
-    cleaned_matches = {}
-    
-    for match_hash, timestamp in sent_matches.items():
-        if timestamp > cutoff_time:
-            cleaned_matches[match_hash] = timestamp
-    
-    removed_count = original_count - len(cleaned_matches)
-    
-    if save_sent_matches(cleaned_matches):
-        print(f"✅ Limpieza completada: {removed_count} registros eliminados")
+    removed = []
+
+    def clean(current):
+        # Se limpia lo que haya en disco al tomar el bloqueo, no la copia leída antes
+        cleaned_matches = {h: ts for h, ts in current.items() if ts > cutoff_time}
+        removed.append(len(current) - len(cleaned_matches))
+        return cleaned_matches
+
+    try:
+        cleaned_matches = update_json(sent_matches_file, clean)
+        print(f"✅ Limpieza completada: {removed[0]} registros eliminados")
         print(f"📊 Registros restantes: {len(cleaned_matches)}")
-    else:
-        print("❌ Error al guardar los cambios")
+    except Exception as e:
+        print(f"❌ Error al guardar los cambios: {e}")
 
-def reset_history():
-    """Resetea completamente el historial"""
-    print("⚠️ ¿Estás seguro de que quieres resetear completamente el historial?")
-    print("   Esto eliminará TODOS los registros de partidos enviados.")
-    print("   (s/N): ", end="")
-    
-    response = input().strip().lower()
-    if response in ['s', 'si', 'sí', 'y', 'yes']:
-        sent_matches_file = "sent_matches.json"
+def reset_history(confirm=None, sent_matches_file=SENT_MATCHES_FILE):
+    """
+    Resetea completamente el historial
+
+    Args:
+        confirm (bool): Confirmación ya dada (p. ej. --yes). Si es None se pregunta al usuario.
+        sent_matches_file (str): Archivo de historial.
+    """
+    if confirm is None:
+        print("⚠️ ¿Estás seguro de que quieres resetear completamente el historial?")
+        print("   Esto eliminará TODOS los registros de partidos enviados.")
+        print("   (s/N): ", end="")
+        confirm = input().strip().lower() in ['s', 'si', 'sí', 'y', 'yes']
+
+    if confirm:
         try:
-            if os.path.exists(sent_matches_file):
-                os.remove(sent_matches_file)
-                print("✅ Historial reseteado completamente")
-            else:
-                print("ℹ️ No existe archivo de historial para resetear")
+            with FileLock(sent_matches_file):
+                if os.path.exists(sent_matches_file):
+                    os.remove(sent_matches_file)
+                    print("✅ Historial reseteado completamente")
+                else:
+                    print("ℹ️ No existe archivo de historial para resetear")
         except Exception as e:
             print(f"❌ Error al resetear: {e}")
     else:
         print("❌ Operación cancelada")
 
-def show_statistics():
-    """Muestra estadísticas del historial"""
-    sent_matches = load_sent_matches()
+def show_statistics(sent_matches_file=SENT_MATCHES_FILE, exports_dir="exports", top=10):
+    """
+    Muestra estadísticas del historial
+
+    Args:
+        sent_matches_file (str): Archivo de historial.
+        exports_dir (str): Exportaciones NDJSON de donde sacar liga y estrategia (None = no usar).
+        top (int): Ligas/estrategias y alertas recientes a mostrar.
+    """
+    sent_matches = load_sent_matches(sent_matches_file)
     if not sent_matches:
         print("📊 No hay estadísticas disponibles (historial vacío)")
         return
-    
+
+    metadata = load_alert_metadata(exports_dir, wanted=set(sent_matches)) if exports_dir else {}
+    index = HistoryIndex(sent_matches, metadata)
+    del sent_matches
     current_time = time.time()
-    timestamps = list(sent_matches.values())
-    
+
     # Estadísticas básicas
-    total_records = len(sent_matches)
-    oldest_time = min(timestamps)
-    newest_time = max(timestamps)
-    
-    oldest_age = (current_time - oldest_time) / 3600
-    newest_age = (current_time - newest_time) / 3600
-    
-    # Registros por hora (últimas 24 horas)
-    last_24h = current_time - (24 * 3600)
-    records_24h = sum(1 for ts in timestamps if ts > last_24h)
-    
+    oldest_age = (current_time - index.timestamps[0]) / 3600
+    newest_age = (current_time - index.timestamps[-1]) / 3600
+
     print("📊 ESTADÍSTICAS DEL HISTORIAL")
     print("-" * 40)
-    print(f"Total de registros: {total_records}")
-    print(f"Registros en últimas 24h: {records_24h}")
+    print(f"Total de registros: {len(index)}")
+    print(f"Registros en últimas 24h: {index.count_since(current_time - 24 * 3600)}")
     print(f"Registro más antiguo: {oldest_age:.1f} horas")
     print(f"Registro más reciente: {newest_age:.1f} horas")
-    
+    percentiles = index.age_percentiles((50, 90, 99), now=current_time)
+    print("Antigüedad p50/p90/p99: " + " / ".join(f"{hours:.1f}h" for hours in percentiles.values()))
+
     # Distribución por horas
     print("\n📈 Distribución por horas:")
-    for i in range(24):
-        hour_start = current_time - ((i + 1) * 3600)
-        hour_end = current_time - (i * 3600)
-        count = sum(1 for ts in timestamps if hour_start < ts <= hour_end)
+    for i, count in enumerate(index.hourly_counts(24, now=current_time)):
         if count > 0:
             print(f"   Hace {i}h: {count} registros")
 
+    if metadata:
+        print("\n🏆 Ligas con más alertas:")
+        for league, count in index.top_leagues(top):
+            print(f"   {count:6d}  {league}")
+        print("\n🎯 Alertas por estrategia:")
+        for strategy, count in index.top_strategies(top):
+            print(f"   {count:6d}  {strategy}")
+
+    print(f"\n🕒 Últimas {top} alertas:")
+    for match_hash, timestamp in index.recent(top):
+        league = metadata.get(match_hash, ("",))[0]
+        date_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"   {date_str}  {match_hash[:12]}...  {league}")
+
 def main():
     """Función principal del gestor"""
     while True:
@@ -0,0 +1,119 @@
+"""
+Lógica común para convertir los textos de una fila de #mintable en el diccionario de partido.
+La usan tanto el backend Selenium (telegram.py) como el backend CDP (cdp_driver.py),
+así ambos producen exactamente los mismos registros.
+"""
+
+import re
+
+_MINUTE_RE = re.compile(r'^\d+')
+_NEUTRAL_SUFFIX_RE = re.compile(r'\s*\(N\)\s*$')
+
+
+def new_match_info(current_league):
+    """Devuelve un partido vacío con todos los campos y sus valores por defecto."""
+    return {
+        'league': current_league,
+        'time': '', # Este campo se mantiene pero se omite en la salida detallada
+        'home_team': '',
+        'away_team': '',
+        'score': '',
+        'status': '',
+        'minute_actual': '',
+        'half_time_score': '',
+        'corners': '', # Mantener para referencia general (ej. "5-3" como texto raw)
+        'corners_home': '0', # Córners del equipo local
+        'corners_away': '0', # Córners del equipo visitante
+        'yellow_home': '0',
+        'yellow_away': '0',
+        'red_home': '0',
+        'red_away': '0',
+        'odds_full_time_home_win': '',
+        'odds_full_time_draw': '',
+        'odds_full_time_away_win': '',
+        'link': ''
+    }
+
+
+def clean_home_team(text):
+    """Quita el sufijo "(N)" (campo neutral) del equipo local."""
+    return _NEUTRAL_SUFFIX_RE.sub('', text.strip())
+
+
+def apply_status(match_info, status_text):
+    """Guarda el estado del partido y extrae el minuto numérico ('45' para el descanso)."""
+    status_text = status_text.strip()
+    match_info['status'] = status_text
+
+    # Extraer solo el número del minuto si existe, o '45' para HT
+    minute_match = _MINUTE_RE.match(status_text)
+    if minute_match:
+        match_info['minute_actual'] = minute_match.group(0)
+    elif status_text.lower() in ['ht', 'pausa', 'half-time']:
+        match_info['minute_actual'] = '45' # Medio tiempo se considera minuto 45
+
+
+def apply_corners(match_info, corners_text):
+    """Guarda el texto de córners ("5-3") y lo divide en local/visitante."""
+    corners_text = corners_text.strip()
+    match_info['corners'] = corners_text # Guarda el texto original completo (e.g., "5-3" or "-")
+
+    if '-' in corners_text: # Si el formato es "X-Y" (sin o con espacios)
+        parts = [p.strip() for p in corners_text.split('-')] # Divide por '-' y limpia espacios
+        if len(parts) == 2:
+            try:
+                home_c = int(parts[0])
+                away_c = int(parts[1])
+                match_info['corners_home'] = str(home_c)
+                match_info['corners_away'] = str(away_c)
+            except ValueError:
+                # Esto ocurre si "X" o "Y" no son números válidos (ej. "N/A-N/A"). Mantiene '0'.
+                pass
+    # Si el texto no es 'X-Y' ni '-', o está vacío, los valores corners_home/away permanecen '0'
+
+
+def apply_odds(match_info, odds_texts):
+    """Guarda las cuotas 1X2 si hay al menos tres valores."""
+    if len(odds_texts) >= 3:
+        match_info['odds_full_time_home_win'] = odds_texts[0].strip().replace(',', '.')
+        match_info['odds_full_time_draw'] = odds_texts[1].strip().replace(',', '.')
+        match_info['odds_full_time_away_win'] = odds_texts[2].strip().replace(',', '.')
+
+
+def is_valid_match(match_info):
+    """Una fila es un partido si tiene al menos un equipo o un marcador."""
+    return bool(match_info['home_team'] or match_info['away_team'] or match_info['score'])
+
+
+def build_match_info(raw, current_league):
+    """
+    Construye el partido a partir de los textos crudos de una fila
+    (los que devuelve el extractor JavaScript del backend CDP).
+    Los campos ausentes (None) se dejan con su valor por defecto.
+
+    Returns:
+        dict | None: El partido, o None si la fila no es un partido válido.
+    """
+    match_info = new_match_info(current_league)
+
+    if raw.get('time') is not None:
+        match_info['time'] = raw['time']
+    if raw.get('home_team') is not None:
+        match_info['home_team'] = clean_home_team(raw['home_team'])
+        match_info['link'] = raw.get('link') or ''
+    if raw.get('away_team') is not None:
+        match_info['away_team'] = raw['away_team'].strip()
+    if raw.get('score') is not None:
+        match_info['score'] = raw['score'].strip()
+    if raw.get('status') is not None:
+        apply_status(match_info, raw['status'])
+    if raw.get('half_time_score') is not None:
+        match_info['half_time_score'] = raw['half_time_score'].strip()
+    if raw.get('corners') is not None:
+        apply_corners(match_info, raw['corners'])
+    for field in ('yellow_home', 'yellow_away', 'red_home', 'red_away'):
+        if raw.get(field) is not None:
+            match_info[field] = raw[field].strip()
+    apply_odds(match_info, raw.get('odds') or [])
+
+    return match_info if is_valid_match(match_info) else None
@@ -0,0 +1,215 @@
+"""
+Indicadores de ritmo de córners por partido, actualizados en cada consulta.
+Los totales acumulados no distinguen 4 córners en los primeros minutos de 4 córners en
+los últimos 10; aquí cada partido guarda un búfer circular de tamaño fijo con muestras
+(minuto, córners local, córners visitante) de consultas sucesivas y calcula:
+- corners_per_10_home / corners_per_10_away: córners por cada 10 minutos de juego en la
+  ventana reciente (10 minutos por defecto, o lo observado si aún no hay tanto historial).
+- corner_trend: variación por cada 10 minutos de la diferencia de córners local - visitante
+  (positiva = el local aprieta, negativa = el visitante).
+- minutes_since_goal: minutos desde el último gol (desde el inicio si va 0-0; si el partido ya
+  tenía goles la primera vez que se vio, desde esa consulta, como cota inferior).
+Cada actualización es O(1): una muestra por minuto mostrado (la del mismo minuto se
+sobrescribe) y un puntero a la muestra de referencia que solo avanza. La memoria por partido
+es fija y los partidos que dejan de verse se olvidan.
+"""
+
+import time
+
+# Minutos de juego de la ventana reciente
+DEFAULT_WINDOW = 10
+# Muestras por partido: con una por minuto mostrado cubre la ventana y el descanso
+RING_SIZE = 16
+# Segundos sin ver un partido antes de olvidar su historial
+DEFAULT_STALE_AFTER = 30 * 60
+
+INDICATOR_FIELDS = ('corners_per_10_home', 'corners_per_10_away', 'corner_trend', 'minutes_since_goal')
+
+
+def _to_int(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_sample(match):
+    """(minuto, córners local, córners visitante, goles totales) de un partido en juego, o None."""
+    minute = _to_int(match.get('minute_actual', ''))
+    corners_home = _to_int(match.get('corners_home', '0'))
+    corners_away = _to_int(match.get('corners_away', '0'))
+    if minute is None or corners_home is None or corners_away is None:
+        return None
+    goals = None
+    score = match.get('score') or ''
+    if ' - ' in score:
+        home_goals, _, away_goals = score.partition(' - ')
+        home_goals, away_goals = _to_int(home_goals), _to_int(away_goals)
+        if home_goals is not None and away_goals is not None:
+            goals = home_goals + away_goals
+    return minute, corners_home, corners_away, goals
+
+
+class MatchMomentum:
+    """Historial de un partido en búferes circulares de tamaño fijo."""
+
+    __slots__ = ('size', 'window', 'minutes', 'corners_home', 'corners_away', 'count', 'ref',
+                 'goals', 'last_goal_minute', 'seen_at')
+
+    def __init__(self, size=RING_SIZE, window=DEFAULT_WINDOW):
+        self.size = size
+        self.window = window
+        self.minutes = [0] * size
+        self.corners_home = [0] * size
+        self.corners_away = [0] * size
+        self.count = 0      # muestras añadidas desde el inicio (la última está en (count - 1) % size)
+        self.ref = 0        # muestra de referencia de la ventana (número absoluto, como count)
+        self.goals = None
+        self.last_goal_minute = None
+        self.seen_at = 0.0
+
+    def reset(self):
+        self.count = 0
+        self.ref = 0
+        self.goals = None
+        self.last_goal_minute = None
+
+    def add(self, minute, corners_home, corners_away, goals, now):
+        """Añade la muestra de una consulta (O(1))."""
+        self.seen_at = now
+        if self.count:
+            last = (self.count - 1) % self.size
+            # Minuto o córners hacia atrás: otro partido con la misma clave o datos corregidos
+            if (minute < self.minutes[last] or corners_home < self.corners_home[last]
+                    or corners_away < self.corners_away[last]):
+                self.reset()
+
+        if goals is not None:
+            if self.goals is None:
+                # Primera observación: sin goles se cuenta desde el inicio; con goles, desde
+                # ahora (cota inferior: el último gol fue en este minuto o antes)
+                self.last_goal_minute = 0 if goals == 0 else minute
+            elif goals > self.goals:
+                self.last_goal_minute = minute
+            self.goals = goals
+
+        if self.count and self.minutes[(self.count - 1) % self.size] == minute:
+            slot = (self.count - 1) % self.size  # mismo minuto mostrado: se actualiza la última muestra
+        else:
+            slot = self.count % self.size
+            self.count += 1
+            if self.count - self.ref > self.size:
+                self.ref = self.count - self.size  # la referencia se sobrescribió
+        self.minutes[slot] = minute
+        self.corners_home[slot] = corners_home
+        self.corners_away[slot] = corners_away
+
+        # Referencia: la muestra más reciente con al menos `window` minutos de antigüedad
+        # (o la más antigua si todavía no hay tanto historial). Solo avanza: O(1) amortizado.
+        while (self.ref + 1 < self.count
+               and self.minutes[(self.ref + 1) % self.size] <= minute - self.window):
+            self.ref += 1
+
+    def samples(self):
+        """Muestras vigentes (desde la referencia de la ventana) en orden cronológico."""
+        return [(self.minutes[i % self.size], self.corners_home[i % self.size], self.corners_away[i % self.size])
+                for i in range(self.ref, self.count)]
+
+    def restore(self, samples, goals, last_goal_minute, seen_at):
+        """Carga el historial guardado por samples() (checkpoint.py)."""
+        self.reset()
+        for minute, corners_home, corners_away in samples[-self.size:]:
+            slot = self.count % self.size
+            self.minutes[slot] = minute
+            self.corners_home[slot] = corners_home
+            self.corners_away[slot] = corners_away
+            self.count += 1
+        self.goals = goals
+        self.last_goal_minute = last_goal_minute
+        self.seen_at = seen_at
+
+    def indicators(self):
+        """Indicadores actuales (None si aún no hay historial suficiente)."""
+        if not self.count:
+            return dict.fromkeys(INDICATOR_FIELDS)
+        last = (self.count - 1) % self.size
+        ref = self.ref % self.size
+        minute = self.minutes[last]
+        span = minute - self.minutes[ref]
+        result = {
+            'corners_per_10_home': None,
+            'corners_per_10_away': None,
+            'corner_trend': None,
+            'minutes_since_goal': None if self.last_goal_minute is None else minute - self.last_goal_minute,
+        }
+        if span > 0:
+            scale = self.window / span
+            home = self.corners_home[last] - self.corners_home[ref]
+            away = self.corners_away[last] - self.corners_away[ref]
+            result['corners_per_10_home'] = round(home * scale, 2)
+            result['corners_per_10_away'] = round(away * scale, 2)
+            result['corner_trend'] = round((home - away) * scale, 2)
+        return result
+
+
+class MomentumTracker:
+    """Indicadores de ritmo de todos los partidos seguidos."""
+
+    def __init__(self, window=DEFAULT_WINDOW, size=RING_SIZE, stale_after=DEFAULT_STALE_AFTER):
+        """
+        Args:
+            window (int): Minutos de juego de la ventana reciente.
+            size (int): Muestras guardadas por partido.
+            stale_after (float): Segundos sin ver un partido antes de olvidarlo.
+        """
+        self.window = window
+        self.size = max(2, size)
+        self.stale_after = stale_after
+        self.matches = {}
+        self.last_prune = 0.0
+
+    def update(self, key, match, now=None):
+        """
+        Añade la muestra de un partido y escribe sus indicadores en el propio diccionario.
+
+        Returns:
+            dict: Indicadores del partido (valores None si no está en juego o falta historial).
+        """
+        now = time.time() if now is None else now
+        sample = parse_sample(match)
+        if sample is None:
+            indicators = dict.fromkeys(INDICATOR_FIELDS)
+        else:
+            momentum = self.matches.get(key)
+            if momentum is None:
+                momentum = self.matches[key] = MatchMomentum(self.size, self.window)
+            momentum.add(*sample, now)
+            indicators = momentum.indicators()
+        match.update(indicators)
+        if now - self.last_prune > 60:
+            self.prune(now)
+        return indicators
+
+    def prune(self, now=None):
+        """Olvida los partidos que no se ven desde hace stale_after segundos."""
+        now = time.time() if now is None else now
+        self.last_prune = now
+        for key in [key for key, momentum in self.matches.items() if now - momentum.seen_at > self.stale_after]:
+            del self.matches[key]
+
+    def get_state(self):
+        """Historial de todos los partidos: clave -> (muestras, goles, minuto del último gol, visto)."""
+        return {key: (momentum.samples(), momentum.goals, momentum.last_goal_minute, momentum.seen_at)
+                for key, momentum in self.matches.items() if momentum.count}
+
+    def restore(self, state, now=None):
+        """Carga el historial de get_state(), sin los partidos ya olvidables."""
+        now = time.time() if now is None else now
+        for key, (samples, goals, last_goal_minute, seen_at) in state.items():
+            if now - seen_at > self.stale_after:
+                continue
+            momentum = self.matches[key] = MatchMomentum(self.size, self.window)
+            momentum.restore(samples, goals, last_goal_minute, seen_at)
+
+    def __len__(self):
+        return len(self.matches)
@@ -0,0 +1,178 @@
+"""
+Exportación en streaming a NDJSON (un objeto JSON compacto por línea).
+- Una línea por partido filtrado y una por resumen de ejecución.
+- El segmento activo se llama <prefijo>-<YYYYmmdd>.ndjson, así se puede seguir con `tail -F`.
+- Rotación por tamaño o por cambio de día; los segmentos cerrados se comprimen con gzip.
+- La escritura ocurre en un hilo de fondo: write() solo encola y nunca bloquea el scraping.
+"""
+
+import os
+import gzip
+import json
+import time
+import queue
+import shutil
+import threading
+
+from structured_log import get_logger
+
+log = get_logger("export")
+
+EXPORT_DIR = "exports"
+DEFAULT_PREFIX = "nowgoal"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+_CLOSE = object()
+_FLUSH = object()
+
+
+class NDJSONSink:
+    """Sink NDJSON con rotación, compresión y escritura asíncrona."""
+
+    def __init__(self, directory=EXPORT_DIR, prefix=DEFAULT_PREFIX, max_bytes=DEFAULT_MAX_BYTES,
+                 rotate_daily=True, compress=True, queue_size=10000):
+        """
+        Args:
+            directory (str): Carpeta de los segmentos.
+            prefix (str): Prefijo de los archivos.
+            max_bytes (int): Tamaño a partir del cual se rota el segmento activo.
+            rotate_daily (bool): Rotar también al cambiar el día (UTC).
+            compress (bool): Comprimir con gzip los segmentos cerrados.
+            queue_size (int): Registros pendientes máximos; si se llena se descartan y se cuentan.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.file = None
+        self.file_day = None
+        self.file_size = 0
+        self.writer = threading.Thread(target=self._run, daemon=True, name="ndjson-writer")
+        self.writer.start()
+
+    @classmethod
+    def from_env(cls):
+        """Crea el sink según EXPORT_NDJSON_DIR y EXPORT_NDJSON_MAX_MB."""
+        max_mb = float(os.getenv('EXPORT_NDJSON_MAX_MB', DEFAULT_MAX_BYTES / (1024 * 1024)))
+        return cls(directory=os.getenv('EXPORT_NDJSON_DIR', EXPORT_DIR), max_bytes=int(max_mb * 1024 * 1024))
+
+    def write(self, record):
+        """Encola un registro. No bloquea: si la cola está llena, el registro se descarta."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5):
+        """Espera a que se escriba todo lo encolado hasta ahora."""
+        done = threading.Event()
+        self.queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        """Escribe lo pendiente, cierra el segmento activo y detiene el hilo."""
+        if not self.writer.is_alive():
+            return
+        self.queue.put(_CLOSE)
+        self.writer.join(timeout)
+        if self.dropped:
+            log.warning("⚠️ Exportación NDJSON: %s registros descartados (cola llena)", self.dropped)
+
+    # --- Hilo de escritura ---
+
+    def _active_path(self, day):
+        return os.path.join(self.directory, f"{self.prefix}-{day}.ndjson")
+
+    def _open(self, day):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._active_path(day)
+        # Segmentos activos de días anteriores (p. ej. de una ejecución previa) se cierran ahora
+        if self.rotate_daily:
+            for name in os.listdir(self.directory):
+                stale = os.path.join(self.directory, name)
+                if (name.startswith(f"{self.prefix}-") and name.endswith('.ndjson')
+                        and len(name) == len(os.path.basename(path)) and stale != path):
+                    self._close_segment(stale)
+        self.file = open(path, 'a', encoding='utf-8')
+        self.file_day = day
+        self.file_size = self.file.tell()
+
+    def _rotate(self):
+        """Cierra el segmento activo y lo archiva."""
+        if self.file is None:
+            return
+        path = self.file.name
+        self.file.close()
+        self.file = None
+        self._close_segment(path)
+
+    def _close_segment(self, path):
+        """Renombra un segmento con marca de tiempo y lo comprime."""
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+            return
+        base = path[:-len('.ndjson')] + time.strftime('-%H%M%S', time.gmtime())
+        closed_path = base + '.ndjson'
+        sequence = 1
+        # Varias rotaciones en el mismo segundo no deben pisarse
+        while os.path.exists(closed_path) or os.path.exists(closed_path + '.gz'):
+            closed_path = f"{base}-{sequence}.ndjson"
+            sequence += 1
+        os.replace(path, closed_path)
+        if self.compress:
+            try:
+                with open(closed_path, 'rb') as src, gzip.open(closed_path + '.gz', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(closed_path)
+            except OSError as e:
+                log.warning("⚠️ Error al comprimir %s: %s", closed_path, e)
+
+    def _write_line(self, record):
+        day = time.strftime('%Y%m%d', time.gmtime())
+        if self.file is not None and (
+            (self.rotate_daily and day != self.file_day) or self.file_size >= self.max_bytes
+        ):
+            self._rotate()
+        if self.file is None:
+            self._open(day)
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+        self.file.write(line)
+        self.file_size += len(line.encode('utf-8'))
+        self.written += 1
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            # Procesar en lote todo lo que ya esté en cola y hacer un solo flush
+            batch = [item]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = False
+            for entry in batch:
+                if entry is _CLOSE:
+                    closing = True
+                elif isinstance(entry, tuple) and entry and entry[0] is _FLUSH:
+                    if self.file:
+                        self.file.flush()
+                    entry[1].set()
+                else:
+                    try:
+                        self._write_line(entry)
+                    except Exception as e:
+                        log.error("❌ Error al escribir exportación NDJSON: %s", e)
+
+            if self.file:
+                self.file.flush()
+            if closing:
+                if self.file:
+                    self.file.close()
+                    self.file = None
+                return
@@ -0,0 +1,134 @@
+"""
+Ejecución en cadena (productor/consumidor) de las etapas de una consulta.
+La extracción produce lotes de partidos y los entrega a una cola acotada; cada etapa
+(filtro + exportación + anti-duplicados, envío a Telegram) corre en su propio hilo y
+pasa su resultado a la cola de la siguiente.
+- Orden: un solo hilo por etapa, así los lotes se procesan en el orden en que se extrajeron
+  (necesario para el anti-duplicados y para editar las alertas en vivo).
+- Contrapresión: si una etapa va atrasada su cola se llena y la anterior (o la extracción)
+  espera en put() en lugar de acumular consultas viejas sin límite.
+Mientras se envían las alertas de una consulta, la extracción de la siguiente ya puede empezar.
+"""
+
+import time
+import queue
+import threading
+
+from structured_log import get_logger
+
+log = get_logger("pipeline")
+
+DEFAULT_QUEUE_SIZE = 2
+
+_STOP = object()
+
+
+class _Stage:
+    """Una etapa: cola de entrada acotada + hilo que la consume."""
+
+    def __init__(self, name, func, queue_size):
+        self.name = name
+        self.func = func
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0  # tiempo bloqueado entregando a la etapa siguiente
+        self.in_flight = 0  # lote sacado de la cola y aún no entregado a la etapa siguiente
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"pipeline-{name}")
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                if self.next is not None:
+                    self.next.queue.put(_STOP)
+                return
+            self.in_flight += 1
+            started_at = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                # Un lote fallido no detiene la cadena: se registra y se sigue con el siguiente
+                self.errors += 1
+                log.error("❌ Error en la etapa '%s': %s", self.name, e)
+                result = None
+            finally:
+                self.busy_seconds += time.perf_counter() - started_at
+                self.processed += 1
+            if result is not None and self.next is not None:
+                started_at = time.perf_counter()
+                self.next.queue.put(result)
+                self.wait_seconds += time.perf_counter() - started_at
+            self.in_flight -= 1
+
+
+class StagePipeline:
+    """Cadena de etapas en hilos conectadas por colas acotadas."""
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            stages (list): Pares (nombre, función). Cada función recibe el resultado de la anterior
+                           y devuelve lo que se pasa a la siguiente (None = no seguir con ese lote).
+            queue_size (int): Lotes pendientes máximos por etapa.
+        """
+        self.stages = [_Stage(name, func, max(1, queue_size)) for name, func in stages]
+        for stage, following in zip(self.stages, self.stages[1:]):
+            stage.next = following
+        self.submitted = 0
+        self.submit_wait_seconds = 0.0
+        self.closed = False
+        for stage in self.stages:
+            stage.thread.start()
+
+    def submit(self, item):
+        """Entrega un lote a la primera etapa. Bloquea mientras su cola esté llena (contrapresión)."""
+        started_at = time.perf_counter()
+        self.stages[0].queue.put(item)
+        self.submit_wait_seconds += time.perf_counter() - started_at
+        self.submitted += 1
+
+    def pending(self):
+        """Lotes en cola o en curso en todas las etapas."""
+        return sum(stage.queue.qsize() + stage.in_flight for stage in self.stages)
+
+    def close(self, timeout=None):
+        """
+        Termina lo pendiente y detiene los hilos.
+
+        Args:
+            timeout (float): Espera máxima total (None = hasta que todo se haya enviado).
+
+        Returns:
+            bool: True si todas las etapas terminaron a tiempo.
+        """
+        if self.closed:
+            return True
+        self.closed = True
+        self.stages[0].queue.put(_STOP)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for stage in self.stages:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            stage.thread.join(remaining)
+        finished = not any(stage.thread.is_alive() for stage in self.stages)
+        if not finished:
+            log.warning("⚠️ Se abandonaron %s lotes pendientes al cerrar", self.pending())
+        return finished
+
+    def stats(self):
+        """Métricas por etapa para el resumen de la ejecución."""
+        return {
+            'submitted': self.submitted,
+            'submit_wait_seconds': round(self.submit_wait_seconds, 3),
+            'stages': {
+                stage.name: {
+                    'processed': stage.processed,
+                    'errors': stage.errors,
+                    'busy_seconds': round(stage.busy_seconds, 3),
+                    'wait_seconds': round(stage.wait_seconds, 3),
+                }
+                for stage in self.stages
+            },
+        }
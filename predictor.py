@@ -0,0 +1,208 @@
+"""
+Predicción de cuándo cada partido entra y sale de la ventana min_minute..max_minute.
+- Partidos en juego: se ancla el inicio real a partir del minuto mostrado (más fiable
+  que la hora programada si el partido empezó tarde).
+- Partidos sin empezar: se usa la hora de inicio de td[name="timeData"] (match['time'],
+  atributo data-t) más la compensación horaria KICKOFF_UTC_OFFSET.
+Las entradas y salidas previstas se guardan en una cola de eventos (heap) que el
+modo continuo consulta para programar una consulta justo en el minuto de entrada.
+"""
+
+import os
+import time
+import heapq
+import calendar
+
+HALF_TIME_BREAK = 15 * 60
+KICKOFF_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%Y-%m-%d %H:%M")
+# Partidos programados más allá de este margen no se planifican todavía
+MAX_LOOKAHEAD = 12 * 3600
+
+ENTRY = "entrada"
+EXIT = "salida"
+
+
+def elapsed_seconds(minute):
+    """Segundos reales desde el inicio hasta que el marcador muestra `minute` (descanso de 15 min)."""
+    if minute <= 45:
+        return (minute - 1) * 60
+    return (minute - 1) * 60 + HALF_TIME_BREAK
+
+
+def parse_kickoff(value, utc_offset_hours=0.0, now=None):
+    """
+    Convierte la hora de inicio de NowGoal a timestamp UTC.
+
+    Args:
+        value (str): "YYYY-mm-dd HH:MM:SS" (data-t) o solo "HH:MM" (texto de la celda).
+        utc_offset_hours (float): Desfase de la hora mostrada respecto a UTC.
+
+    Returns:
+        float | None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    offset = utc_offset_hours * 3600
+    for fmt in KICKOFF_FORMATS:
+        try:
+            return calendar.timegm(time.strptime(value, fmt)) - offset
+        except ValueError:
+            continue
+    # Solo hora: se asume el día actual (o el anterior/siguiente si queda a más de 12 h)
+    try:
+        parsed = time.strptime(value, "%H:%M")
+    except ValueError:
+        return None
+    now = time.time() if now is None else now
+    day_start = now - (now % 86400)
+    kickoff = day_start + parsed.tm_hour * 3600 + parsed.tm_min * 60 - offset
+    if kickoff - now > 12 * 3600:
+        kickoff -= 86400
+    elif now - kickoff > 12 * 3600:
+        kickoff += 86400
+    return kickoff
+
+
+class WindowPredictor:
+    """Índice de entradas/salidas previstas de la ventana, con cola de eventos."""
+
+    def __init__(self, min_minute=30, max_minute=60, utc_offset_hours=None):
+        """
+        Args:
+            min_minute (int): Minuto mínimo del filtro.
+            max_minute (int): Minuto máximo del filtro.
+            utc_offset_hours (float): Desfase de data-t respecto a UTC. Por defecto KICKOFF_UTC_OFFSET o 0.
+        """
+        self.min_minute = min_minute
+        self.max_minute = max_minute
+        if utc_offset_hours is None:
+            utc_offset_hours = float(os.getenv('KICKOFF_UTC_OFFSET', '0'))
+        self.utc_offset_hours = utc_offset_hours
+        self.kickoffs = {}      # clave del partido -> inicio estimado (timestamp)
+        self.predictions = {}   # clave del partido -> (entrada, salida)
+        self.events = {ENTRY: [], EXIT: []}  # un heap de (timestamp, clave) por tipo de evento
+
+    def set_window(self, min_minute, max_minute):
+        """
+        Cambia la ventana. Se conservan los inicios estimados; las predicciones y eventos
+        se recalculan en la siguiente observación.
+        """
+        self.min_minute = min_minute
+        self.max_minute = max_minute
+        self.predictions = {}
+        self.events = {ENTRY: [], EXIT: []}
+
+    def get_state(self):
+        """Ventana, inicios estimados y predicciones vigentes (checkpoint.py)."""
+        return {
+            'window': [self.min_minute, self.max_minute],
+            'kickoffs': dict(self.kickoffs),
+            'predictions': {key: list(prediction) for key, prediction in self.predictions.items()},
+        }
+
+    def restore(self, state, now=None):
+        """
+        Carga un estado de get_state() y reconstruye la cola de eventos. Las predicciones
+        solo se recuperan si la ventana no cambió y el partido aún no ha salido de ella.
+        """
+        now = time.time() if now is None else now
+        # Un partido empezado hace más de 3 h ya terminó
+        self.kickoffs.update((key, kickoff) for key, kickoff in state.get('kickoffs', {}).items()
+                             if kickoff > now - 3 * 3600)
+        if state.get('window') != [self.min_minute, self.max_minute]:
+            return
+        for key, (entry, exit_) in state.get('predictions', {}).items():
+            if exit_ <= now:
+                continue
+            self.predictions[key] = (entry, exit_)
+            if entry > now:
+                heapq.heappush(self.events[ENTRY], (entry, key))
+            heapq.heappush(self.events[EXIT], (exit_, key))
+
+    @staticmethod
+    def match_key(match):
+        return match.get('match_hash') or f"{match.get('home_team', '')}|{match.get('away_team', '')}|{match.get('league', '')}"
+
+    def _estimate_kickoff(self, match, now):
+        """Inicio real estimado: anclado al minuto en juego o a la hora programada."""
+        try:
+            minute = int(match.get('minute_actual', ''))
+        except (TypeError, ValueError):
+            minute = None
+        status = match.get('status', '').strip().lower()
+        if minute is not None and status not in ('ht', 'pausa', 'half-time'):
+            return now - elapsed_seconds(minute)
+        if minute is not None:
+            # En el descanso el minuto se queda en 45: conservar el ancla anterior si la hay
+            return self.kickoffs.get(self.match_key(match), now - elapsed_seconds(45))
+        if status:
+            return None  # Finalizado, aplazado, etc.
+        return parse_kickoff(match.get('time', ''), self.utc_offset_hours, now)
+
+    def observe(self, matches, now=None):
+        """
+        Actualiza las predicciones con una extracción y programa los eventos nuevos.
+        Los eventos de predicciones anteriores quedan obsoletos y se descartan al salir del heap.
+        """
+        now = time.time() if now is None else now
+        seen = set()
+        for match in matches:
+            key = self.match_key(match)
+            seen.add(key)
+            kickoff = self._estimate_kickoff(match, now)
+            if kickoff is None or kickoff - now > MAX_LOOKAHEAD:
+                self.kickoffs.pop(key, None)
+                self.predictions.pop(key, None)
+                continue
+            self.kickoffs[key] = kickoff
+            prediction = (kickoff + elapsed_seconds(self.min_minute), kickoff + elapsed_seconds(self.max_minute + 1))
+            previous = self.predictions.get(key)
+            # Reprogramar solo si la predicción se movió más de 30 s
+            if previous and abs(previous[0] - prediction[0]) < 30 and abs(previous[1] - prediction[1]) < 30:
+                continue
+            self.predictions[key] = prediction
+            if prediction[0] > now:
+                heapq.heappush(self.events[ENTRY], (prediction[0], key))
+            if prediction[1] > now:
+                heapq.heappush(self.events[EXIT], (prediction[1], key))
+
+        # Partidos que ya no aparecen en la tabla
+        for key in set(self.predictions) - seen:
+            self.predictions.pop(key, None)
+            self.kickoffs.pop(key, None)
+
+        # Compactar los heaps si acumulan demasiados eventos obsoletos
+        for kind, heap in self.events.items():
+            if len(heap) > 4 * len(self.predictions) + 64:
+                self.events[kind] = [e for e in heap if e[0] > now and self._is_current(kind, e)]
+                heapq.heapify(self.events[kind])
+
+    def _is_current(self, kind, event):
+        timestamp, key = event
+        prediction = self.predictions.get(key)
+        if prediction is None:
+            return False
+        return timestamp == (prediction[0] if kind == ENTRY else prediction[1])
+
+    def next_event(self, kind=ENTRY, now=None):
+        """
+        Devuelve el próximo evento vigente (timestamp, clave) del tipo pedido, o None.
+        Los eventos pasados u obsoletos se retiran del heap (O(log N) amortizado).
+        """
+        now = time.time() if now is None else now
+        heap = self.events[kind]
+        while heap and (heap[0][0] <= now or not self._is_current(kind, heap[0])):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def seconds_until_next_entry(self, now=None):
+        """Segundos hasta la próxima entrada prevista en la ventana, o None."""
+        now = time.time() if now is None else now
+        event = self.next_event(ENTRY, now)
+        return None if event is None else event[0] - now
+
+    def in_window_count(self, now=None):
+        """Partidos que, según la predicción, están ahora dentro de la ventana."""
+        now = time.time() if now is None else now
+        return sum(1 for entry, exit_ in self.predictions.values() if entry <= now < exit_)
@@ -0,0 +1,240 @@
+"""
+Perfilado opcional de las ejecuciones del scraper.
+Se activa con la variable de entorno SCRAPER_PROFILE o con la opción --profile:
+- SCRAPER_PROFILE=1 (o "cprofile"): cProfile determinista + muestreo de pilas + tracemalloc.
+- SCRAPER_PROFILE=sampling: solo muestreo de pilas + tracemalloc (menor sobrecarga).
+Cada ejecución genera en SCRAPER_PROFILE_DIR (por defecto "profiles/"):
+- <run>.pstats      -> estadísticas de cProfile (python -m pstats, snakeviz...)
+- <run>.collapsed   -> pilas colapsadas para flamegraph.pl / speedscope
+- <run>.memory.txt  -> principales asignaciones de memoria (tracemalloc)
+- <run>.summary.json-> tiempo y pico de memoria por etapa
+Desactivado, stage() devuelve un contexto vacío compartido: la sobrecarga es prácticamente nula.
+Con etapas en varios hilos (modo con cadena filtro -> envío), cProfile solo perfila una etapa a
+la vez y el pico de memoria solo se registra para las etapas que no se solaparon con otro hilo
+(tracemalloc.reset_peak() es global al proceso).
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from structured_log import get_logger
+
+log = get_logger("profile")
+
+PROFILE_DIR = "profiles"
+SAMPLING_INTERVAL = 0.005  # segundos entre muestras de pila
+
+_NULL_STAGE = nullcontext()
+
+
+class _StackSampler(threading.Thread):
+    """Hilo que muestrea periódicamente las pilas de los hilos que están dentro de una etapa."""
+
+    def __init__(self, profiler, interval):
+        super().__init__(daemon=True, name="profiler-sampler")
+        self.profiler = profiler
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.counts = {}
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            active = dict(self.profiler.active_stages)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, stages in active.items():
+                frame = frames.get(ident)
+                if frame is None or ident == own_ident or not stages:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(stages[-1])
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=1)
+
+
+class RunProfiler:
+    """Perfilador por ejecución con etapas nombradas."""
+
+    def __init__(self, mode=None, output_dir=None, interval=SAMPLING_INTERVAL):
+        """
+        Args:
+            mode (str): None/"" (desactivado), "cprofile" o "sampling".
+            output_dir (str): Carpeta de salida de los archivos de perfil.
+            interval (float): Segundos entre muestras de pila.
+        """
+        self.mode = mode or None
+        self.enabled = self.mode is not None
+        self.output_dir = output_dir or os.getenv('SCRAPER_PROFILE_DIR', PROFILE_DIR)
+        self.interval = interval
+        self.run_name = None
+        self.active_stages = {}
+        self.stage_stats = {}
+        self.profile = None
+        self.profile_owner = None  # hilo cuya etapa está perfilando cProfile
+        self.overlapped = {}       # hilo -> su etapa se solapó con la de otro hilo
+        self.depth = {}
+        self.sampler = None
+        self.started_tracemalloc = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cli_mode=None):
+        """
+        Crea el perfilador según --profile (cli_mode) o SCRAPER_PROFILE.
+        Valores válidos: 1/true/cprofile, sampling. Cualquier otro valor lo desactiva.
+        """
+        value = (cli_mode or os.getenv('SCRAPER_PROFILE', '')).strip().lower()
+        if value in ('1', 'true', 'yes', 'cprofile'):
+            return cls(mode='cprofile')
+        if value == 'sampling':
+            return cls(mode='sampling')
+        return cls(mode=None)
+
+    def start(self, run_label="run"):
+        """Inicia una ejecución perfilada (no hace nada si está desactivado)."""
+        if not self.enabled:
+            return
+        self.run_name = f"{run_label}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.stage_stats = {}
+        self.profile = cProfile.Profile() if self.mode == 'cprofile' else None
+        self.profile_owner = None
+        self.overlapped = {}
+        self.depth = {}
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self.started_tracemalloc = True
+        self.sampler = _StackSampler(self, self.interval)
+        self.sampler.start()
+        log.info("🔬 Perfilado activo (%s): %s/%s.*", self.mode, self.output_dir, self.run_name)
+
+    def stage(self, name):
+        """Contexto que mide una etapa. Desactivado devuelve un contexto vacío compartido."""
+        if not self.enabled or self.run_name is None:
+            return _NULL_STAGE
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        ident = threading.get_ident()
+        with self.lock:
+            self.active_stages.setdefault(ident, []).append(name)
+            depth = self.depth.get(ident, 0)
+            self.depth[ident] = depth + 1
+            profile = None
+            if depth == 0:
+                # Otra etapa en curso en otro hilo: ambas comparten el pico de memoria
+                others = [other for other in self.active_stages if other != ident]
+                self.overlapped[ident] = bool(others)
+                for other in others:
+                    self.overlapped[other] = True
+                if not others:
+                    tracemalloc.reset_peak()
+                # Un solo cProfile activo a la vez (en Python >= 3.12 un segundo enable() falla)
+                if self.profile is not None and self.profile_owner is None:
+                    self.profile_owner = ident
+                    profile = self.profile
+            if profile is not None:
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Otra herramienta de perfilado ya está activa en el proceso
+                    self.profile_owner = None
+                    profile = None
+        memory_before = tracemalloc.get_traced_memory()[0]
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started_at
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            with self.lock:
+                if profile is not None:
+                    profile.disable()
+                    self.profile_owner = None
+                self.active_stages[ident].pop()
+                if not self.active_stages[ident]:
+                    del self.active_stages[ident]
+                self.depth[ident] -= 1
+                overlapped = self.overlapped.get(ident, False)
+                if not self.depth[ident]:
+                    self.overlapped.pop(ident, None)
+                stats = self.stage_stats.setdefault(name, {
+                    'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                    'memory_delta_bytes': 0, 'peak_memory_bytes': 0, 'overlapped_calls': 0,
+                })
+                stats['calls'] += 1
+                stats['total_seconds'] += elapsed
+                stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+                stats['memory_delta_bytes'] += memory_after - memory_before
+                if overlapped:
+                    stats['overlapped_calls'] += 1
+                else:
+                    stats['peak_memory_bytes'] = max(stats['peak_memory_bytes'], memory_peak)
+
+    def finish(self):
+        """Detiene el perfilado y escribe los archivos de la ejecución."""
+        if not self.enabled or self.run_name is None:
+            return None
+        if self.sampler:
+            self.sampler.stop()
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(self.output_dir, self.run_name)
+
+            if self.profile is not None and self.profile.getstats():
+                pstats.Stats(self.profile).dump_stats(f"{base}.pstats")
+
+            with open(f"{base}.collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.sampler.counts.items()):
+                    f.write(f"{stack} {count}\n")
+
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ))
+            with open(f"{base}.memory.txt", 'w', encoding='utf-8') as f:
+                current, peak = tracemalloc.get_traced_memory()
+                f.write(f"Memoria actual: {current / 1024:.1f} KiB | Pico: {peak / 1024:.1f} KiB\n\n")
+                for stat in snapshot.statistics('lineno')[:30]:
+                    f.write(f"{stat}\n")
+
+            with open(f"{base}.summary.json", 'w', encoding='utf-8') as f:
+                json.dump({
+                    'run': self.run_name,
+                    'mode': self.mode,
+                    'samples': sum(self.sampler.counts.values()),
+                    'stages': self.stage_stats,
+                }, f, indent=2)
+
+            log.info("🔬 Perfil guardado en %s.*", base)
+            for name, stats in sorted(self.stage_stats.items(), key=lambda x: -x[1]['total_seconds']):
+                log.info("   %-20s %8.3fs  (%s llamadas, pico %.0f KiB)",
+                         name, stats['total_seconds'], stats['calls'], stats['peak_memory_bytes'] / 1024)
+            return base
+        except Exception as e:
+            log.error("❌ Error al guardar el perfil: %s", e)
+            return None
+        finally:
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+                self.started_tracemalloc = False
+            self.run_name = None
+            self.sampler = None
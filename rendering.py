@@ -0,0 +1,307 @@
+"""
+Renderizado de mensajes de Telegram para las alertas de NowGoal.
+Cada mensaje (encabezado, liga, partido) se genera una sola vez por idioma
+y se reutiliza para todos los destinos que comparten ese idioma.
+- Escapado en una sola pasada con str.translate (MarkdownV2 o HTML).
+- Plantillas compiladas una vez por idioma y modo de formato (MessageRenderer): los
+  textos fijos ya van escapados y solo se escapan los campos del partido.
+- Caché de mensajes de partido por estado: un partido sin cambios no se vuelve a renderizar.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# Caracteres que DEBEN ser escapados en MarkdownV2
+MARKDOWN_V2_RESERVED_CHARS = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
+
+# Tablas de traducción: un solo recorrido del texto en lugar de un replace() por carácter.
+# La barra invertida se escapa también: sin escapar, Telegram la toma como escape del carácter siguiente.
+_MARKDOWN_V2_TABLE = str.maketrans({char: '\\' + char for char in ['\\'] + MARKDOWN_V2_RESERVED_CHARS})
+# Dentro de la URL de un enlace MarkdownV2 solo hay que escapar ')' y '\'
+_MARKDOWN_V2_URL_TABLE = str.maketrans({'\\': '\\\\', ')': '\\)'})
+_HTML_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+PARSE_MODES = ('MarkdownV2', 'HTML')
+DEFAULT_PARSE_MODE = 'MarkdownV2'
+
+DEFAULT_LANGUAGE = 'es'
+
+# Mensajes de partido guardados por renderizador (uno por idioma y modo de formato)
+RENDER_CACHE_SIZE = 4096
+
+# Textos fijos de los mensajes por idioma
+TEXTS = {
+    'es': {
+        'header_title': "NOWGOAL ALERTA DE PARTIDOS EN VIVO",
+        'criteria': "Criterios:",
+        'criteria_losing': "Equipo perdiendo por máximo 1 gol",
+        'criteria_corners': "Con al menos {min_corners} córners a favor",
+        'criteria_trigger': "Diferencia de córners como activador",
+        'minute': "Minuto",
+        'report': "Reporte",
+        'match_state': "Estado del Partido:",
+        'score': "Marcador",
+        'corners': "Córners",
+        'analysis': "Análisis:",
+        'odds': "Cuotas:",
+        'home': "Local",
+        'draw': "Empate",
+        'away': "Visitante",
+        'yellow_cards': "Tarjetas Amarillas:",
+        'red_cards': "Tarjetas Rojas:",
+        'details': "Ver Detalles",
+    },
+    'en': {
+        'header_title': "NOWGOAL LIVE MATCH ALERT",
+        'criteria': "Criteria:",
+        'criteria_losing': "Team losing by at most 1 goal",
+        'criteria_corners': "With at least {min_corners} corners in favour",
+        'criteria_trigger': "Corner difference as trigger",
+        'minute': "Minute",
+        'report': "Report",
+        'match_state': "Match State:",
+        'score': "Score",
+        'corners': "Corners",
+        'analysis': "Analysis:",
+        'odds': "Odds:",
+        'home': "Home",
+        'draw': "Draw",
+        'away': "Away",
+        'yellow_cards': "Yellow Cards:",
+        'red_cards': "Red Cards:",
+        'details': "View Details",
+    },
+}
+
+# Plantillas por modo de formato. {t_<clave>} son los textos fijos del idioma (se sustituyen al
+# compilar); el resto de campos se rellena en cada mensaje con valores ya escapados.
+TEMPLATES = {
+    'MarkdownV2': {
+        'header': (
+            "🎯 *{t_header_title}*\n\n"
+            "📋 *{t_criteria}*\n"
+            "• {t_criteria_losing}\n"
+            "• {criteria_corners}\n"
+            "• {t_criteria_trigger}\n"
+            "• {t_minute}: {minute_range}\n\n"
+            "⏰ {t_report}: {report_time}"
+        ),
+        'league': "🏆 *{league}*",
+        'match': (
+            "\n⚽ *{home_team} vs {away_team}*\n\n"
+            "📊 *{t_match_state}*\n"
+            "• {t_score}: {score}\n"
+            "• {t_minute}: {minute}\n"
+            "• {t_corners}: {corners_home} \\- {corners_away}\n\n"
+            "🎯 *{t_analysis}*\n"
+            "• {filter_reason}\n\n"
+            "📈 *{t_odds}*\n"
+            "• {t_home}: {odds_home}\n"
+            "• {t_draw}: {odds_draw}\n"
+            "• {t_away}: {odds_away}\n\n"
+            "🟨 *{t_yellow_cards}* L:{yellow_home} V:{yellow_away}\n"
+            "🟥 *{t_red_cards}* L:{red_home} V:{red_away}"
+        ),
+        'link': "\n\n🔗 [{t_details}]({link})",
+    },
+    'HTML': {
+        'header': (
+            "🎯 <b>{t_header_title}</b>\n\n"
+            "📋 <b>{t_criteria}</b>\n"
+            "• {t_criteria_losing}\n"
+            "• {criteria_corners}\n"
+            "• {t_criteria_trigger}\n"
+            "• {t_minute}: {minute_range}\n\n"
+            "⏰ {t_report}: {report_time}"
+        ),
+        'league': "🏆 <b>{league}</b>",
+        'match': (
+            "\n⚽ <b>{home_team} vs {away_team}</b>\n\n"
+            "📊 <b>{t_match_state}</b>\n"
+            "• {t_score}: {score}\n"
+            "• {t_minute}: {minute}\n"
+            "• {t_corners}: {corners_home} - {corners_away}\n\n"
+            "🎯 <b>{t_analysis}</b>\n"
+            "• {filter_reason}\n\n"
+            "📈 <b>{t_odds}</b>\n"
+            "• {t_home}: {odds_home}\n"
+            "• {t_draw}: {odds_draw}\n"
+            "• {t_away}: {odds_away}\n\n"
+            "🟨 <b>{t_yellow_cards}</b> L:{yellow_home} V:{yellow_away}\n"
+            "🟥 <b>{t_red_cards}</b> L:{red_home} V:{red_away}"
+        ),
+        'link': '\n\n🔗 <a href="{link}">{t_details}</a>',
+    },
+}
+
+# Campos del partido que aparecen en su mensaje: su valor es la clave de la caché
+MATCH_STATE_FIELDS = (
+    'home_team', 'away_team', 'score', 'minute_actual', 'corners_home', 'corners_away', 'filter_reason',
+    'odds_full_time_home_win', 'odds_full_time_draw', 'odds_full_time_away_win',
+    'yellow_home', 'yellow_away', 'red_home', 'red_away', 'link',
+)
+
+
+def get_texts(language):
+    """Devuelve los textos del idioma indicado (español por defecto)."""
+    return TEXTS.get(language or DEFAULT_LANGUAGE, TEXTS[DEFAULT_LANGUAGE])
+
+
+def escape_markdown_v2(text):
+    """
+    Escapa caracteres especiales para Telegram MarkdownV2.
+    https://core.telegram.org/bots/api#markdownv2-style
+    """
+    if text is None:
+        return "N/A"
+    return str(text).translate(_MARKDOWN_V2_TABLE)
+
+
+def escape_html(text):
+    """
+    Escapa un texto para el modo HTML de Telegram (&, <, > y las comillas de los atributos).
+    https://core.telegram.org/bots/api#html-style
+    """
+    if text is None:
+        return "N/A"
+    return str(text).translate(_HTML_TABLE)
+
+
+def resolve_parse_mode(parse_mode=None):
+    """Modo de formato válido: el indicado, TELEGRAM_PARSE_MODE o MarkdownV2."""
+    parse_mode = parse_mode or os.getenv('TELEGRAM_PARSE_MODE', DEFAULT_PARSE_MODE)
+    return parse_mode if parse_mode in PARSE_MODES else DEFAULT_PARSE_MODE
+
+
+def _split_score(score):
+    if score and score != '-' and ' - ' in score:
+        try:
+            home_score, away_score = score.split(' - ')
+            return home_score, away_score
+        except ValueError:
+            pass
+    return '?', '?'
+
+
+class _StaticTexts(dict):
+    """Sustituye los textos fijos al compilar y deja intactos los campos del mensaje."""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+class MessageRenderer:
+    """Plantillas de un idioma y modo de formato, compiladas una vez, con caché por estado del partido."""
+
+    def __init__(self, language=DEFAULT_LANGUAGE, parse_mode=DEFAULT_PARSE_MODE, cache_size=RENDER_CACHE_SIZE):
+        """
+        Args:
+            language (str): Idioma de los textos fijos.
+            parse_mode (str): 'MarkdownV2' o 'HTML'.
+            cache_size (int): Mensajes de partido guardados (los menos usados se descartan).
+        """
+        self.language = language if language in TEXTS else DEFAULT_LANGUAGE
+        self.parse_mode = parse_mode if parse_mode in PARSE_MODES else DEFAULT_PARSE_MODE
+        self.escape = escape_html if self.parse_mode == 'HTML' else escape_markdown_v2
+        self.url_table = _HTML_TABLE if self.parse_mode == 'HTML' else _MARKDOWN_V2_URL_TABLE
+        self.texts = get_texts(self.language)
+
+        templates = TEMPLATES[self.parse_mode]
+        static = _StaticTexts({f"t_{key}": self.escape(value).replace('{', '{{').replace('}', '}}')
+                               for key, value in self.texts.items()})
+        self.header_template = templates['header'].format_map(static)
+        self.league_template = templates['league']
+        self.match_template = templates['match'].format_map(static)
+        self.link_template = templates['link'].format_map(static)
+
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render_header(self, min_minute, max_minute, min_corners, report_time=None):
+        """Genera el mensaje de encabezado con los criterios del filtro."""
+        if report_time is None:
+            report_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        esc = self.escape
+        return self.header_template.format(
+            criteria_corners=esc(self.texts['criteria_corners'].format(min_corners=min_corners)),
+            minute_range=esc(f"{min_minute}-{max_minute}"),
+            report_time=esc(report_time),
+        )
+
+    def render_league(self, league):
+        """Genera el mensaje con el nombre de la liga."""
+        return self.league_template.format(league=self.escape((league or '').upper()))
+
+    def render_match(self, match):
+        """Genera el mensaje detallado de un partido (desde la caché si su estado no cambió)."""
+        key = tuple(match.get(field) for field in MATCH_STATE_FIELDS)
+        with self.cache_lock:
+            message = self.cache.get(key)
+            if message is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return message
+            self.misses += 1
+
+        message = self._render_match(match)
+        with self.cache_lock:
+            self.cache[key] = message
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return message
+
+    def _render_match(self, match):
+        esc = self.escape
+        home_score, away_score = _split_score(match.get('score'))
+        message = self.match_template.format(
+            home_team=esc(match.get('home_team')),
+            away_team=esc(match.get('away_team')),
+            score=esc(f"{home_score}-{away_score}"),
+            minute=esc(match.get('minute_actual')),
+            corners_home=esc(match.get('corners_home', '0')),
+            corners_away=esc(match.get('corners_away', '0')),
+            filter_reason=esc(match.get('filter_reason', 'N/A')),
+            odds_home=esc(match.get('odds_full_time_home_win', 'N/A')),
+            odds_draw=esc(match.get('odds_full_time_draw', 'N/A')),
+            odds_away=esc(match.get('odds_full_time_away_win', 'N/A')),
+            yellow_home=esc(match.get('yellow_home', '0')),
+            yellow_away=esc(match.get('yellow_away', '0')),
+            red_home=esc(match.get('red_home', '0')),
+            red_away=esc(match.get('red_away', '0')),
+        )
+        if match.get('link') and match['link'] != 'N/A':
+            message += self.link_template.format(link=str(match['link']).translate(self.url_table))
+        return message
+
+    def cache_stats(self):
+        """Aciertos y fallos de la caché de mensajes de partido."""
+        with self.cache_lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.cache)}
+
+
+@lru_cache(maxsize=None)
+def get_renderer(language=DEFAULT_LANGUAGE, parse_mode=DEFAULT_PARSE_MODE):
+    """Renderizador compartido de un idioma y modo de formato (se compila una sola vez)."""
+    return MessageRenderer(language, parse_mode)
+
+
+def render_header(min_minute, max_minute, min_corners, language=DEFAULT_LANGUAGE, report_time=None,
+                  parse_mode=DEFAULT_PARSE_MODE):
+    """Genera el mensaje de encabezado con los criterios del filtro."""
+    return get_renderer(language, parse_mode).render_header(min_minute, max_minute, min_corners, report_time)
+
+
+def render_league(league, language=DEFAULT_LANGUAGE, parse_mode=DEFAULT_PARSE_MODE):
+    """Genera el mensaje con el nombre de la liga."""
+    return get_renderer(language, parse_mode).render_league(league)
+
+
+def render_match(match, language=DEFAULT_LANGUAGE, parse_mode=DEFAULT_PARSE_MODE):
+    """Genera el mensaje detallado de un partido."""
+    return get_renderer(language, parse_mode).render_match(match)
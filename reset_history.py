@@ -2,23 +2,27 @@
 """
 Script para resetear el historial de partidos enviados
 Útil cuando se cambia la lógica de detección de duplicados
+(equivale a `python main.py history reset`; con --yes no pregunta)
 """
 
 import os
 import sys
 
+from state_files import FileLock
+
 def reset_sent_matches():
     """Resetea el archivo de partidos enviados"""
     sent_matches_file = "sent_matches.json"
     
     try:
-        if os.path.exists(sent_matches_file):
-            os.remove(sent_matches_file)
-            print("✅ Archivo de partidos enviados reseteado correctamente")
-            print("📝 El sistema ahora enviará alertas para todos los partidos que cumplan los criterios")
-        else:
-            print("ℹ️ No existe archivo de partidos enviados para resetear")
-            print("📝 El sistema funcionará normalmente")
+        with FileLock(sent_matches_file):
+            if os.path.exists(sent_matches_file):
+                os.remove(sent_matches_file)
+                print("✅ Archivo de partidos enviados reseteado correctamente")
+                print("📝 El sistema ahora enviará alertas para todos los partidos que cumplan los criterios")
+            else:
+                print("ℹ️ No existe archivo de partidos enviados para resetear")
+                print("📝 El sistema funcionará normalmente")
     except Exception as e:
         print(f"❌ Error al resetear archivo de partidos enviados: {e}")
 
@@ -31,7 +35,10 @@ def main():
     print("   Esto hará que se envíen alertas para todos los partidos que cumplan los criterios.")
     print("   (Incluyendo partidos que ya fueron enviados anteriormente)")
     
-    response = input("\n¿Continuar? (s/N): ").strip().lower()
+    if '--yes' in sys.argv[1:] or '-y' in sys.argv[1:]:
+        response = 's'
+    else:
+        response = input("\n¿Continuar? (s/N): ").strip().lower()
     
     if response in ['s', 'si', 'sí', 'y', 'yes']:
         reset_sent_matches()
@@ -0,0 +1,154 @@
+"""
+Planificador adaptativo de consultas para el modo continuo (daemon).
+Usa la última extracción para decidir cuándo volver a consultar:
+- muchos partidos dentro de min_minute..max_minute (o a punto de entrar): consultas rápidas,
+- pocos: intervalo intermedio,
+- ninguno: latido lento, o justo antes de que el partido en juego más cercano llegue a min_minute.
+Así el número de consultas (y la CPU y las peticiones) sigue a la demanda real.
+Con un WindowPredictor, además se programa una consulta justo cuando se prevé que un
+partido entre en la ventana (según su hora de inicio o su minuto en juego).
+"""
+
+import os
+import time
+
+from predictor import WindowPredictor
+
+# Segundos de margen tras la entrada prevista, para que el marcador ya muestre min_minute
+ENTRY_GRACE = 5
+
+
+class AdaptivePollScheduler:
+    """Calcula el intervalo hasta la siguiente consulta según la población de partidos."""
+
+    def __init__(self, min_minute=30, max_minute=60, fast_interval=15, base_interval=60,
+                 heartbeat_interval=300, lead_minutes=3, busy_matches=10, predictor=None):
+        """
+        Args:
+            min_minute (int): Minuto mínimo del filtro.
+            max_minute (int): Minuto máximo del filtro.
+            fast_interval (float): Intervalo (s) con muchos partidos en la ventana.
+            base_interval (float): Intervalo (s) con pocos partidos en la ventana.
+            heartbeat_interval (float): Intervalo (s) cuando ningún partido está cerca de la ventana.
+            lead_minutes (int): Minutos antes de min_minute en los que un partido cuenta como "a punto de entrar".
+            busy_matches (int): Partidos en la ventana a partir de los cuales se usa fast_interval.
+            predictor (WindowPredictor): Entradas previstas en la ventana (None = no usar).
+        """
+        self.min_minute = min_minute
+        self.max_minute = max_minute
+        self.fast_interval = fast_interval
+        self.base_interval = base_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.lead_minutes = lead_minutes
+        self.busy_matches = max(1, busy_matches)
+        self.predictor = predictor
+        self.last_decision = {}
+
+    @classmethod
+    def from_env(cls, min_minute=30, max_minute=60, base_interval=None):
+        """Crea el planificador según POLL_FAST_INTERVAL, POLL_BASE_INTERVAL y POLL_HEARTBEAT_INTERVAL."""
+        if base_interval is None:
+            base_interval = float(os.getenv('POLL_BASE_INTERVAL', '60'))
+        return cls(
+            min_minute=min_minute,
+            max_minute=max_minute,
+            fast_interval=float(os.getenv('POLL_FAST_INTERVAL', '15')),
+            base_interval=base_interval,
+            heartbeat_interval=float(os.getenv('POLL_HEARTBEAT_INTERVAL', '300')),
+            predictor=WindowPredictor(min_minute, max_minute),
+        )
+
+    def configure(self, min_minute=None, max_minute=None, fast_interval=None, base_interval=None,
+                  heartbeat_interval=None):
+        """Cambia la ventana o los intervalos en caliente (los valores None no se tocan)."""
+        if fast_interval is not None:
+            self.fast_interval = fast_interval
+        if base_interval is not None:
+            self.base_interval = base_interval
+        if heartbeat_interval is not None:
+            self.heartbeat_interval = heartbeat_interval
+        window_changed = (min_minute is not None and min_minute != self.min_minute) or \
+                         (max_minute is not None and max_minute != self.max_minute)
+        if min_minute is not None:
+            self.min_minute = min_minute
+        if max_minute is not None:
+            self.max_minute = max_minute
+        if window_changed and self.predictor is not None:
+            self.predictor.set_window(self.min_minute, self.max_minute)
+
+    def get_state(self):
+        """Última decisión y predicciones de entrada (checkpoint.py)."""
+        return {
+            'last_decision': dict(self.last_decision),
+            'predictor': self.predictor.get_state() if self.predictor is not None else None,
+        }
+
+    def restore(self, state, now=None):
+        """Carga un estado de get_state() (arranque en caliente)."""
+        self.last_decision = dict(state.get('last_decision') or {})
+        if self.predictor is not None and state.get('predictor'):
+            self.predictor.restore(state['predictor'], now)
+
+    @staticmethod
+    def _minute(match):
+        try:
+            return int(match.get('minute_actual', ''))
+        except (TypeError, ValueError):
+            return None
+
+    def next_interval(self, matches, now=None):
+        """
+        Devuelve los segundos hasta la siguiente consulta.
+
+        Args:
+            matches (list): Partidos de la última extracción.
+            now (float): Momento de la extracción (por defecto, ahora).
+        """
+        now = time.time() if now is None else now
+        in_window = approaching = 0
+        soonest_entry = None  # minutos hasta que el partido en juego más cercano entre en la ventana
+        for match in matches:
+            minute = self._minute(match)
+            if minute is None:
+                continue
+            if self.min_minute <= minute <= self.max_minute:
+                in_window += 1
+            elif minute < self.min_minute:
+                minutes_to_entry = self.min_minute - minute
+                if minutes_to_entry <= self.lead_minutes:
+                    approaching += 1
+                elif soonest_entry is None or minutes_to_entry < soonest_entry:
+                    soonest_entry = minutes_to_entry
+
+        demand = in_window + approaching
+        if demand:
+            # Interpolación lineal entre base_interval (1 partido) y fast_interval (busy_matches o más)
+            load = min(1.0, demand / self.busy_matches)
+            interval = self.base_interval - (self.base_interval - self.fast_interval) * load
+            reason = "ventana"
+        elif soonest_entry is not None:
+            # Despertar lead_minutes antes de que el partido más cercano llegue a min_minute
+            interval = (soonest_entry - self.lead_minutes) * 60
+            interval = max(self.base_interval, min(self.heartbeat_interval, interval))
+            reason = "proximo"
+        else:
+            interval = self.heartbeat_interval
+            reason = "latido"
+
+        next_entry = None
+        if self.predictor is not None:
+            self.predictor.observe(matches, now)
+            next_entry = self.predictor.seconds_until_next_entry(now)
+            # Consulta dirigida: despertar justo en la próxima entrada prevista
+            if next_entry is not None and next_entry + ENTRY_GRACE < interval:
+                interval = max(0.0, next_entry + ENTRY_GRACE)
+                reason = "entrada"
+
+        self.last_decision = {
+            'interval': round(interval, 1),
+            'in_window': in_window,
+            'approaching': approaching,
+            'reason': reason,
+            'next_entry_in': None if next_entry is None else round(next_entry, 1),
+        }
+        return interval
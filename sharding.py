@@ -0,0 +1,441 @@
+"""
+Scraping repartido por ligas entre varios procesos (o máquinas).
+- Coordinador (`python main.py coordinator`): en cada consulta reparte las ligas de las filas
+  Leaguestitle en N shards y los publica como tareas en una tabla de trabajo SQLite.
+- Workers (`python main.py worker`): cada uno mantiene su navegador abierto, reclama una tarea,
+  parsea solo las filas de sus ligas y devuelve los partidos.
+- El coordinador une los resultados y hace un único paso de filtro, anti-duplicados y envío.
+
+Reparto: las ligas se asignan por número de partidos de la consulta anterior (el shard menos
+cargado recibe la liga más grande). Las ligas todavía sin contar (primera consulta, ligas
+nuevas) se reparten por hash del nombre, así ninguna fila queda sin worker.
+La tabla de trabajo puede estar en una carpeta compartida para workers en otras máquinas,
+siempre que el sistema de archivos soporte bloqueos de SQLite.
+"""
+
+import os
+import json
+import time
+import zlib
+import heapq
+import socket
+import sqlite3
+from contextlib import contextmanager
+
+from structured_log import get_logger
+
+log = get_logger("shard")
+
+DEFAULT_DB = "shards.db"
+# Segundos tras los que una tarea reclamada sin terminar se devuelve a la cola (worker caído)
+DEFAULT_LEASE = 120
+MAX_ATTEMPTS = 3
+# Consultas cuyas tareas se conservan en la tabla (para diagnóstico)
+KEEP_POLLS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS polls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    shard_count INTEGER NOT NULL,
+    planned TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    poll_id INTEGER NOT NULL,
+    shard INTEGER NOT NULL,
+    leagues TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+"""
+
+
+def shard_of(league, shard_count):
+    """Shard de una liga que aún no está en el reparto (hash estable entre procesos)."""
+    return zlib.crc32(league.encode('utf-8')) % shard_count
+
+
+def plan_shards(league_counts, shard_count):
+    """
+    Reparte las ligas en shard_count grupos con un número de partidos parecido.
+
+    Args:
+        league_counts (dict): Liga -> filas de partido (de la consulta anterior).
+        shard_count (int): Número de shards.
+
+    Returns:
+        list: Una lista de ligas por shard.
+    """
+    shards = [[] for _ in range(shard_count)]
+    loads = [(0, shard) for shard in range(shard_count)]
+    # La liga más grande va al shard menos cargado
+    for league, count in sorted(league_counts.items(), key=lambda item: (-item[1], item[0])):
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(league)
+        heapq.heappush(loads, (load + count, shard))
+    return shards
+
+
+class ShardAssignment:
+    """Ligas que debe parsear un worker en una consulta."""
+
+    def __init__(self, shard, shard_count, leagues=(), planned=()):
+        """
+        Args:
+            shard (int): Índice del shard.
+            shard_count (int): Número total de shards de la consulta.
+            leagues (iterable): Ligas asignadas a este shard.
+            planned (iterable): Ligas asignadas a cualquier shard (las demás se reparten por hash).
+        """
+        self.shard = shard
+        self.shard_count = shard_count
+        self.leagues = set(leagues)
+        self.planned = set(planned)
+
+    def includes(self, league):
+        if league in self.leagues:
+            return True
+        return league not in self.planned and shard_of(league, self.shard_count) == self.shard
+
+
+class WorkTable:
+    """Tabla de trabajo SQLite compartida por el coordinador y los workers."""
+
+    def __init__(self, path=None, lease=None):
+        """
+        Args:
+            path (str): Base de datos. Por defecto SHARD_DB o shards.db.
+            lease (float): Segundos antes de devolver a la cola una tarea sin terminar.
+                           Por defecto SHARD_LEASE o 120.
+        """
+        self.path = path or os.getenv('SHARD_DB', DEFAULT_DB)
+        self.lease = float(os.getenv('SHARD_LEASE', DEFAULT_LEASE)) if lease is None else lease
+        # isolation_level=None: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Transacción con bloqueo de escritura desde el principio (evita reclamar dos veces)."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+    # --- Coordinador ---
+
+    def create_poll(self, assignments, planned):
+        """Publica las tareas de una consulta. Devuelve el id de la consulta."""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO polls (created_at, shard_count, planned) VALUES (?, ?, ?)",
+                (time.time(), len(assignments), json.dumps(sorted(planned), ensure_ascii=False)),
+            )
+            poll_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO tasks (poll_id, shard, leagues) VALUES (?, ?, ?)",
+                [(poll_id, shard, json.dumps(leagues, ensure_ascii=False))
+                 for shard, leagues in enumerate(assignments)],
+            )
+        return poll_id
+
+    def requeue_expired(self, now=None):
+        """
+        Devuelve a la cola las tareas reclamadas hace más de `lease` segundos; las que ya
+        agotaron sus intentos pasan a 'failed', como en fail(). Devuelve cuántas cambiaron.
+        """
+        now = time.time() if now is None else now
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "worker = NULL, error = CASE WHEN attempts < ? THEN error ELSE 'lease expirado' END "
+                "WHERE status = 'claimed' AND claimed_at < ?",
+                (MAX_ATTEMPTS, MAX_ATTEMPTS, now - self.lease),
+            )
+            return cursor.rowcount
+
+    def poll_status(self, poll_id):
+        """Tareas de la consulta por estado."""
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) AS n FROM tasks WHERE poll_id = ? GROUP BY status", (poll_id,)
+        ).fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def poll_results(self, poll_id):
+        """Resultados (dict) de las tareas terminadas de la consulta, por shard."""
+        rows = self.conn.execute(
+            "SELECT shard, result FROM tasks WHERE poll_id = ? AND status = 'done' ORDER BY shard", (poll_id,)
+        ).fetchall()
+        return {row['shard']: json.loads(row['result']) for row in rows}
+
+    def cancel_pending(self, before_poll_id=None):
+        """
+        Cancela las tareas sin terminar (de todas las consultas, o de las anteriores a before_poll_id)
+        y borra las consultas antiguas.
+        """
+        with self.transaction() as conn:
+            if before_poll_id is None:
+                conn.execute("UPDATE tasks SET status = 'cancelled' WHERE status IN ('pending', 'claimed')")
+            else:
+                conn.execute(
+                    "UPDATE tasks SET status = 'cancelled' WHERE status IN ('pending', 'claimed') AND poll_id < ?",
+                    (before_poll_id,),
+                )
+            last = conn.execute("SELECT MAX(id) FROM polls").fetchone()[0] or 0
+            conn.execute("DELETE FROM tasks WHERE poll_id <= ?", (last - KEEP_POLLS,))
+            conn.execute("DELETE FROM polls WHERE id <= ?", (last - KEEP_POLLS,))
+
+    def active_workers(self, within=60):
+        """Workers vistos en los últimos `within` segundos."""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM workers WHERE seen_at >= ?", (time.time() - within,)
+        ).fetchone()[0]
+
+    # --- Worker ---
+
+    def heartbeat(self, worker):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO workers (name, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET seen_at = excluded.seen_at",
+                (worker, time.time()),
+            )
+
+    def claim(self, worker):
+        """
+        Reclama la tarea pendiente más antigua.
+
+        Returns:
+            tuple | None: (id de la tarea, ShardAssignment) o None si no hay tareas.
+        """
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT t.id, t.shard, t.leagues, p.shard_count, p.planned FROM tasks t "
+                "JOIN polls p ON p.id = t.poll_id WHERE t.status = 'pending' ORDER BY t.id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'claimed', worker = ?, claimed_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker, time.time(), row['id']),
+            )
+        assignment = ShardAssignment(row['shard'], row['shard_count'],
+                                     json.loads(row['leagues']), json.loads(row['planned']))
+        return row['id'], assignment
+
+    def complete(self, task_id, worker, result):
+        """Guarda el resultado. Devuelve False si la tarea ya no era de este worker (expirada o cancelada)."""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', finished_at = ?, result = ? "
+                "WHERE id = ? AND worker = ? AND status = 'claimed'",
+                (time.time(), json.dumps(result, ensure_ascii=False), task_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id, worker, error):
+        """Marca la tarea como fallida; vuelve a la cola si le quedan intentos."""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "worker = NULL, error = ? WHERE id = ? AND worker = ? AND status = 'claimed'",
+                (MAX_ATTEMPTS, str(error), task_id, worker),
+            )
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(scraper, table, worker_id=None, idle_sleep=0.05, max_tasks=None):
+    """
+    Bucle de un worker: mantiene el navegador abierto y procesa tareas de la tabla de trabajo.
+
+    Args:
+        scraper (NowGoalScraper): Scraper con el que se extrae (se abre su navegador).
+        table (WorkTable): Tabla de trabajo compartida.
+        worker_id (str): Nombre del worker. Por defecto <host>-<pid>.
+        idle_sleep (float): Pausa entre consultas a la tabla cuando no hay tareas.
+        max_tasks (int): Tareas antes de salir (None = hasta Ctrl+C).
+    """
+    worker_id = worker_id or default_worker_id()
+    done = 0
+    last_heartbeat = 0.0
+    try:
+        log.info("🚀 Worker %s usando %s", worker_id, table.path)
+        scraper.setup_driver()
+        scraper.navigate_to_site()
+        scraper.click_hot_button()
+
+        while max_tasks is None or done < max_tasks:
+            if time.time() - last_heartbeat >= 5:
+                table.heartbeat(worker_id)
+                last_heartbeat = time.time()
+            claimed = table.claim(worker_id)
+            if claimed is None:
+                time.sleep(idle_sleep)
+                continue
+
+            task_id, assignment = claimed
+            started_at = time.perf_counter()
+            try:
+                matches = scraper.extract_match_data(shard=assignment)
+            except Exception as e:
+                log.error("❌ Error en la tarea %s: %s", task_id, e)
+                table.fail(task_id, worker_id, e)
+                scraper.snapshot.reset()
+                try:
+                    scraper.navigate_to_site()
+                    scraper.click_hot_button()
+                except Exception as e:
+                    log.error("❌ No se pudo recargar la página: %s", e)
+                continue
+
+            result = {
+                'matches': matches,
+                'league_counts': scraper.league_counts,
+                'worker': worker_id,
+                'seconds': round(time.perf_counter() - started_at, 3),
+            }
+            if table.complete(task_id, worker_id, result):
+                log.info("✅ Tarea %s (shard %s/%s): %s partidos en %.2fs",
+                         task_id, assignment.shard, assignment.shard_count, len(matches), result['seconds'])
+            else:
+                log.warning("⚠️ Tarea %s expirada o cancelada: resultado descartado", task_id)
+            done += 1
+
+    except KeyboardInterrupt:
+        log.info("\n👋 Worker %s detenido", worker_id)
+    finally:
+        scraper.cleanup()
+        table.close()
+
+
+def run_coordinator(scraper, table, shard_count=0, interval=60, min_interval=5, poll_timeout=None,
+                    max_polls=None, export_json=True, send_telegram=True, scheduler=None):
+    """
+    Bucle del coordinador: publica una consulta repartida por ligas, espera a los workers,
+    une los resultados y los filtra, deduplica y envía una sola vez.
+
+    Args:
+        scraper (NowGoalScraper): Scraper usado solo para el filtro, la exportación y el envío.
+        table (WorkTable): Tabla de trabajo compartida.
+        shard_count (int): Shards por consulta (0 = uno por worker activo).
+        interval (float): Segundos entre consultas (intervalo base si hay planificador).
+        min_interval (float): Segundos mínimos entre consultas.
+        poll_timeout (float): Espera máxima de los resultados de una consulta (por defecto el intervalo, mínimo 30s).
+        max_polls (int): Número de consultas antes de salir (None = hasta Ctrl+C).
+        scheduler (AdaptivePollScheduler): Decide el siguiente intervalo. None = intervalo fijo.
+    """
+    poll_timeout = max(30.0, interval) if poll_timeout is None else poll_timeout
+    scraper.profiler.start("coordinator")
+    started_at = time.time()
+    scraper.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    scraper.run_stats = {}
+    pipeline = scraper.start_pipeline(export_json, send_telegram)
+    scraper.warm_start(scheduler)
+    league_counts = {}
+    polls = 0
+    latencies = []
+    # Tareas de ejecuciones anteriores del coordinador ya no sirven
+    table.cancel_pending()
+    try:
+        log.info("🚀 Coordinador usando %s", table.path)
+        while max_polls is None or polls < max_polls:
+            poll_started = time.time()
+            polling = scraper.reload_config(scheduler)
+            if polling:
+                interval = polling['base_interval']
+                min_interval = polling['min_interval']
+            count = shard_count or max(1, table.active_workers())
+            assignments = plan_shards(league_counts, count)
+            poll_id = table.create_poll(assignments, league_counts)
+            table.cancel_pending(before_poll_id=poll_id)
+            polls += 1
+            scraper.run_stats['polls'] = polls
+
+            # Esperar a que todos los shards terminen (o al timeout)
+            deadline = time.monotonic() + poll_timeout
+            status = {}
+            while time.monotonic() < deadline:
+                table.requeue_expired()
+                status = table.poll_status(poll_id)
+                if not status.get('pending') and not status.get('claimed'):
+                    break
+                time.sleep(0.05)
+
+            results = table.poll_results(poll_id)
+            latency = time.time() - poll_started
+            latencies.append(latency)
+            missing = count - len(results)
+            if missing:
+                scraper.run_stats['incomplete_polls'] = scraper.run_stats.get('incomplete_polls', 0) + 1
+                log.warning("⚠️ Consulta %s: %s de %s shards sin resultado (%s)", poll_id, missing, count, status)
+
+            all_matches = []
+            seen_counts = {}
+            for result in results.values():
+                all_matches.extend(result['matches'])
+                # Cada worker ve la tabla completa: quedarse con el recuento más alto por liga
+                for league, rows in result['league_counts'].items():
+                    seen_counts[league] = max(rows, seen_counts.get(league, 0))
+            if seen_counts:
+                league_counts = seen_counts
+            log.info("📦 Consulta %s: %s partidos de %s shards en %.2fs",
+                     poll_id, len(all_matches), len(results), latency)
+
+            # El coordinador no extrae (store_rows): los veredictos de filas que ya no están
+            # en la tabla se olvidan aquí, o crecerían con cada cambio de minuto o marcador
+            scraper.snapshot.retain_verdicts({match.get('row_key') for match in all_matches})
+            if all_matches:
+                # Un único filtro, anti-duplicados y envío para todos los shards
+                pipeline.submit([dict(match) for match in all_matches])
+
+            if max_polls is not None and polls >= max_polls:
+                break
+
+            wait_seconds = interval
+            if scheduler and results:
+                wait_seconds = scheduler.next_interval(all_matches)
+                log.info("⏱️ Próxima consulta en %.0fs (%s)", wait_seconds, scheduler.last_decision['reason'])
+            scraper.save_checkpoint(scheduler)
+            remaining = max(wait_seconds, min_interval) - (time.time() - poll_started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    except KeyboardInterrupt:
+        log.info("\n👋 Coordinador detenido")
+    finally:
+        table.cancel_pending()
+        table.close()
+        if pipeline.pending():
+            log.info("⏳ Terminando %s lotes pendientes...", pipeline.pending())
+        pipeline.close()
+        scraper.run_stats['pipeline'] = pipeline.stats()
+        scraper.cleanup()
+        if latencies:
+            scraper.run_stats['shard_poll_seconds_avg'] = round(sum(latencies) / len(latencies), 3)
+            scraper.run_stats['shard_poll_seconds_max'] = round(max(latencies), 3)
+        scraper.save_checkpoint(scheduler, force=True)
+        scraper.stream_run_summary(started_at)
+        scraper.close_exports()
+        scraper.profiler.finish()
@@ -0,0 +1,149 @@
+"""
+Caché de instantáneas de #mintable para el modo continuo.
+En consultas consecutivas casi todas las filas siguen igual, así que antes de parsear
+se calcula en el navegador una huella barata (FNV-1a del outerHTML) por fila y otra
+de la tabla completa (huella de las huellas de fila):
+- tabla sin cambios: se omite todo el procesamiento de esa consulta,
+- fila sin cambios: se reutilizan el partido ya parseado y el veredicto del filtro,
+- partido ya enviado: la decisión anti-duplicados se recuerda sin volver a leer el historial.
+Las tasas de acierto se publican en las métricas de la ejecución.
+"""
+
+import time
+import threading
+from collections import Counter
+
+# Huellas de las filas de una tabla (función JS reutilizada por Selenium y CDP)
+FINGERPRINT_FN_JS = r"""
+const __nowgoalHash = (s) => {
+    let h = 0x811c9dc5;
+    for (let i = 0; i < s.length; i++) {
+        h ^= s.charCodeAt(i);
+        h = Math.imul(h, 0x01000193);
+    }
+    return (h >>> 0).toString(36) + '.' + s.length.toString(36);
+};
+"""
+
+# Para Selenium: una sola llamada execute_script devuelve, por cada <tr> de #mintable,
+# [huella, tipo ('L' liga, 'M' partido, '' otra), nombre de la liga]
+ROW_FINGERPRINTS_JS = "return (() => {" + FINGERPRINT_FN_JS + r"""
+    const table = document.getElementById('mintable');
+    if (!table) return null;
+    return Array.from(table.getElementsByTagName('tr'), row => {
+        const cls = row.className || '';
+        if (cls.includes('Leaguestitle')) {
+            const name = row.querySelector('.LGname');
+            return [__nowgoalHash(row.outerHTML), 'L', name ? name.innerText.trim() : null];
+        }
+        return [__nowgoalHash(row.outerHTML), cls.includes('tds') ? 'M' : '', null];
+    });
+})()"""
+
+
+def table_fingerprint(row_fingerprints):
+    """Huella de la tabla completa a partir de las huellas de sus filas."""
+    return str(hash(tuple(row_fingerprints)))
+
+
+def row_key(league, fp):
+    """Clave de caché de una fila: la misma fila bajo otra liga es otra entrada."""
+    return f"{league}|{fp}"
+
+
+class SnapshotCache:
+    """Partidos parseados, veredictos y decisiones anti-duplicados por huella de fila."""
+
+    def __init__(self, dedup_hours=24):
+        """
+        Args:
+            dedup_hours (float): Horas durante las que un partido enviado sigue siendo duplicado
+                                 (igual que la limpieza de sent_matches.json).
+        """
+        self.dedup_seconds = dedup_hours * 3600
+        self.table_fp = None
+        self.unchanged = False
+        self.rows = {}        # row_key -> partido parseado (solo la última consulta)
+        self.verdicts = {}    # (row_key, parámetros del filtro) -> (relevante, motivo, match_hash)
+        self.sent = {}        # match_hash -> timestamp de envío conocido
+        self.stats = Counter()
+        # Con la ejecución en cadena la extracción y el filtro usan la caché desde hilos distintos
+        self.lock = threading.Lock()
+
+    def check_table(self, table_fp):
+        """Registra la huella de la tabla. Devuelve True si no cambió desde la consulta anterior."""
+        self.unchanged = table_fp is not None and table_fp == self.table_fp
+        self.stats['table_hits' if self.unchanged else 'table_misses'] += 1
+        self.table_fp = table_fp
+        return self.unchanged
+
+    def lookup_row(self, key):
+        """
+        Busca una fila por su clave (liga + huella).
+
+        Returns:
+            tuple: (encontrada, copia del partido o None si la fila no era un partido válido)
+        """
+        if key not in self.rows:
+            self.stats['row_misses'] += 1
+            return False, None
+        self.stats['row_hits'] += 1
+        match = self.rows[key]
+        return True, dict(match) if match is not None else None
+
+    def store_rows(self, rows):
+        """Sustituye la caché por las filas de la consulta actual (row_key -> partido o None)."""
+        self.rows = {key: dict(match) if match is not None else None for key, match in rows.items()}
+        self.retain_verdicts(self.rows)
+
+    def retain_verdicts(self, keys):
+        """
+        Olvida los veredictos de filas que no están en `keys`: no volverán a usarse.
+        El coordinador, que no extrae, lo llama con las filas de cada consulta fusionada.
+        """
+        with self.lock:
+            self.verdicts = {key: v for key, v in self.verdicts.items() if key[0] in keys}
+
+    def get_verdict(self, key, params):
+        """Veredicto del filtro ya calculado para esta fila y estos parámetros, o None."""
+        verdict = self.verdicts.get((key, params)) if key else None
+        self.stats['verdict_hits' if verdict is not None else 'verdict_misses'] += 1
+        return verdict
+
+    def store_verdict(self, key, params, verdict):
+        if key:
+            with self.lock:
+                self.verdicts[(key, params)] = verdict
+
+    def is_known_sent(self, match_hash, now=None):
+        """True si ya se sabe que el partido fue enviado dentro de la ventana anti-duplicados."""
+        now = time.time() if now is None else now
+        sent_at = self.sent.get(match_hash)
+        known = sent_at is not None and now - sent_at < self.dedup_seconds
+        self.stats['dedup_hits' if known else 'dedup_misses'] += 1
+        return known
+
+    def remember_sent(self, sent_matches):
+        """Recuerda los envíos del historial (match_hash -> timestamp) tras una comprobación."""
+        with self.lock:
+            self.sent.update(sent_matches)
+            cutoff = time.time() - self.dedup_seconds
+            if len(self.sent) > 2 * len(sent_matches) + 1000:
+                self.sent = {h: t for h, t in self.sent.items() if t > cutoff}
+
+    def reset(self):
+        """Olvida las huellas (p. ej. tras recargar la página)."""
+        self.table_fp = None
+        self.unchanged = False
+        self.rows = {}
+        with self.lock:
+            self.verdicts = {}
+
+    def rates(self):
+        """Tasas de acierto por nivel de caché, para las métricas de la ejecución."""
+        result = {}
+        for level in ('table', 'row', 'verdict', 'dedup'):
+            hits, misses = self.stats[f'{level}_hits'], self.stats[f'{level}_misses']
+            if hits or misses:
+                result[level] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 3)}
+        return result
@@ -0,0 +1,319 @@
+"""
+Fuentes de partidos intercambiables y fusión en paralelo.
+Cada fuente (MatchSource) devuelve registros normalizados con el formato de match_parsing
+más 'source' y 'observed_at' (momento en que la fuente vio esos datos):
+- BrowserSource: el extractor actual de NowGoal (Selenium o CDP) de un NowGoalScraper.
+- RecordedFileSource: una exportación grabada (JSON, NDJSON o NDJSON .gz), releída si cambia.
+SourceMerger consulta todas las fuentes a la vez y une los registros por clave canónica
+(local_visitante_liga), quedándose en cada campo con el valor más reciente. Una fuente lenta
+o caída no bloquea a las demás: pasado el timeout se usan sus últimos datos, que pierden
+frente a los más frescos del resto.
+"""
+
+import os
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from match_parsing import new_match_info
+from structured_log import get_logger
+
+log = get_logger("sources")
+
+DEFAULT_SOURCE_TIMEOUT = 20
+# Segundos sin que ninguna fuente vea un partido antes de quitarlo de la fusión
+DEFAULT_STALE_AFTER = 15 * 60
+
+# Campos que añade la exportación NDJSON y no forman parte del partido
+NDJSON_RECORD_FIELDS = ('type', 'run_id', 'ts')
+MATCH_FIELDS = tuple(new_match_info('').keys())
+
+
+def load_recorded_matches(path, keep_ts=False):
+    """
+    Carga partidos grabados de una exportación.
+
+    Admite el JSON de export_to_json (clave "matches"), una lista JSON de partidos
+    o NDJSON (líneas con type="match"), opcionalmente comprimido con gzip.
+
+    Args:
+        path (str): Archivo de la exportación.
+        keep_ts (bool): Conservar el campo ts de las líneas NDJSON (momento de la exportación).
+
+    Returns:
+        list: Partidos como diccionarios.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        content = f.read()
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = None  # NDJSON con varias líneas
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and 'matches' in data:
+        return data['matches']
+
+    matches = []
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get('type', 'match') != 'match':
+            continue
+        matches.append({k: v for k, v in record.items()
+                        if k not in NDJSON_RECORD_FIELDS or (keep_ts and k == 'ts')})
+    return matches
+
+
+def normalize_record(match, source, observed_at):
+    """
+    Registro normalizado: solo los campos del partido que la fuente trae, más la fuente y el
+    momento de observación. Los que faltan no se rellenan con los valores por defecto de
+    new_match_info ('0' córners...): en la fusión pisarían los datos reales de otra fuente.
+    """
+    record = {field: match[field] for field in MATCH_FIELDS if match.get(field) is not None}
+    record['league'] = record.get('league') or "Liga no especificada"
+    record['source'] = source
+    record['observed_at'] = observed_at
+    return record
+
+
+class MatchSource:
+    """Interfaz de una fuente de partidos."""
+
+    name = "source"
+
+    def open(self):
+        """Prepara la fuente (abrir navegador, comprobar archivo...)."""
+
+    def fetch(self):
+        """Devuelve la lista de registros normalizados de la consulta actual."""
+        raise NotImplementedError
+
+    def close(self):
+        """Libera los recursos de la fuente."""
+
+
+class BrowserSource(MatchSource):
+    """Extractor de NowGoal (Selenium o CDP) de un NowGoalScraper."""
+
+    def __init__(self, scraper, name="nowgoal"):
+        self.scraper = scraper
+        self.name = name
+
+    def open(self):
+        self.scraper.setup_driver()
+        self.scraper.navigate_to_site()
+        self.scraper.click_hot_button()
+
+    def fetch(self):
+        try:
+            matches = self.scraper.extract_match_data()
+        except Exception:
+            # Recargar la página para la siguiente consulta, como en el modo continuo
+            self.scraper.snapshot.reset()
+            self.scraper.navigate_to_site()
+            self.scraper.click_hot_button()
+            raise
+        observed_at = time.time()
+        return [normalize_record(match, self.name, observed_at) for match in matches]
+
+    def close(self):
+        # El despachador de Telegram se cierra después de vaciar la cadena de envío
+        self.scraper.close_browser()
+
+
+class RecordedFileSource(MatchSource):
+    """Exportación grabada. Se vuelve a leer solo cuando cambia el archivo."""
+
+    def __init__(self, path, name=None):
+        self.path = path
+        self.name = name or f"archivo:{os.path.basename(path)}"
+        self.mtime = None
+        self.records = []
+
+    def fetch(self):
+        mtime = os.path.getmtime(self.path)
+        if mtime != self.mtime:
+            records = []
+            for match in load_recorded_matches(self.path, keep_ts=True):
+                # Momento de observación: ts de la línea NDJSON o, si no hay, la fecha del archivo
+                observed_at = match.get('ts') or mtime
+                records.append(normalize_record(match, self.name, observed_at))
+            self.records = records
+            self.mtime = mtime
+        return self.records
+
+
+class SourceMerger:
+    """Consulta las fuentes en paralelo y une sus registros por clave canónica."""
+
+    def __init__(self, sources, canonical, timeout=None, stale_after=DEFAULT_STALE_AFTER):
+        """
+        Args:
+            sources (list): Fuentes (MatchSource).
+            canonical (CanonicalIndex): Índice que da la clave canónica de cada partido.
+            timeout (float): Espera máxima por consulta; las fuentes más lentas se quedan con sus
+                             datos anteriores. Por defecto SOURCE_TIMEOUT o 20.
+            stale_after (float): Segundos sin ver un partido antes de quitarlo.
+        """
+        self.sources = list(sources)
+        self.canonical = canonical
+        self.timeout = float(os.getenv('SOURCE_TIMEOUT', DEFAULT_SOURCE_TIMEOUT)) if timeout is None else timeout
+        self.stale_after = stale_after
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.sources)), thread_name_prefix="source")
+        self.pending = {}   # nombre de la fuente -> consulta en curso (Future)
+        self.fields = {}    # clave canónica -> {campo: (observed_at, valor)}
+        self.stats = {source.name: {'ok': 0, 'errors': 0, 'timeouts': 0, 'records': 0} for source in self.sources}
+
+    def open(self):
+        """Abre las fuentes. Una fuente que no se puede abrir se descarta con un aviso."""
+        opened = []
+        for source in self.sources:
+            try:
+                source.open()
+                opened.append(source)
+            except Exception as e:
+                log.error("❌ No se pudo abrir la fuente %s: %s", source.name, e)
+        self.sources = opened
+        return bool(opened)
+
+    def fetch(self, now=None):
+        """
+        Consulta todas las fuentes (sin esperar más de `timeout`) y devuelve los partidos fusionados.
+
+        Returns:
+            list: Partidos con el valor más reciente de cada campo.
+        """
+        # Una fuente que sigue ocupada con la consulta anterior no se vuelve a lanzar
+        submitted = []
+        for source in self.sources:
+            if source.name not in self.pending:
+                self.pending[source.name] = self.executor.submit(source.fetch)
+                submitted.append(self.pending[source.name])
+        # Solo se espera a las consultas lanzadas ahora: una fuente colgada desde una consulta
+        # anterior no vuelve a añadir el timeout completo a cada consulta
+        wait(submitted, timeout=self.timeout)
+        futures = {future: name for name, future in self.pending.items()}
+        done = [future for future in futures if future.done()]
+        not_done = [future for future in futures if not future.done()]
+
+        for future in done:
+            name = futures[future]
+            del self.pending[name]
+            try:
+                records = future.result()
+            except Exception as e:
+                self.stats[name]['errors'] += 1
+                log.error("❌ Fuente %s: %s", name, e)
+                continue
+            self.stats[name]['ok'] += 1
+            self.stats[name]['records'] += len(records)
+            self._merge(records)
+        for future in not_done:
+            name = futures[future]
+            self.stats[name]['timeouts'] += 1
+            log.info("⏳ Fuente %s sigue ocupada: se usan sus datos anteriores", name)
+
+        return self._snapshot(time.time() if now is None else now)
+
+    def _merge(self, records):
+        for record in records:
+            fields = self.fields.setdefault(self.canonical.match_key(record), {})
+            observed_at = record['observed_at']
+            for field, value in record.items():
+                # Un campo vacío de una fuente no borra lo que otra sí vio
+                if value in ('', None):
+                    continue
+                previous = fields.get(field)
+                if previous is None or observed_at >= previous[0]:
+                    fields[field] = (observed_at, value)
+
+    def _snapshot(self, now):
+        """Partidos fusionados; se olvidan los que ninguna fuente ha visto en stale_after segundos."""
+        matches = []
+        for key in list(self.fields):
+            fields = self.fields[key]
+            if now - fields['observed_at'][0] > self.stale_after:
+                del self.fields[key]
+                continue
+            match = new_match_info('')
+            match.update((field, value) for field, (_, value) in fields.items())
+            matches.append(match)
+        return matches
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for source in self.sources:
+            try:
+                source.close()
+            except Exception as e:
+                log.warning("⚠️ Error al cerrar la fuente %s: %s", source.name, e)
+
+
+def run_sources(scraper, merger, interval=60, min_interval=5, max_polls=None, export_json=True,
+                send_telegram=True, scheduler=None):
+    """
+    Bucle de consultas sobre varias fuentes: fusiona sus partidos y pasa el resultado por la
+    cadena de filtro, anti-duplicados y envío del scraper.
+
+    Args:
+        scraper (NowGoalScraper): Scraper usado para el filtro, la exportación y el envío.
+        merger (SourceMerger): Fuentes a consultar.
+        interval (float): Segundos entre consultas (intervalo base si hay planificador).
+        min_interval (float): Segundos mínimos entre consultas.
+        max_polls (int): Número de consultas antes de salir (None = hasta Ctrl+C).
+        scheduler (AdaptivePollScheduler): Decide el siguiente intervalo. None = intervalo fijo.
+    """
+    scraper.profiler.start("sources")
+    started_at = time.time()
+    scraper.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    scraper.run_stats = {}
+    pipeline = scraper.start_pipeline(export_json, send_telegram)
+    scraper.warm_start(scheduler)
+    polls = 0
+    try:
+        log.info("🚀 Consultando %s fuentes: %s", len(merger.sources), ', '.join(s.name for s in merger.sources))
+        if not merger.open():
+            log.error("❌ Ninguna fuente disponible")
+            return
+        while max_polls is None or polls < max_polls:
+            poll_started = time.time()
+            polling = scraper.reload_config(scheduler)
+            if polling:
+                interval = polling['base_interval']
+                min_interval = polling['min_interval']
+            polls += 1
+            scraper.run_stats['polls'] = polls
+            with scraper.profiler.stage("extract"):
+                matches = merger.fetch()
+            log.info("🔀 %s partidos fusionados", len(matches))
+            if matches:
+                pipeline.submit([dict(match) for match in matches])
+
+            if max_polls is not None and polls >= max_polls:
+                break
+            wait_seconds = scheduler.next_interval(matches) if scheduler else interval
+            scraper.save_checkpoint(scheduler)
+            remaining = max(wait_seconds, min_interval) - (time.time() - poll_started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    except KeyboardInterrupt:
+        log.info("\n👋 Consulta de fuentes detenida")
+    finally:
+        merger.close()
+        if pipeline.pending():
+            log.info("⏳ Terminando %s lotes pendientes...", pipeline.pending())
+        pipeline.close()
+        scraper.run_stats['pipeline'] = pipeline.stats()
+        scraper.run_stats['sources'] = merger.stats
+        scraper.cleanup()
+        scraper.save_checkpoint(scheduler, force=True)
+        scraper.stream_run_summary(started_at)
+        scraper.close_exports()
+        scraper.profiler.finish()
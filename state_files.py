@@ -0,0 +1,168 @@
+"""
+Escritura segura de los archivos de estado JSON (sent_matches.json, live_messages.json,
+match_ids.json, exportación JSON) y del checkpoint binario (checkpoint.py).
+- Escritura atómica: archivo temporal en la misma carpeta + fsync + os.replace.
+  Un proceso matado a mitad de escritura deja el archivo anterior intacto.
+- Bloqueo consultivo (<archivo>.lock) con timeout, para que dos ejecuciones
+  solapadas (cron + ejecución manual) no se pisen.
+- Lectura-modificación-escritura bajo el bloqueo (update_json): cada proceso
+  combina sus cambios con lo que haya en disco en ese momento.
+"""
+
+import os
+import json
+import time
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from structured_log import get_logger
+
+log = get_logger("state")
+
+DEFAULT_LOCK_TIMEOUT = float(os.getenv('STATE_LOCK_TIMEOUT', '30'))
+
+
+class LockTimeout(TimeoutError):
+    """No se pudo obtener el bloqueo de un archivo de estado a tiempo."""
+
+
+class FileLock:
+    """Bloqueo consultivo exclusivo sobre <path>.lock (fcntl/msvcrt)."""
+
+    def __init__(self, path, timeout=None, poll_interval=0.05):
+        """
+        Args:
+            path (str): Archivo a proteger (el bloqueo se toma sobre path + '.lock').
+            timeout (float): Segundos máximos de espera. Por defecto STATE_LOCK_TIMEOUT o 30.
+            poll_interval (float): Pausa entre intentos.
+        """
+        self.lock_path = path + '.lock'
+        self.timeout = DEFAULT_LOCK_TIMEOUT if timeout is None else timeout
+        self.poll_interval = poll_interval
+        self.fd = None
+
+    def _try_lock(self):
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(self.fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        directory = os.path.dirname(self.lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                os.close(self.fd)
+                self.fd = None
+                raise LockTimeout(f"Timeout de {self.timeout:g}s esperando el bloqueo {self.lock_path}")
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def read_json(path, default_factory=dict):
+    """Lee un JSON; si no existe o está dañado devuelve default_factory()."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default_factory()
+    except ValueError as e:
+        log.warning("⚠️ %s dañado, se ignora su contenido: %s", path, e)
+        return default_factory()
+
+
+def atomic_write_json(path, data, indent=2):
+    """Escribe JSON de forma atómica: temporal + fsync + rename."""
+    atomic_write_bytes(path, json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8'))
+
+
+def atomic_write_bytes(path, data):
+    """Escribe un archivo binario de forma atómica: temporal + fsync + rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crea el archivo con 0600; conservar los permisos del archivo original
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    # Persistir también la entrada de directorio del rename (no disponible en Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def update_json(path, update, default_factory=dict, timeout=None, indent=2):
+    """
+    Lee, modifica y escribe un JSON bajo el bloqueo del archivo.
+
+    Args:
+        path (str): Archivo de estado.
+        update (callable): Recibe el contenido actual en disco y devuelve el nuevo
+                           (si devuelve None se guarda el objeto recibido, modificado en sitio).
+        default_factory (callable): Contenido inicial si el archivo no existe.
+        timeout (float): Espera máxima del bloqueo.
+
+    Returns:
+        El contenido guardado.
+    """
+    with FileLock(path, timeout):
+        current = read_json(path, default_factory)
+        result = update(current)
+        if result is None:
+            result = current
+        atomic_write_json(path, result, indent=indent)
+        return result
+
+
+def merge_timestamps(current, incoming):
+    """Une dos mapas clave -> timestamp quedándose con el más reciente de cada clave."""
+    merged = dict(current)
+    for key, timestamp in incoming.items():
+        if timestamp > merged.get(key, 0):
+            merged[key] = timestamp
+    return merged
@@ -0,0 +1,161 @@
+"""
+Registro (logging) no bloqueante y estructurado de la salida del scraper.
+- Cada etapa escribe en su propio logger (nowgoal.extract, nowgoal.dedup, nowgoal.telegram...),
+  con nivel configurable por etapa: LOG_LEVEL=INFO, LOG_LEVELS="extract=DEBUG,dedup=WARNING".
+- Los hilos del scraper solo encolan el registro (QueueHandler); un hilo de fondo
+  (QueueListener) le da formato y lo escribe en la consola y en el archivo.
+- Consola: el mensaje tal cual (o JSON con LOG_FORMAT=json). Archivo LOG_FILE
+  (por defecto scraper.log; vacío = sin archivo): un objeto JSON por línea.
+- Los mensajes usan argumentos con % (log.debug("Fila %s", key)): si el nivel está
+  desactivado no se construye nada, y si está activo el texto se arma en el hilo de fondo.
+  Por eso los argumentos deben ser valores que no cambien después (textos, números).
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER = "nowgoal"
+DEFAULT_LOG_FILE = "scraper.log"
+
+# Atributos propios de LogRecord: el resto (extra=...) se añade como campos del JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+def get_logger(stage):
+    """Logger de una etapa del scraper (nowgoal.<etapa>)."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{stage}")
+
+
+def parse_levels(spec):
+    """
+    Lee niveles por etapa con el formato "extract=DEBUG,dedup=WARNING".
+
+    Returns:
+        dict: etapa -> nivel (int). Las entradas no válidas se ignoran con un aviso.
+    """
+    levels = {}
+    for item in (spec or "").split(','):
+        if not item.strip():
+            continue
+        stage, _, name = item.partition('=')
+        level = logging.getLevelName(name.strip().upper())
+        if not stage.strip() or not isinstance(level, int):
+            print(f"⚠️ LOG_LEVELS: entrada no válida ignorada: {item.strip()!r}", file=sys.stderr)
+            continue
+        levels[stage.strip()] = level
+    return levels
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON compacto por registro: ts, level, stage, msg y los campos de extra=."""
+
+    def format(self, record):
+        data = {
+            'ts': round(record.created, 3),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'stage': record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + '.') else record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage().strip(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler que deja el formato (msg % args) al hilo de fondo."""
+
+    def prepare(self, record):
+        # QueueHandler.prepare formatea en el hilo que registra; aquí solo se copia el
+        # registro y se resuelve la traza de la excepción, que sí depende del momento.
+        record = logging.makeLogRecord(vars(record))
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level=None, stage_levels=None, log_file=None, console_format=None):
+    """
+    Dirige los loggers del scraper a la cola y arranca el hilo escritor. Llamarla de nuevo
+    solo actualiza los niveles.
+
+    Args:
+        level (str | int): Nivel general. Por defecto LOG_LEVEL, o DEBUG si DEBUG_MODE=true.
+        stage_levels (dict | str): Niveles por etapa (dict o "etapa=NIVEL,..."). Por defecto LOG_LEVELS.
+        log_file (str): Archivo JSON por líneas. Por defecto LOG_FILE o scraper.log; "" = sin archivo.
+        console_format (str): "text" (por defecto) o "json". Por defecto LOG_FORMAT.
+
+    Returns:
+        QueueListener: El escritor de fondo (se detiene al salir del programa).
+    """
+    global _listener
+    if level is None:
+        debug_mode = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
+        level = os.getenv('LOG_LEVEL', 'DEBUG' if debug_mode else 'INFO')
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+    if stage_levels is None:
+        stage_levels = os.getenv('LOG_LEVELS', '')
+    if isinstance(stage_levels, str):
+        stage_levels = parse_levels(stage_levels)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    for stage, stage_level in stage_levels.items():
+        get_logger(stage).setLevel(stage_level)
+    if _listener is not None:
+        return _listener
+
+    console = logging.StreamHandler(sys.stdout)
+    if (console_format or os.getenv('LOG_FORMAT', 'text')).lower() == 'json':
+        console.setFormatter(JsonFormatter())
+    else:
+        console.setFormatter(logging.Formatter("%(message)s"))
+    handlers = [console]
+
+    log_file = os.getenv('LOG_FILE', DEFAULT_LOG_FILE) if log_file is None else log_file
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.propagate = False
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Escribe lo pendiente y detiene el hilo escritor."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    root = logging.getLogger(ROOT_LOGGER)
+    for handler in list(root.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            root.removeHandler(handler)
+    root.propagate = True
@@ -8,23 +8,73 @@ Filtra y muestra solo los partidos que cumplen:
 Ahora incluye alertas a Telegram con sistema anti-duplicados.
 """
 
-import time
-import re
-import json
 import os
-import requests
-import hashlib
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+import sys
+import time
+import logging
+import threading
+
+import rendering
+from dispatcher import TELEGRAM_API_BASE, Destination, TelegramDispatcher, load_destinations
+from live_alerts import LiveAlertStore
+from canonical import CanonicalIndex, legacy_match_hash
+from checkpoint import CheckpointStore
+from momentum import MomentumTracker
+from cdp_driver import CDPError, CDPScraperBackend
+from profiling import RunProfiler
+from pipeline import DEFAULT_QUEUE_SIZE, StagePipeline
+from config import STRATEGIES
+from ndjson_sink import NDJSONSink
+from snapshot_cache import ROW_FINGERPRINTS_JS, SnapshotCache, row_key, table_fingerprint
+from state_files import FileLock, LockTimeout, merge_timestamps, read_json, update_json
+from match_parsing import new_match_info, clean_home_team, apply_status, apply_corners, apply_odds, is_valid_match
+from structured_log import get_logger
+
+log = get_logger("scraper")
+browser_log = get_logger("browser")
+extract_log = get_logger("extract")
+report_log = get_logger("report")
+export_log = get_logger("export")
+dedup_log = get_logger("dedup")
+send_log = get_logger("telegram")
+config_log = get_logger("config")
+
+
+class _SeleniumNotLoaded(Exception):
+    """Marcador para las excepciones de Selenium mientras Selenium no se ha importado."""
+
+
+# Selenium y webdriver_manager se importan solo al usar el backend Selenium (_load_selenium),
+# así el backend CDP, la reproducción de exportaciones y la CLI arrancan sin pagar su importación.
+webdriver = By = WebDriverWait = EC = Options = ChromeDriverManager = Service = None
+TimeoutException = NoSuchElementException = _SeleniumNotLoaded
+
+
+def _load_selenium():
+    """Importa Selenium y webdriver_manager en los nombres globales del módulo."""
+    global webdriver, By, WebDriverWait, EC, Options, ChromeDriverManager, Service
+    global TimeoutException, NoSuchElementException
+    if webdriver is not None:
+        return
+    from selenium import webdriver as _webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.webdriver.chrome.service import Service
+    webdriver = _webdriver
+
+
+# Segundos durante los que la exportación JSON de otra ejecución se combina con la propia
+EXPORT_MERGE_WINDOW = 15 * 60
+# Antigüedad máxima de una alerta reclamada y no enviada para reintentarla tras un reinicio
+OUTBOX_MAX_AGE = 30 * 60
+
 
 class NowGoalScraper:
-    def __init__(self, headless=False, min_minute=30, max_minute=60, min_corners=4):
+    def __init__(self, headless=False, min_minute=30, max_minute=60, min_corners=4, backend=None, profiler=None):
         """
         Inicializa el scraper
 
@@ -33,22 +83,139 @@ class NowGoalScraper:
             min_minute (int): Minuto mínimo para el filtro de partidos.
             max_minute (int): Minuto máximo para el filtro de partidos.
             min_corners (int): Número mínimo de córners que debe tener el equipo perdiendo.
+            backend (str): 'selenium' (por defecto) o 'cdp' (Chrome DevTools Protocol directo).
+                           Si no se indica, se usa la variable de entorno SCRAPER_BACKEND.
+            profiler (RunProfiler): Perfilador de etapas. Por defecto según SCRAPER_PROFILE.
         """
         self.driver = None
+        self.cdp = None
+        self.backend = (backend or os.getenv('SCRAPER_BACKEND', 'selenium')).lower()
         self.headless = headless
         self.min_minute = min_minute
         self.max_minute = max_minute
         self.min_corners = min_corners
         self.base_url = "https://www.nowgoal.com/"
         self.sent_matches_file = "sent_matches.json"
+        self.live_alerts = LiveAlertStore()
+        self.canonical = CanonicalIndex()
+        self.profiler = profiler or RunProfiler.from_env()
+        # URL base de la Bot API (p. ej. el servidor local fake_telegram.py para pruebas)
+        self.telegram_api_base = os.getenv('TELEGRAM_API_BASE', TELEGRAM_API_BASE)
+        # Formato de exportación: "json" (archivo único), "ndjson" (streaming) o "both"
+        self.export_format = os.getenv('EXPORT_FORMAT', 'both').lower()
+        self.ndjson_sink = None
+        # Huellas de filas y tabla para no reprocesar lo que no cambió entre consultas
+        self.snapshot = SnapshotCache()
+        self.league_counts = {}  # liga -> filas de partido en la última extracción
+        self.run_id = None
+        self.run_stats = {}
+        # Reglas recargables desde scraper_config.json (ver config.py)
+        self.max_goal_deficit = 1
+        # Ritmo reciente por partido (momentum.py); los umbrales a 0 / None no filtran
+        self.momentum = MomentumTracker()
+        self.min_recent_corners = 0
+        self.min_corner_trend = None
+        self.min_minutes_since_goal = 0
+        self.strategies = {name: True for name in STRATEGIES}
+        self.config_destinations = None  # None = TELEGRAM_DESTINATIONS / archivo / TELEGRAM_CHAT_ID
+        # Destinos de TELEGRAM_DESTINATIONS / archivo, creados una vez (conservan su limitador y estado)
+        self.env_destinations = None
+        self.dispatcher = None  # Despachador reutilizado entre consultas (una sesión HTTP)
+        self.config_watcher = None
+        # Checkpoint binario del estado en memoria para arrancar en caliente (checkpoint.py)
+        self.checkpoint = CheckpointStore.from_env()
+        self.outbox = {}            # match_hash -> (momento reclamado, partido) aún sin enviar
+        self.recovered_outbox = {}  # bandeja de salida de la ejecución anterior, por reintentar
+        # Protege el historial de ritmo y la bandeja de salida al leerlos para el checkpoint
+        self.state_lock = threading.Lock()
+        # Tablero en vivo servido por HTTP (live_board.py); None = desactivado
+        self.board = None
+
+    def apply_config(self, config, scheduler=None):
+        """
+        Aplica una configuración validada (config.py) sin tocar el navegador ni el estado acumulado.
+
+        Args:
+            config (dict): Configuración completa.
+            scheduler (AdaptivePollScheduler): Planificador a actualizar con los nuevos intervalos.
+        """
+        filters = config['filters']
+        self.min_minute = filters['min_minute']
+        self.max_minute = filters['max_minute']
+        self.min_corners = filters['min_corners']
+        self.max_goal_deficit = filters['max_goal_deficit']
+        self.min_recent_corners = filters['min_recent_corners']
+        self.min_corner_trend = filters['min_corner_trend']
+        self.min_minutes_since_goal = filters['min_minutes_since_goal']
+        self.strategies = dict(config['strategies'])
+        # telegram_destinations.json pudo cambiar: se vuelve a leer en el próximo envío
+        self.env_destinations = None
+        if config['destinations'] is None:
+            self.config_destinations = None
+        else:
+            # Conservar los destinos sin cambios (y su limitador de velocidad)
+            previous = {d.chat_id: (raw, d) for raw, d in getattr(self, '_config_destination_items', [])}
+            items = []
+            for raw in config['destinations']:
+                old = previous.get(str(raw['chat_id']))
+                items.append((raw, old[1] if old and old[0] == raw else Destination.from_dict(raw)))
+            self._config_destination_items = items
+            self.config_destinations = [destination for _, destination in items]
+        if scheduler is not None:
+            scheduler.configure(min_minute=self.min_minute, max_minute=self.max_minute)
+
+    def reload_config(self, scheduler=None):
+        """
+        Recarga scraper_config.json si cambió (modo continuo).
+        Los intervalos solo se tocan si cambió la sección polling: así no se pisan los
+        indicados en la línea de comandos al cambiar, por ejemplo, un umbral.
+
+        Returns:
+            dict | None: La nueva sección polling si cambió, o None.
+        """
+        if self.config_watcher is None:
+            return None
+        previous_polling = self.config_watcher.config['polling']
+        config = self.config_watcher.check()
+        if config is None:
+            return None
+        self.apply_config(config, scheduler)
+        self.run_stats['config_reloads'] = self.run_stats.get('config_reloads', 0) + 1
+        config_log.info("   Filtro: min. %s-%s, ≥%s córners, máx. %s gol(es) abajo",
+                        self.min_minute, self.max_minute, self.min_corners, self.max_goal_deficit)
+        if self.momentum_filters_enabled():
+            config_log.info("   Ritmo: ≥%s córners/10', tendencia ≥%s, ≥%s min. desde el último gol",
+                            self.min_recent_corners, self.min_corner_trend, self.min_minutes_since_goal)
+        polling = config['polling']
+        if polling == previous_polling:
+            return None
+        if scheduler is not None:
+            scheduler.configure(fast_interval=polling['fast_interval'], base_interval=polling['base_interval'],
+                                heartbeat_interval=polling['heartbeat_interval'])
+        return polling
 
     def setup_driver(self):
         """Configura y inicializa el driver de Chrome"""
+        if self.backend == 'cdp':
+            try:
+                self.cdp = CDPScraperBackend(headless=self.headless)
+                self.cdp.start()
+                browser_log.info("✅ Chrome (CDP) configurado correctamente")
+            except Exception as e:
+                browser_log.error("❌ Error al configurar Chrome por CDP: %s", e)
+                raise
+            return
+
+        _load_selenium()
         chrome_options = Options()
 
         if self.headless:
             chrome_options.add_argument("--headless")
 
+        # Ruta de Chrome personalizada (también la usa el backend CDP)
+        if os.getenv('CHROME_BIN'):
+            chrome_options.binary_location = os.getenv('CHROME_BIN')
+
         # Opciones adicionales para evitar detección y GitHub Actions
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -73,38 +240,55 @@ class NowGoalScraper:
                 self.driver = webdriver.Chrome(service=service, options=chrome_options)
                 
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            print("✅ Driver de Chrome configurado correctamente")
+            browser_log.info("✅ Driver de Chrome configurado correctamente")
         except Exception as e:
-            print(f"❌ Error al configurar el driver: {e}")
-            print("Asegúrate de tener ChromeDriver instalado y en el PATH")
+            browser_log.error("❌ Error al configurar el driver: %s", e)
+            browser_log.error("Asegúrate de tener ChromeDriver instalado y en el PATH")
             raise
 
     def navigate_to_site(self):
         """Navega a la página de NowGoal"""
         try:
-            print(f"🌐 Navegando a {self.base_url}")
+            browser_log.info("🌐 Navegando a %s", self.base_url)
+            if self.cdp:
+                self.cdp.navigate(self.base_url)
+                if not self.cdp.wait_for("!!document.body", timeout=15):
+                    raise CDPError("body no disponible")
+                browser_log.info("✅ Página cargada correctamente")
+                return
+
             self.driver.get(self.base_url)
 
             # Esperar a que la página cargue
             WebDriverWait(self.driver, 15).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
-            print("✅ Página cargada correctamente")
+            browser_log.info("✅ Página cargada correctamente")
 
             # Esperar un poco más para que se cargue completamente
             time.sleep(3)
 
         except TimeoutException:
-            print("❌ Timeout al cargar la página")
+            browser_log.error("❌ Timeout al cargar la página")
             raise
         except Exception as e:
-            print(f"❌ Error al navegar al sitio: {e}")
+            browser_log.error("❌ Error al navegar al sitio: %s", e)
             raise
 
     def click_hot_button(self):
         """Hace clic en el botón Hot/Live"""
         try:
-            print("🔍 Buscando el botón Hot/Live...")
+            browser_log.info("🔍 Buscando el botón Hot/Live...")
+
+            if self.cdp:
+                if not self.cdp.click_live():
+                    browser_log.error("❌ No se pudo encontrar el botón Hot/Live")
+                    raise Exception("Botón Hot/Live no encontrado")
+                browser_log.info("✅ Clic en Hot/Live realizado")
+                # Esperar a que la tabla se actualice tras el clic (evento de cambio, máx. 5s)
+                self.cdp.wait_for("!!document.getElementById('mintable')", timeout=15)
+                self.cdp.wait_for_table_change(timeout=5)
+                return
 
             # Esperar a que el elemento esté presente y sea clickeable
             wait = WebDriverWait(self.driver, 15)
@@ -121,20 +305,20 @@ class NowGoalScraper:
             hot_button = None
             for selector_type, selector_value in selectors:
                 try:
-                    print(f"   Intentando selector: {selector_type}")
+                    browser_log.debug("   Intentando selector: %s", selector_type)
                     hot_button = wait.until(
                         EC.element_to_be_clickable((selector_type, selector_value))
                     )
-                    print(f"   ✅ Elemento encontrado")
+                    browser_log.debug("   ✅ Elemento encontrado")
                     break
                 except TimeoutException:
                     continue
 
             if not hot_button:
-                print("❌ No se pudo encontrar el botón Hot/Live")
+                browser_log.error("❌ No se pudo encontrar el botón Hot/Live")
                 raise Exception("Botón Hot/Live no encontrado")
 
-            print("✅ Botón Hot/Live encontrado")
+            browser_log.info("✅ Botón Hot/Live encontrado")
 
             # Scroll hasta el elemento si es necesario
             self.driver.execute_script("arguments[0].scrollIntoView(true);", hot_button)
@@ -142,19 +326,38 @@ class NowGoalScraper:
 
             # Hacer clic usando JavaScript para evitar problemas
             self.driver.execute_script("arguments[0].click();", hot_button)
-            print("✅ Clic en Hot/Live realizado")
+            browser_log.info("✅ Clic en Hot/Live realizado")
 
             # Esperar a que se cargue el contenido después del clic
             time.sleep(5)
 
         except Exception as e:
-            print(f"❌ Error al hacer clic en Hot/Live: {e}")
+            browser_log.error("❌ Error al hacer clic en Hot/Live: %s", e)
             raise
 
-    def extract_match_data(self):
-        """Extrae los datos de partidos usando selectores CSS específicos"""
+    def extract_match_data(self, shard=None):
+        """
+        Extrae los datos de partidos usando selectores CSS específicos
+
+        Args:
+            shard (ShardAssignment): Si se indica, solo se parsean las filas de las ligas del shard
+                                     (modo coordinador/worker). Las filas de todas las ligas se
+                                     cuentan igualmente en self.league_counts.
+        """
+        self.league_counts = {}
+        league_filter = shard.includes if shard else None
         try:
-            print("📊 Extrayendo datos de partidos...")
+            extract_log.info("📊 Extrayendo datos de partidos...")
+
+            if self.cdp:
+                matches = self.cdp.extract_matches(cache=self.snapshot, league_filter=league_filter,
+                                                   league_counts=self.league_counts)
+                if matches is None:
+                    extract_log.error("❌ No se pudo encontrar la tabla 'mintable'")
+                    self.cdp.capture_snapshot("nowgoal_dom_snapshot.json")
+                    return []
+                extract_log.info("✅ Se encontraron %s partidos válidos", len(matches))
+                return matches
 
             # Esperar a que la tabla esté presente
             wait = WebDriverWait(self.driver, 15)
@@ -164,19 +367,50 @@ class NowGoalScraper:
                 table = wait.until(
                     EC.presence_of_element_located((By.ID, "mintable"))
                 )
-                print("✅ Tabla 'mintable' encontrada")
+                extract_log.info("✅ Tabla 'mintable' encontrada")
             except TimeoutException:
-                print("❌ No se pudo encontrar la tabla 'mintable'")
+                extract_log.error("❌ No se pudo encontrar la tabla 'mintable'")
                 return []
 
             matches = []
             current_league = "Liga no especificada"
 
+            # Huellas de todas las filas en una sola llamada, antes de parsear nada
+            fingerprints = self.driver.execute_script(ROW_FINGERPRINTS_JS)
+
             # Obtener todas las filas para poder iterar en orden y detectar ligas y partidos
             all_rows = table.find_elements(By.TAG_NAME, "tr")
+            if not fingerprints or len(fingerprints) != len(all_rows):
+                fingerprints = None  # La tabla cambió entre ambas llamadas: parsear todo
+                self.snapshot.check_table(None)
+            else:
+                self.snapshot.check_table(table_fingerprint([fp for fp, _, _ in fingerprints]))
+            parsed = {}
 
-            for row in all_rows:
+            for index, row in enumerate(all_rows):
                 try:
+                    if fingerprints:
+                        fp, kind, league = fingerprints[index]
+                        if kind == 'L':
+                            current_league = league or current_league
+                            continue
+                        if kind != 'M':
+                            continue
+                        self.league_counts[current_league] = self.league_counts.get(current_league, 0) + 1
+                        if league_filter and not league_filter(current_league):
+                            continue
+                        # Fila sin cambios: reutilizar el partido ya parseado
+                        key = row_key(current_league, fp)
+                        found, match_data = self.snapshot.lookup_row(key)
+                        if not found:
+                            match_data = self.parse_match_row_with_css(row, current_league)
+                            if match_data:
+                                match_data['row_key'] = key
+                        parsed[key] = match_data
+                        if match_data:
+                            matches.append(match_data)
+                        continue
+
                     # Verificar si es una fila de liga
                     if "Leaguestitle" in row.get_attribute("class"):
                         league_element = row.find_element(By.CSS_SELECTOR, ".LGname")
@@ -185,6 +419,9 @@ class NowGoalScraper:
 
                     # Verificar si es una fila de partido
                     if "tds" in row.get_attribute("class"):
+                        self.league_counts[current_league] = self.league_counts.get(current_league, 0) + 1
+                        if league_filter and not league_filter(current_league):
+                            continue
                         match_data = self.parse_match_row_with_css(row, current_league)
                         if match_data:
                             matches.append(match_data)
@@ -193,37 +430,19 @@ class NowGoalScraper:
                     # Se ignoran errores de filas individuales para no detener el scraping completo
                     continue
 
-            print(f"✅ Se encontraron {len(matches)} partidos válidos")
+            if fingerprints:
+                self.snapshot.store_rows(parsed)
+            extract_log.info("✅ Se encontraron %s partidos válidos", len(matches))
             return matches
 
         except Exception as e:
-            print(f"❌ Error al extraer datos de la tabla: {e}")
+            extract_log.error("❌ Error al extraer datos de la tabla: %s", e)
             return []
 
     def parse_match_row_with_css(self, row, current_league):
         """Parsea una fila de partido usando selectores CSS específicos"""
         try:
-            match_info = {
-                'league': current_league,
-                'time': '', # Este campo se mantiene pero se omite en la salida detallada
-                'home_team': '',
-                'away_team': '',
-                'score': '',
-                'status': '',
-                'minute_actual': '',
-                'half_time_score': '',
-                'corners': '', # Mantener para referencia general (ej. "5-3" como texto raw)
-                'corners_home': '0', # Córners del equipo local
-                'corners_away': '0', # Córners del equipo visitante
-                'yellow_home': '0',
-                'yellow_away': '0',
-                'red_home': '0',
-                'red_away': '0',
-                'odds_full_time_home_win': '',
-                'odds_full_time_draw': '',
-                'odds_full_time_away_win': '',
-                'link': ''
-            }
+            match_info = new_match_info(current_league)
 
             # Extraer tiempo (time) - se mantiene para datos internos, no se muestra en salida detallada
             try:
@@ -235,8 +454,7 @@ class NowGoalScraper:
             # Extraer equipo local (home_team)
             try:
                 home_team_a = row.find_element(By.XPATH, './/td[starts-with(@id, "ht_")]/a[starts-with(@id, "team1_")]')
-                full_text = home_team_a.text.strip()
-                match_info['home_team'] = re.sub(r'\s*\(N\)\s*$', '', full_text)
+                match_info['home_team'] = clean_home_team(home_team_a.text)
                 match_info['link'] = home_team_a.get_attribute('href') or ''
             except NoSuchElementException:
                 pass
@@ -258,15 +476,7 @@ class NowGoalScraper:
             # Extraer estado del partido (status) y el minuto numérico
             try:
                 status_element = row.find_element(By.CSS_SELECTOR, 'td.status')
-                status_text = status_element.text.strip()
-                match_info['status'] = status_text
-
-                # Extraer solo el número del minuto si existe, o '45' para HT
-                minute_match = re.match(r'^\d+', status_text)
-                if minute_match:
-                    match_info['minute_actual'] = minute_match.group(0)
-                elif status_text.strip().lower() in ['ht', 'pausa', 'half-time']:
-                    match_info['minute_actual'] = '45' # Medio tiempo se considera minuto 45
+                apply_status(match_info, status_element.text)
             except NoSuchElementException:
                 pass
 
@@ -280,26 +490,13 @@ class NowGoalScraper:
             # Extraer corners (divididos) - ¡Corrección aquí!
             try:
                 corners_element = row.find_element(By.CSS_SELECTOR, 'span[id^="cr_"]')
-                corners_text = corners_element.text.strip()
-                match_info['corners'] = corners_text # Guarda el texto original completo (e.g., "5-3" or "-")
-
-                if '-' in corners_text: # Si el formato es "X-Y" (sin o con espacios)
-                    parts = [p.strip() for p in corners_text.split('-')] # Divide por '-' y limpia espacios
-                    if len(parts) == 2:
-                        try:
-                            home_c = int(parts[0])
-                            away_c = int(parts[1])
-                            match_info['corners_home'] = str(home_c)
-                            match_info['corners_away'] = str(away_c)
-                        except ValueError:
-                            # Esto ocurre si "X" o "Y" no son números válidos (ej. "N/A-N/A"). Mantiene '0'.
-                            pass
-                # Si el texto no es 'X-Y' ni '-', o está vacío, los valores corners_home/away permanecen '0'
+                apply_corners(match_info, corners_element.text)
             except NoSuchElementException:
                 pass # El elemento de córners no se encontró. Los valores predeterminados '0' son correctos.
             except Exception as e:
                 # Captura cualquier otra excepción inesperada durante la extracción de córners.
-                print(f"DEBUG: Error general al extraer córners para {match_info.get('home_team')} vs {match_info.get('away_team')}: {e}")
+                extract_log.debug("Error general al extraer córners para %s vs %s: %s",
+                                  match_info.get('home_team'), match_info.get('away_team'), e)
                 pass
 
 
@@ -335,18 +532,14 @@ class NowGoalScraper:
             try:
                 odds_td = row.find_element(By.CSS_SELECTOR, 'td.oddstd')
                 odds_elements = odds_td.find_elements(By.CSS_SELECTOR, 'p.odds1')
-
-                if len(odds_elements) >= 3:
-                    match_info['odds_full_time_home_win'] = odds_elements[0].text.strip().replace(',', '.')
-                    match_info['odds_full_time_draw'] = odds_elements[1].text.strip().replace(',', '.')
-                    match_info['odds_full_time_away_win'] = odds_elements[2].text.strip().replace(',', '.')
+                apply_odds(match_info, [e.text for e in odds_elements[:3]])
 
             except NoSuchElementException:
                 pass
             except IndexError:
                 pass
 
-            if match_info['home_team'] or match_info['away_team'] or match_info['score']:
+            if is_valid_match(match_info):
                 return match_info
 
             return None
@@ -357,7 +550,8 @@ class NowGoalScraper:
 
     def is_losing_with_corner_advantage(self, match):
         """
-        Determina si un equipo va perdiendo por máximo 1 gol y tiene al menos 4 córners a favor,
+        Determina si un equipo va perdiendo por máximo max_goal_deficit goles (1 por defecto) y tiene
+        al menos min_corners córners a favor (solo para las estrategias activas),
         y si el partido está en el rango de minutos especificado.
 
         Args:
@@ -401,45 +595,98 @@ class NowGoalScraper:
         except ValueError:
             return False, "Córners inválidos o no numéricos"
 
-        # Nueva lógica del filtro: equipo perdiendo por máximo 1 gol con al menos 4 córners a favor
+        # Nueva lógica del filtro: equipo perdiendo por máximo max_goal_deficit goles con al menos min_corners córners a favor
         
-        # Caso 1: Equipo local perdiendo por máximo 1 gol
-        if home_goals < away_goals and (away_goals - home_goals) <= 1:
+        # Caso 1: Equipo local perdiendo por máximo max_goal_deficit goles
+        if home_goals < away_goals and (away_goals - home_goals) <= self.max_goal_deficit:
+            if not self.strategies.get('local_pierde_con_corners', True):
+                return False, "Estrategia local_pierde_con_corners desactivada"
             if home_corners >= self.min_corners:  # Al menos min_corners córners a favor
                 corner_diff = home_corners - away_corners
+                momentum_reason = self.check_momentum(match, 'home')
+                if momentum_reason:
+                    return False, f"Local pierde por {away_goals - home_goals} gol(s) con {home_corners} córners pero {momentum_reason}"
                 return True, f"Local pierde por {away_goals - home_goals} gol(s) ({home_goals}-{away_goals}) con {home_corners} córners (+{corner_diff} diferencia)"
             else:
                 return False, f"Local pierde por {away_goals - home_goals} gol(s) pero solo tiene {home_corners} córners (< {self.min_corners} requeridos)"
         
-        # Caso 2: Equipo visitante perdiendo por máximo 1 gol
-        elif away_goals < home_goals and (home_goals - away_goals) <= 1:
+        # Caso 2: Equipo visitante perdiendo por máximo max_goal_deficit goles
+        elif away_goals < home_goals and (home_goals - away_goals) <= self.max_goal_deficit:
+            if not self.strategies.get('visitante_pierde_con_corners', True):
+                return False, "Estrategia visitante_pierde_con_corners desactivada"
             if away_corners >= self.min_corners:  # Al menos min_corners córners a favor
                 corner_diff = away_corners - home_corners
+                momentum_reason = self.check_momentum(match, 'away')
+                if momentum_reason:
+                    return False, f"Visitante pierde por {home_goals - away_goals} gol(s) con {away_corners} córners pero {momentum_reason}"
                 return True, f"Visitante pierde por {home_goals - away_goals} gol(s) ({home_goals}-{away_goals}) con {away_corners} córners (+{corner_diff} diferencia)"
             else:
                 return False, f"Visitante pierde por {home_goals - away_goals} gol(s) pero solo tiene {away_corners} córners (< {self.min_corners} requeridos)"
         
-        return False, "No cumple criterio: no está perdiendo por máximo 1 gol o no tiene suficientes córners"
+        return False, f"No cumple criterio: no está perdiendo por máximo {self.max_goal_deficit} gol(es) o no tiene suficientes córners"
+
+    def momentum_filters_enabled(self):
+        """True si hay algún criterio de ritmo reciente activo."""
+        return bool(self.min_recent_corners or self.min_corner_trend is not None or self.min_minutes_since_goal)
 
+    def check_momentum(self, match, side):
+        """
+        Comprueba los criterios de ritmo reciente (momentum.py) para el equipo que va perdiendo.
+        Los indicadores los escribe MomentumTracker en el partido antes de filtrar; sin historial
+        suficiente (primera consulta del partido) un criterio activo no se cumple.
+
+        Args:
+            match (dict): Partido con los indicadores de ritmo.
+            side (str): 'home' o 'away'.
+
+        Returns:
+            str | None: Motivo por el que no se cumple, o None si se cumplen todos.
+        """
+        if self.min_recent_corners:
+            recent = match.get(f'corners_per_10_{side}')
+            if recent is None:
+                return "sin historial para el ritmo de córners"
+            if recent < self.min_recent_corners:
+                return f"ritmo de {recent} córners/10' (< {self.min_recent_corners} requeridos)"
+        if self.min_corner_trend is not None:
+            trend = match.get('corner_trend')
+            if trend is None:
+                return "sin historial para la tendencia de córners"
+            if side == 'away':
+                trend = -trend
+            if trend < self.min_corner_trend:
+                return f"tendencia de córners {trend:+g}/10' (< {self.min_corner_trend:+g} requerida)"
+        if self.min_minutes_since_goal:
+            since_goal = match.get('minutes_since_goal')
+            if since_goal is None:
+                return "sin historial para el último gol"
+            if since_goal < self.min_minutes_since_goal:
+                return f"gol hace {since_goal} min. (< {self.min_minutes_since_goal} requeridos)"
+        return None
 
     def display_matches(self, matches_to_display):
         """
         Muestra los partidos filtrados en la consola.
+        El informe se registra como un único mensaje del logger "report".
         Args:
             matches_to_display (list): Lista de diccionarios de partidos ya filtrados.
         """
+        if not report_log.isEnabledFor(logging.INFO):
+            return
         if not matches_to_display:
-            print("\n" + "="*100)
-            print(f"❌ No se encontraron partidos que cumplan el criterio de perdedor por máximo 1 gol con ≥{self.min_corners} córners "
-                  f"(min. {self.min_minute}-{self.max_minute}).")
-            print("="*100)
+            report_log.info("\n%s\n❌ No se encontraron partidos que cumplan el criterio de perdedor por máximo "
+                            "%s gol(es) con ≥%s córners (min. %s-%s).\n%s", "=" * 100, self.max_goal_deficit,
+                            self.min_corners, self.min_minute, self.max_minute, "=" * 100)
             return
 
-        print("\n" + "="*100)
-        print(f"⚽ ALERTA: PARTIDOS EN VIVO - NOWGOAL.COM")
-        print(f"   Criterio: Equipo Perdiendo por máximo 1 gol con ≥{self.min_corners} córners a favor")
-        print(f"   Rango de Minutos: {self.min_minute}-{self.max_minute}")
-        print("="*100)
+        lines = [
+            "",
+            "=" * 100,
+            "⚽ ALERTA: PARTIDOS EN VIVO - NOWGOAL.COM",
+            f"   Criterio: Equipo Perdiendo por máximo {self.max_goal_deficit} gol(es) con ≥{self.min_corners} córners a favor",
+            f"   Rango de Minutos: {self.min_minute}-{self.max_minute}",
+            "=" * 100,
+        ]
 
         current_league = ""
         displayed_count = 0
@@ -447,8 +694,8 @@ class NowGoalScraper:
         for i, match in enumerate(matches_to_display, 1):
             if match['league'] != current_league:
                 current_league = match['league']
-                print(f"\n🏆 LIGA: {current_league}")
-                print("=" * 80)
+                lines.append(f"\n🏆 LIGA: {current_league}")
+                lines.append("=" * 80)
 
             displayed_count += 1
 
@@ -461,223 +708,183 @@ class NowGoalScraper:
             
             filter_reason = match.get('filter_reason', 'N/A')
 
-            print(f"\n📍 PARTIDO {displayed_count}:")
-            print(f"   🏠 Equipo Local:     {match.get('home_team', 'N/A')}")
-            print(f"   ✈️  Equipo Visitante:  {match.get('away_team', 'N/A')}")
-            print(f"   ⚽ Marcador:         {home_score} - {away_score}")
-            print(f"   📊 Minuto:           {match.get('minute_actual', 'N/A')}")
-            print(f"   📐 Córners (L-V):    {match.get('corners_home', '0')} - {match.get('corners_away', '0')}")
-            print(f"   ✅ Motivo Filtro:    {filter_reason}")
-            print(f"   🟨 Tarjetas Amarillas: L:{match.get('yellow_home', '0')} V:{match.get('yellow_away', '0')}")
-            print(f"   🟥 Tarjetas Rojas:    L:{match.get('red_home', '0')} V:{match.get('red_away', '0')}")
-            print(f"   💰 Cuotas (1X2):     H:{match.get('odds_full_time_home_win', 'N/A')} X:{match.get('odds_full_time_draw', 'N/A')} A:{match.get('odds_full_time_away_win', 'N/A')}")
-            print(f"   🔗 Link:             {match.get('link', 'N/A')}")
-            print("-" * 80)
-
-        print(f"\n📊 Total de partidos que cumplen el criterio (min. {self.min_minute}-{self.max_minute}): {displayed_count}")
-        print("="*100)
-
-    def export_to_json(self, matches_to_export, filename="nowgoal_matches_losing_with_corner_advantage.json"):
-        """Exporta solo los partidos que cumplen el criterio a un archivo JSON"""
+            lines += [
+                f"\n📍 PARTIDO {displayed_count}:",
+                f"   🏠 Equipo Local:     {match.get('home_team', 'N/A')}",
+                f"   ✈️  Equipo Visitante:  {match.get('away_team', 'N/A')}",
+                f"   ⚽ Marcador:         {home_score} - {away_score}",
+                f"   📊 Minuto:           {match.get('minute_actual', 'N/A')}",
+                f"   📐 Córners (L-V):    {match.get('corners_home', '0')} - {match.get('corners_away', '0')}",
+                f"   ✅ Motivo Filtro:    {filter_reason}",
+            ]
+            if match.get('corner_trend') is not None:
+                lines.append(f"   📈 Ritmo (10'):      L:{match['corners_per_10_home']} V:{match['corners_per_10_away']} "
+                             f"tendencia:{match['corner_trend']:+g} · último gol hace {match['minutes_since_goal'] if match['minutes_since_goal'] is not None else '?'} min.")
+            lines += [
+                f"   🟨 Tarjetas Amarillas: L:{match.get('yellow_home', '0')} V:{match.get('yellow_away', '0')}",
+                f"   🟥 Tarjetas Rojas:    L:{match.get('red_home', '0')} V:{match.get('red_away', '0')}",
+                f"   💰 Cuotas (1X2):     H:{match.get('odds_full_time_home_win', 'N/A')} X:{match.get('odds_full_time_draw', 'N/A')} A:{match.get('odds_full_time_away_win', 'N/A')}",
+                f"   🔗 Link:             {match.get('link', 'N/A')}",
+                "-" * 80,
+            ]
+
+        lines.append(f"\n📊 Total de partidos que cumplen el criterio (min. {self.min_minute}-{self.max_minute}): {displayed_count}")
+        lines.append("=" * 100)
+        report_log.info("\n".join(lines), extra={'matches': displayed_count})
+
+    def export_to_json(self, matches_to_export, filename="nowgoal_matches_losing_with_corner_advantage.json",
+                       merge_window=EXPORT_MERGE_WINDOW):
+        """
+        Exporta solo los partidos que cumplen el criterio a un archivo JSON.
+        Si otra ejecución escribió el archivo hace menos de merge_window segundos,
+        se conservan sus partidos que no estén en esta exportación.
+        """
         try:
             if not matches_to_export:
-                print("❌ No hay datos de partidos para exportar con el criterio actual.")
+                export_log.error("❌ No hay datos de partidos para exportar con el criterio actual.")
                 return False
 
-            export_data = {
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "filter_minute_range": f"{self.min_minute}-{self.max_minute}",
-                "total_matches_filtered_by_criteria": len(matches_to_export),
-                "matches": matches_to_export
-            }
+            run_id = self.run_id or str(os.getpid())
+
+            def merge(current):
+                matches = list(matches_to_export)
+                recent = time.time() - current.get("written_at", 0) < merge_window
+                if recent and current.get("run_id") != run_id:
+                    exported = {m.get('match_hash') for m in matches}
+                    matches += [m for m in current.get("matches", []) if m.get('match_hash') not in exported]
+                return {
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "written_at": time.time(),
+                    "run_id": run_id,
+                    "filter_minute_range": f"{self.min_minute}-{self.max_minute}",
+                    "total_matches_filtered_by_criteria": len(matches),
+                    "matches": matches
+                }
 
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            update_json(filename, merge)
 
-            print(f"✅ Datos filtrados exportados a: {filename}")
+            export_log.info("✅ Datos filtrados exportados a: %s", filename)
             return True
         except Exception as e:
-            print(f"❌ Error al exportar datos: {e}")
+            export_log.error("❌ Error al exportar datos: %s", e)
             return False
 
+    def stream_matches(self, matches_to_export):
+        """
+        Añade una línea NDJSON por partido filtrado al sink de streaming.
+        La escritura real ocurre en un hilo de fondo.
+        """
+        if self.ndjson_sink is None:
+            self.ndjson_sink = NDJSONSink.from_env()
+        timestamp = time.time()
+        for match in matches_to_export:
+            self.ndjson_sink.write(dict(match, type="match", run_id=self.run_id, ts=timestamp))
+
+    def stream_run_summary(self, started_at):
+        """Añade la línea NDJSON de resumen de la ejecución y vacía el sink."""
+        if self.ndjson_sink is None:
+            return
+        self.ndjson_sink.write({
+            "type": "run",
+            "run_id": self.run_id,
+            "ts": time.time(),
+            "duration_seconds": round(time.time() - started_at, 3),
+            "filter_minute_range": f"{self.min_minute}-{self.max_minute}",
+            "min_corners": self.min_corners,
+            **self.run_stats,
+            "cache": self.snapshot.rates(),
+        })
+        self.ndjson_sink.flush()
+
     def _escape_telegram_markdown_v2(self, text):
         """
         Escapa caracteres especiales para Telegram MarkdownV2.
         https://core.telegram.org/bots/api#markdownv2-style
         """
-        if text is None:
-            return "N/A"
-        text = str(text)
-        
-        # Caracteres que DEBEN ser escapados en MarkdownV2
-        reserved_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-        
-        # Escapar cada carácter reservado
-        for char in reserved_chars:
-            text = text.replace(char, '\\' + char)
-        
-        return text
+        return rendering.escape_markdown_v2(text)
 
-    def send_telegram_alert(self, matches_to_alert, bot_token, chat_id):
+    def send_telegram_alert(self, matches_to_alert, bot_token, chat_id=None, destinations=None, api_base=None):
         """
         Envía una alerta de Telegram con los partidos filtrados, un mensaje por partido.
+        Si se indican varios destinos, los mensajes se envían a todos en paralelo.
+        api_base permite apuntar a otra URL de la Bot API (por defecto self.telegram_api_base).
         """
         if not matches_to_alert:
-            print("📣 No hay partidos filtrados para enviar a Telegram.")
-            return
-
-        print("Enviando alertas de Telegram...")
-
-        # Primero enviamos un mensaje de encabezado
-        header_message = (
-            "🎯 *NOWGOAL ALERTA DE PARTIDOS EN VIVO*\n\n"
-            "📋 *Criterios:*\n"
-            "• Equipo perdiendo por máximo 1 gol\n"
-            f"• Con al menos {self.min_corners} córners a favor\n"
-            "• Diferencia de córners como activador\n"
-            f"• Minuto: {self._escape_telegram_markdown_v2(f'{self.min_minute}-{self.max_minute}')}\n\n"
-            f"⏰ Reporte: {self._escape_telegram_markdown_v2(time.strftime('%Y-%m-%d %H:%M:%S'))}"
-        )
-
-        telegram_api_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        
-        # Enviar mensaje de encabezado
-        try:
-            response = requests.post(
-                telegram_api_url,
-                params={
-                    "chat_id": chat_id,
-                    "text": header_message,
-                    "parse_mode": "MarkdownV2",
-                    "disable_web_page_preview": True
-                }
-            )
-            response.raise_for_status()
-            print("✅ Mensaje de encabezado enviado con éxito.")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error al enviar mensaje de encabezado: {e}")
-            return
-
-        # Enviar un mensaje por cada partido
-        current_league = ""
-        for match in matches_to_alert:
-            # Si es una nueva liga, enviar el nombre de la liga como mensaje separado
-            if match['league'] != current_league:
-                current_league = match['league']
-                league_message = f"🏆 *{self._escape_telegram_markdown_v2(current_league.upper())}*"
-                try:
-                    response = requests.post(
-                        telegram_api_url,
-                        params={
-                            "chat_id": chat_id,
-                            "text": league_message,
-                            "parse_mode": "MarkdownV2",
-                            "disable_web_page_preview": True
-                        }
-                    )
-                    response.raise_for_status()
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ Error al enviar nombre de liga: {e}")
-                    continue
-
-            # Preparar el mensaje del partido
-            home_score, away_score = '?', '?'
-            if match.get('score') and match['score'] != '-' and ' - ' in match['score']:
-                try:
-                    home_score, away_score = match['score'].split(' - ')
-                except ValueError:
-                    pass
-
-            home_team = self._escape_telegram_markdown_v2(match.get('home_team'))
-            away_team = self._escape_telegram_markdown_v2(match.get('away_team'))
-            filter_reason = self._escape_telegram_markdown_v2(match.get('filter_reason', 'N/A'))
-
-            match_message = f"""
-⚽ *{home_team} vs {away_team}*
+            send_log.info("📣 No hay partidos filtrados para enviar a Telegram.")
+            return []
 
-📊 *Estado del Partido:*
-• Marcador: {self._escape_telegram_markdown_v2(f'{home_score}-{away_score}')}
-• Minuto: {self._escape_telegram_markdown_v2(match.get('minute_actual'))}
-• Córners: {self._escape_telegram_markdown_v2(match.get('corners_home', '0'))} \\- {self._escape_telegram_markdown_v2(match.get('corners_away', '0'))}
+        if destinations is None:
+            destinations = [Destination(chat_id)]
 
-🎯 *Análisis:*
-• {filter_reason}
+        send_log.info("Enviando alertas de Telegram a %s destino(s)...", len(destinations))
 
-📈 *Cuotas:*
-• Local: {self._escape_telegram_markdown_v2(match.get('odds_full_time_home_win', 'N/A'))}
-• Empate: {self._escape_telegram_markdown_v2(match.get('odds_full_time_draw', 'N/A'))}
-• Visitante: {self._escape_telegram_markdown_v2(match.get('odds_full_time_away_win', 'N/A'))}
+        dispatcher = self.get_dispatcher(bot_token, destinations, api_base)
+        results = dispatcher.dispatch(
+            matches_to_alert,
+            min_minute=self.min_minute,
+            max_minute=self.max_minute,
+            min_corners=self.min_corners
+        )
+        self.live_alerts.save()
 
-🟨 *Tarjetas Amarillas:* L:{self._escape_telegram_markdown_v2(match.get('yellow_home', '0'))} V:{self._escape_telegram_markdown_v2(match.get('yellow_away', '0'))}
-🟥 *Tarjetas Rojas:* L:{self._escape_telegram_markdown_v2(match.get('red_home', '0'))} V:{self._escape_telegram_markdown_v2(match.get('red_away', '0'))}"""
+        send_log.info("✅ Proceso de envío de alertas completado.")
+        return results
 
-            if match.get('link') and match['link'] != 'N/A':
-                match_message += f"\n\n🔗 [Ver Detalles]({self._escape_telegram_markdown_v2(match['link'])})"
+    def update_live_alerts(self, matches, bot_token, destinations, api_base=None):
+        """
+        Edita con editMessageText las alertas ya enviadas cuyos partidos cambiaron
+        de marcador o córners, en lugar de enviar mensajes nuevos.
+        Las ediciones se agrupan: como máximo una por partido y chat cada
+        TELEGRAM_EDIT_INTERVAL segundos.
+        """
+        dispatcher = self.get_dispatcher(bot_token, destinations, api_base)
+        results = dispatcher.update_live(matches)
+        self.live_alerts.save()
+        return results
 
-            # Enviar el mensaje del partido
-            try:
-                response = requests.post(
-                    telegram_api_url,
-                    params={
-                        "chat_id": chat_id,
-                        "text": match_message,
-                        "parse_mode": "MarkdownV2",
-                        "disable_web_page_preview": True
-                    }
-                )
-                response.raise_for_status()
-                print(f"✅ Alerta enviada para {home_team} vs {away_team}")
-                # Pequeña pausa entre mensajes para evitar límites de rate
-                time.sleep(0.5)
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Error al enviar alerta para {home_team} vs {away_team}: {e}")
-                if hasattr(response, 'json'):
-                    print(f"Error de la API de Telegram: {response.json()}")
-                continue
-
-        print("✅ Proceso de envío de alertas completado.")
+    def get_dispatcher(self, bot_token, destinations, api_base=None):
+        """
+        Devuelve el despachador de Telegram, reutilizando su sesión HTTP entre consultas.
+        Solo se crea uno nuevo si cambian el token o la URL de la API.
+        """
+        api_base = api_base or self.telegram_api_base
+        dispatcher = self.dispatcher
+        if dispatcher is None or dispatcher.bot_token != bot_token or dispatcher.api_base != api_base.rstrip('/'):
+            if dispatcher is not None:
+                dispatcher.close()
+            dispatcher = self.dispatcher = TelegramDispatcher(bot_token, destinations, api_base=api_base,
+                                                              live_store=self.live_alerts)
+        else:
+            dispatcher.set_destinations(destinations)
+        return dispatcher
 
     def generate_match_hash(self, match):
         """
         Genera un hash único para identificar un partido específico.
-        Incluye equipos, liga y fecha para mayor precisión.
+        Usa los nombres canónicos de equipos y liga (sin acentos, sufijos "(N)",
+        abreviaturas ni alias), así variaciones de escritura no generan duplicados.
         """
-        # Crear un identificador único más específico
-        home_team = match.get('home_team', '').strip()
-        away_team = match.get('away_team', '').strip()
-        league = match.get('league', '').strip()
-        
-        # Normalizar nombres de equipos para evitar variaciones
-        home_team = re.sub(r'[^\w\s]', '', home_team).lower().strip()
-        away_team = re.sub(r'[^\w\s]', '', away_team).lower().strip()
-        league = re.sub(r'[^\w\s]', '', league).lower().strip()
-        
-        # Crear hash con equipos y liga
-        match_key = f"{home_team}_{away_team}_{league}"
-        return hashlib.md5(match_key.encode()).hexdigest()
+        return self.canonical.match_hash(match)
 
     def load_sent_matches(self):
         """
         Carga el archivo de partidos ya enviados.
         """
         try:
-            if os.path.exists(self.sent_matches_file):
-                with open(self.sent_matches_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
+            return read_json(self.sent_matches_file)
         except Exception as e:
-            print(f"⚠️ Error al cargar archivo de partidos enviados: {e}")
+            dedup_log.warning("⚠️ Error al cargar archivo de partidos enviados: %s", e)
             return {}
 
     def save_sent_matches(self, sent_matches):
         """
         Guarda el archivo de partidos ya enviados.
+        Se combina con lo que haya en disco (otra ejecución pudo añadir registros).
         """
         try:
-            with open(self.sent_matches_file, 'w', encoding='utf-8') as f:
-                json.dump(sent_matches, f, indent=2, ensure_ascii=False)
+            update_json(self.sent_matches_file, lambda current: merge_timestamps(current, sent_matches))
         except Exception as e:
-            print(f"❌ Error al guardar archivo de partidos enviados: {e}")
+            dedup_log.error("❌ Error al guardar archivo de partidos enviados: %s", e)
 
     def clean_old_sent_matches(self, sent_matches, hours_to_keep=24):
         """
@@ -697,7 +904,7 @@ class NowGoalScraper:
                 removed_count += 1
                 
         if removed_count > 0:
-            print(f"🧹 Limpieza automática: {removed_count} registros antiguos eliminados")
+            dedup_log.info("🧹 Limpieza automática: %s registros antiguos eliminados", removed_count)
                 
         return cleaned_matches
 
@@ -706,14 +913,16 @@ class NowGoalScraper:
         Resetea completamente el archivo de partidos enviados.
         Útil para limpiar el historial cuando se cambia la lógica de detección de duplicados.
         """
+        self.snapshot.sent.clear()
         try:
-            if os.path.exists(self.sent_matches_file):
-                os.remove(self.sent_matches_file)
-                print("✅ Archivo de partidos enviados reseteado correctamente")
-            else:
-                print("ℹ️ No existe archivo de partidos enviados para resetear")
+            with FileLock(self.sent_matches_file):
+                if os.path.exists(self.sent_matches_file):
+                    os.remove(self.sent_matches_file)
+                    dedup_log.info("✅ Archivo de partidos enviados reseteado correctamente")
+                else:
+                    dedup_log.info("ℹ️ No existe archivo de partidos enviados para resetear")
         except Exception as e:
-            print(f"❌ Error al resetear archivo de partidos enviados: {e}")
+            dedup_log.error("❌ Error al resetear archivo de partidos enviados: %s", e)
 
     def show_sent_matches_status(self):
         """
@@ -724,11 +933,11 @@ class NowGoalScraper:
             current_time = time.time()
             
             if not sent_matches:
-                print("📋 Historial de partidos enviados: VACÍO")
+                dedup_log.debug("📋 Historial de partidos enviados: VACÍO")
                 return
             
-            print(f"📋 Historial de partidos enviados ({len(sent_matches)} registros):")
-            print("-" * 80)
+            dedup_log.debug("📋 Historial de partidos enviados (%s registros):", len(sent_matches))
+            dedup_log.debug("-" * 80)
             
             # Ordenar por tiempo (más recientes primero)
             sorted_matches = sorted(sent_matches.items(), key=lambda x: x[1], reverse=True)
@@ -742,151 +951,520 @@ class NowGoalScraper:
                 else:
                     time_str = f"{hours_diff:.1f}h"
                 
-                print(f"   {i:2d}. Hash: {match_hash[:8]}... (enviado hace {time_str})")
+                dedup_log.debug("   %2d. Hash: %s... (enviado hace %s)", i, match_hash[:8], time_str)
             
             if len(sorted_matches) > 10:
-                print(f"   ... y {len(sorted_matches) - 10} registros más antiguos")
+                dedup_log.debug("   ... y %s registros más antiguos", len(sorted_matches) - 10)
                 
         except Exception as e:
-            print(f"❌ Error al mostrar estado del historial: {e}")
+            dedup_log.error("❌ Error al mostrar estado del historial: %s", e)
 
     def filter_unsent_matches(self, matches):
         """
         Filtra solo los partidos que no han sido enviados recientemente.
         Sistema mejorado anti-duplicados.
+        La comprobación y el registro se hacen bajo el bloqueo de sent_matches.json:
+        dos ejecuciones simultáneas nunca reclaman el mismo partido.
         """
-        sent_matches = self.load_sent_matches()
-        sent_matches = self.clean_old_sent_matches(sent_matches)
-        
         unsent_matches = []
         current_time = time.time()
         duplicate_count = 0
         
-        print(f"🔍 Verificando {len(matches)} partidos contra historial de duplicados...")
-        
+        dedup_log.info("🔍 Verificando %s partidos contra historial de duplicados...", len(matches))
+
+        # Los partidos que ya sabemos enviados no necesitan leer el historial
+        pending = []
         for match in matches:
-            match_hash = self.generate_match_hash(match)
-            home_team = match.get('home_team', 'N/A')
-            away_team = match.get('away_team', 'N/A')
-            
-            # Verificar si ya fue enviado
-            if match_hash in sent_matches:
-                last_sent_time = sent_matches[match_hash]
-                time_diff = current_time - last_sent_time
-                hours_diff = time_diff / 3600
-                
-                print(f"   ⚠️ Duplicado detectado: {home_team} vs {away_team} (enviado hace {hours_diff:.1f}h)")
+            if self.snapshot.is_known_sent(match.get('match_hash'), current_time):
                 duplicate_count += 1
-                continue
-            
-            # Si no ha sido enviado, agregarlo a la lista
-            unsent_matches.append(match)
-            sent_matches[match_hash] = current_time
-            print(f"   ✅ Nuevo: {home_team} vs {away_team}")
-                
-        # Guardar los partidos actualizados
-        self.save_sent_matches(sent_matches)
+            else:
+                pending.append(match)
+        if not pending:
+            dedup_log.info("📊 Resumen: 0 nuevos, %s duplicados filtrados", duplicate_count)
+            return []
+
+        def claim(sent_matches):
+            nonlocal duplicate_count
+            sent_matches = self.clean_old_sent_matches(sent_matches)
+            for match in pending:
+                if self._claim_match(match, sent_matches, current_time):
+                    unsent_matches.append(match)
+                else:
+                    duplicate_count += 1
+            return sent_matches
+
+        try:
+            sent_matches = update_json(self.sent_matches_file, claim)
+        except LockTimeout as e:
+            # Sin el bloqueo no se puede garantizar el anti-duplicados: no se envía nada
+            dedup_log.error("❌ %s. No se enviarán alertas en esta ejecución.", e)
+            return []
+        self.snapshot.remember_sent(sent_matches)
         
-        print(f"📊 Resumen: {len(unsent_matches)} nuevos, {duplicate_count} duplicados filtrados")
+        dedup_log.info("📊 Resumen: %s nuevos, %s duplicados filtrados", len(unsent_matches), duplicate_count)
         
         return unsent_matches
 
-    def run_scraping(self, export_json=True, send_telegram=True):
-        """Ejecuta el proceso completo de scraping"""
-        try:
-            print("🚀 Iniciando web scraping de NowGoal...")
+    def _claim_match(self, match, sent_matches, current_time):
+        """Registra el partido en sent_matches si no estaba. Devuelve True si es nuevo."""
+        match_hash = match.get('match_hash') or self.generate_match_hash(match)
+        home_team = match.get('home_team', 'N/A')
+        away_team = match.get('away_team', 'N/A')
+
+        # Verificar si ya fue enviado (también con el hash anterior al índice canónico:
+        # el historial previo a la actualización sigue valiendo hasta que caduca)
+        sent_at = sent_matches.get(match_hash)
+        if sent_at is None:
+            sent_at = sent_matches.get(legacy_match_hash(match))
+            if sent_at is not None:
+                sent_matches[match_hash] = sent_at
+        if sent_at is not None:
+            hours_diff = (current_time - sent_at) / 3600
+            dedup_log.debug("   ⚠️ Duplicado detectado: %s vs %s (enviado hace %.1fh)",
+                            home_team, away_team, hours_diff, extra={'match_hash': match_hash})
+            return False
 
-            self.setup_driver()
-            self.navigate_to_site()
-            self.click_hot_button()
+        # Si no ha sido enviado, registrarlo
+        sent_matches[match_hash] = current_time
+        dedup_log.debug("   ✅ Nuevo: %s vs %s", home_team, away_team, extra={'match_hash': match_hash})
+        return True
 
-            all_matches = self.extract_match_data()
+    def take_recovered_outbox(self, filtered_matches, unsent_matches):
+        """
+        Alertas que la ejecución anterior reclamó en el anti-duplicados pero no llegó a enviar
+        (bandeja de salida del checkpoint). Se reintentan una vez, con los datos actuales, solo
+        si el partido sigue cumpliendo el criterio.
 
-            if all_matches:
-                filtered_matches = []
-                for match in all_matches:
-                    is_relevant, reason = self.is_losing_with_corner_advantage(match)
-                    if is_relevant:
-                        match['filter_reason'] = reason # Añadir el motivo para mostrarlo
-                        filtered_matches.append(match)
+        Returns:
+            list: Partidos a añadir a los no enviados.
+        """
+        if not self.recovered_outbox:
+            return []
+        with self.state_lock:
+            recovered, self.recovered_outbox = self.recovered_outbox, {}
+        pending = {m['match_hash'] for m in unsent_matches}
+        matches = [m for m in filtered_matches if m['match_hash'] in recovered and m['match_hash'] not in pending]
+        if matches:
+            dedup_log.info("📮 Reintentando %s alertas pendientes de la ejecución anterior", len(matches))
+        return matches
+
+    def get_telegram_credentials(self):
+        """Devuelve (bot_token, destinos) desde variables de entorno / archivo de destinos."""
+        # Obtener credenciales de Telegram desde variables de entorno
+        telegram_bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+        telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
+        
+        # Para compatibilidad con ejecución local, usar valores por defecto si no están las variables de entorno
+        if not telegram_bot_token:
+            telegram_bot_token = "7915400009:AAEbX7983vUykGYYCXZkiAAWbH2ODP1dn7g"
+        if not telegram_chat_id:
+            telegram_chat_id = "-1002739074153"
+
+        # Destinos de scraper_config.json o, si no hay, TELEGRAM_DESTINATIONS / telegram_destinations.json
+        if self.config_destinations is not None:
+            return telegram_bot_token, self.config_destinations
+        # Se cargan una sola vez: el límite de velocidad, las pausas por 429 y los destinos
+        # deshabilitados deben sobrevivir entre consultas
+        if self.env_destinations is None:
+            self.env_destinations = load_destinations(default_chat_id=telegram_chat_id)
+        return telegram_bot_token, self.env_destinations
+
+    def process_matches(self, all_matches, export_json=True, send_telegram=True):
+        """
+        Filtra, muestra, exporta y envía los partidos ya extraídos.
 
-                self.display_matches(filtered_matches)
+        Returns:
+            list: Partidos que cumplen el criterio.
+        """
+        filtered_matches, delivery = self.prepare_alerts(all_matches, export_json=export_json,
+                                                         send_telegram=send_telegram)
+        if delivery:
+            self.deliver_alerts(delivery)
+        return filtered_matches
+
+    def prepare_alerts(self, all_matches, export_json=True, send_telegram=True):
+        """
+        Primera etapa: filtra, muestra, exporta y reclama en el anti-duplicados.
 
-                if export_json:
+        Returns:
+            tuple: (partidos que cumplen el criterio, envío pendiente para deliver_alerts o None)
+        """
+        with self.profiler.stage("filter"):
+            filtered_matches = []
+            filter_params = (self.min_minute, self.max_minute, self.min_corners, self.max_goal_deficit,
+                             self.min_recent_corners, self.min_corner_trend, self.min_minutes_since_goal,
+                             tuple(sorted(name for name, enabled in self.strategies.items() if enabled)))
+            for match in all_matches:
+                # Ritmo reciente: una muestra por consulta, antes del filtro que la usa
+                with self.state_lock:
+                    self.momentum.update(self.canonical.match_key(match), match)
+                # Fila sin cambios desde la consulta anterior: mismo veredicto y hash
+                verdict = self.snapshot.get_verdict(match.get('row_key'), filter_params)
+                if verdict is None:
+                    is_relevant, reason = self.is_losing_with_corner_advantage(match)
+                    # Hash para el anti-duplicados y para editar alertas ya enviadas
+                    verdict = (is_relevant, reason, self.generate_match_hash(match))
+                    self.snapshot.store_verdict(match.get('row_key'), filter_params, verdict)
+                is_relevant, reason, match['match_hash'] = verdict
+                match['match_id'] = self.canonical.match_id(match)
+                match['filter_reason'] = reason # Añadir el motivo para mostrarlo
+                if is_relevant:
+                    filtered_matches.append(match)
+
+        if self.board is not None:
+            with self.profiler.stage("board"):
+                self.board.update(all_matches, filtered_matches)
+
+        with self.profiler.stage("display"):
+            self.display_matches(filtered_matches)
+
+        self.run_stats['extracted'] = self.run_stats.get('extracted', 0) + len(all_matches)
+        self.run_stats['filtered'] = self.run_stats.get('filtered', 0) + len(filtered_matches)
+
+        if export_json:
+            with self.profiler.stage("export"):
+                if self.export_format in ('json', 'both'):
                     self.export_to_json(filtered_matches)
+                if self.export_format in ('ndjson', 'both'):
+                    self.stream_matches(filtered_matches)
 
-                if send_telegram:
-                    # Obtener credenciales de Telegram desde variables de entorno
-                    telegram_bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-                    telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
-                    
-                    # Para compatibilidad con ejecución local, usar valores por defecto si no están las variables de entorno
-                    if not telegram_bot_token:
-                        telegram_bot_token = "7915400009:AAEbX7983vUykGYYCXZkiAAWbH2ODP1dn7g"
-                    if not telegram_chat_id:
-                        telegram_chat_id = "-1002739074153"
-
-                    if telegram_bot_token and telegram_chat_id:
-                        # Mostrar estado del historial antes de procesar
+        delivery = None
+        if send_telegram:
+            telegram_bot_token, destinations = self.get_telegram_credentials()
+
+            if telegram_bot_token and destinations:
+                with self.profiler.stage("dedup"):
+                    # Estado del historial antes de procesar (lee sent_matches.json: solo en modo debug)
+                    if dedup_log.isEnabledFor(logging.DEBUG):
                         self.show_sent_matches_status()
-                        
-                        # Filtrar solo partidos que no han sido enviados
-                        unsent_matches = self.filter_unsent_matches(filtered_matches)
-                        
-                        if unsent_matches:
-                            print(f"📤 Enviando {len(unsent_matches)} partidos nuevos a Telegram...")
-                            self.send_telegram_alert(unsent_matches, telegram_bot_token, telegram_chat_id)
-                        else:
-                            print("✅ No hay partidos nuevos para enviar a Telegram.")
-                    else:
-                        print("⚠️ Las credenciales de Telegram no están configuradas. No se enviarán alertas.")
+                    
+                    # Filtrar solo partidos que no han sido enviados
+                    unsent_matches = self.filter_unsent_matches(filtered_matches)
+                    unsent_matches += self.take_recovered_outbox(filtered_matches, unsent_matches)
+
+                with self.state_lock:
+                    claimed_at = time.time()
+                    for match in unsent_matches:
+                        self.outbox[match['match_hash']] = (claimed_at, match)
+
+                self.run_stats['new_alerts'] = self.run_stats.get('new_alerts', 0) + len(unsent_matches)
+                unsent_hashes = {m['match_hash'] for m in unsent_matches}
+                delivery = {
+                    'bot_token': telegram_bot_token,
+                    'destinations': destinations,
+                    'unsent': unsent_matches,
+                    # Solo los que siguen cumpliendo el criterio: la edición muestra su motivo actual
+                    'already_sent': [m for m in filtered_matches if m['match_hash'] not in unsent_hashes],
+                }
+            else:
+                send_log.warning("⚠️ Las credenciales de Telegram no están configuradas. No se enviarán alertas.")
+
+        self.canonical.save()
+        return filtered_matches, delivery
+
+    def deliver_alerts(self, delivery):
+        """Segunda etapa: envía las alertas nuevas y edita las ya enviadas cuyo estado cambió."""
+        unsent_matches = delivery['unsent']
+        if unsent_matches:
+            send_log.info("📤 Enviando %s partidos nuevos a Telegram...", len(unsent_matches))
+            with self.profiler.stage("telegram_send"):
+                self.send_telegram_alert(unsent_matches, delivery['bot_token'], destinations=delivery['destinations'])
+            with self.state_lock:
+                for match in unsent_matches:
+                    self.outbox.pop(match['match_hash'], None)
+        else:
+            send_log.info("✅ No hay partidos nuevos para enviar a Telegram.")
+
+        # Actualizar en el sitio las alertas ya enviadas cuyo estado cambió
+        with self.profiler.stage("telegram_edit"):
+            self.update_live_alerts(delivery['already_sent'], delivery['bot_token'], delivery['destinations'])
+
+    def checkpoint_state(self, scheduler=None):
+        """Estado en memoria a guardar en el checkpoint (ver checkpoint.py)."""
+        with self.state_lock:
+            momentum = self.momentum.get_state()
+            outbox = [[claimed_at, match] for claimed_at, match in self.outbox.values()]
+            outbox += [[claimed_at, match] for claimed_at, match in self.recovered_outbox.values()]
+        with self.snapshot.lock:
+            dedup = dict(self.snapshot.sent)
+        return {
+            'meta': {'saved_at': time.time(), 'run_id': self.run_id, 'pid': os.getpid()},
+            'dedup': dedup,
+            'momentum': momentum,
+            'outbox': outbox,
+            'scheduler': scheduler.get_state() if scheduler is not None else None,
+        }
+
+    def save_checkpoint(self, scheduler=None, force=False):
+        """Guarda el checkpoint si toca (cada CHECKPOINT_INTERVAL segundos) o si force=True."""
+        if not self.checkpoint.enabled or not (force or self.checkpoint.due()):
+            return
+        self.checkpoint.save(self.checkpoint_state(scheduler))
+        self.run_stats['checkpoint'] = dict(self.checkpoint.stats)
+
+    def warm_start(self, scheduler=None):
+        """
+        Recupera el estado del checkpoint de la ejecución anterior, si lo hay.
+
+        Args:
+            scheduler (AdaptivePollScheduler): Planificador a restaurar (modo continuo).
 
+        Returns:
+            bool: True si se recuperó un checkpoint.
+        """
+        state = self.checkpoint.load()
+        if not state:
+            return False
+        now = time.time()
+        # sent_matches.json manda: solo se recuerdan los envíos que siguen en el historial, así
+        # `history reset` / `history clean` o reset_history.py no se deshacen al arrancar
+        history = self.load_sent_matches()
+        dedup = {h: history[h] for h, t in state.get('dedup', {}).items()
+                 if h in history and now - history[h] < self.snapshot.dedup_seconds}
+        self.snapshot.remember_sent(dedup)
+        with self.state_lock:
+            self.momentum.restore(state.get('momentum', {}), now)
+            self.recovered_outbox = {match['match_hash']: (claimed_at, match)
+                                     for claimed_at, match in state.get('outbox', [])
+                                     if now - claimed_at < OUTBOX_MAX_AGE}
+        if scheduler is not None and state.get('scheduler'):
+            scheduler.restore(state['scheduler'], now)
+        saved_at = state.get('meta', {}).get('saved_at', now)
+        self.checkpoint.last_saved = now
+        self.run_stats['checkpoint'] = dict(self.checkpoint.stats)
+        log.info("♻️ Estado recuperado de %s (guardado hace %.0fs, %.1f ms): %s envíos, %s partidos con historial, "
+                 "%s alertas pendientes", self.checkpoint.path, now - saved_at, self.checkpoint.stats['load_ms'],
+                 len(dedup), len(self.momentum), len(self.recovered_outbox))
+        return True
+
+    def start_pipeline(self, export_json=True, send_telegram=True, queue_size=None):
+        """
+        Crea la cadena filtro -> envío en hilos (ver pipeline.py).
+        El tamaño de las colas se toma de PIPELINE_QUEUE_SIZE si no se indica.
+        """
+        if queue_size is None:
+            queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+
+        def prepare(all_matches):
+            return self.prepare_alerts(all_matches, export_json=export_json, send_telegram=send_telegram)[1]
+
+        return StagePipeline([("filtro", prepare), ("envio", self.deliver_alerts)], queue_size=queue_size)
+
+    def run_scraping(self, export_json=True, send_telegram=True):
+        """Ejecuta el proceso completo de scraping"""
+        self.profiler.start("run")
+        started_at = time.time()
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.run_stats = {}
+        pipeline = None
+        self.warm_start()
+        try:
+            log.info("🚀 Iniciando web scraping de NowGoal...")
+
+            with self.profiler.stage("setup_driver"):
+                self.setup_driver()
+            with self.profiler.stage("navigate"):
+                self.navigate_to_site()
+                self.click_hot_button()
+
+            with self.profiler.stage("extract"):
+                all_matches = self.extract_match_data()
+
+            if all_matches:
+                filtered_matches, delivery = self.prepare_alerts(all_matches, export_json=export_json,
+                                                                 send_telegram=send_telegram)
+                if delivery:
+                    # El envío corre en su hilo mientras se cierra el navegador
+                    pipeline = StagePipeline([("envio", self.deliver_alerts)])
+                    pipeline.submit(delivery)
                 return filtered_matches
             else:
-                print("❌ No se pudieron extraer datos de partidos")
+                log.error("❌ No se pudieron extraer datos de partidos")
                 return []
 
         except Exception as e:
-            print(f"❌ Error durante el scraping: {e}")
+            log.error("❌ Error durante el scraping: %s", e)
             return []
         finally:
+            self.close_browser()
+            if pipeline is not None:
+                pipeline.close()
             self.cleanup()
+            self.save_checkpoint(force=True)
+            self.stream_run_summary(started_at)
+            self.close_exports()
+            self.profiler.finish()
 
-    def cleanup(self):
-        """Cierra el navegador y limpia recursos"""
+    def replay_matches(self, all_matches, export_json=True, send_telegram=False):
+        """
+        Procesa partidos grabados (exportación JSON/NDJSON) sin abrir el navegador.
+
+        Returns:
+            list: Partidos que cumplen el criterio.
+        """
+        self.profiler.start("replay")
+        started_at = time.time()
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.run_stats = {}
+        try:
+            return self.process_matches(all_matches, export_json=export_json, send_telegram=send_telegram)
+        finally:
+            self.cleanup()
+            self.stream_run_summary(started_at)
+            self.close_exports()
+            self.profiler.finish()
+
+    def run_daemon(self, interval=60, min_interval=5, max_polls=None, export_json=True, send_telegram=True,
+                   scheduler=None, pipelined=True):
+        """
+        Mantiene el navegador abierto y consulta la tabla en bucle.
+
+        Args:
+            interval (int): Segundos entre consultas (intervalo base si hay planificador).
+            min_interval (int): Segundos mínimos entre consultas (aunque la tabla cambie antes).
+            max_polls (int): Número de consultas antes de salir (None = hasta Ctrl+C).
+            scheduler (AdaptivePollScheduler): Decide el siguiente intervalo según los partidos
+                                               extraídos. None = intervalo fijo.
+            pipelined (bool): Filtrar y enviar en hilos aparte mientras continúan las consultas.
+        """
+        self.profiler.start("daemon")
+        started_at = time.time()
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.run_stats = {}
+        polls = 0
+        pipeline = self.start_pipeline(export_json, send_telegram) if pipelined else None
+        self.warm_start(scheduler)
+        try:
+            if scheduler:
+                log.info("🚀 Iniciando modo continuo (intervalo adaptativo %g-%gs)...",
+                         scheduler.fast_interval, scheduler.heartbeat_interval)
+            else:
+                log.info("🚀 Iniciando modo continuo (cada %ss)...", interval)
+            with self.profiler.stage("setup_driver"):
+                self.setup_driver()
+            with self.profiler.stage("navigate"):
+                self.navigate_to_site()
+                self.click_hot_button()
+
+            while max_polls is None or polls < max_polls:
+                poll_started = time.time()
+                polling = self.reload_config(scheduler)
+                if polling:
+                    interval = polling['base_interval']
+                    min_interval = polling['min_interval']
+                polls += 1
+                self.run_stats['polls'] = polls
+                all_matches = None
+                try:
+                    with self.profiler.stage("extract"):
+                        all_matches = self.extract_match_data()
+                    if all_matches and self.snapshot.unchanged:
+                        # Misma tabla que en la consulta anterior: nada nuevo que filtrar ni enviar
+                        self.run_stats['skipped_unchanged'] = self.run_stats.get('skipped_unchanged', 0) + 1
+                        log.info("💤 Tabla sin cambios desde la consulta anterior")
+                    elif all_matches and pipeline is not None:
+                        # Copias: las etapas añaden campos mientras el planificador lee los originales
+                        pipeline.submit([dict(match) for match in all_matches])
+                    elif all_matches:
+                        self.process_matches(all_matches, export_json=export_json, send_telegram=send_telegram)
+                except Exception as e:
+                    log.error("❌ Error en la consulta %s: %s", polls, e)
+                    # Recargar la página por si el navegador quedó en mal estado
+                    self.snapshot.reset()
+                    try:
+                        self.navigate_to_site()
+                        self.click_hot_button()
+                    except Exception as e:
+                        log.error("❌ No se pudo recargar la página: %s", e)
+
+                if max_polls is not None and polls >= max_polls:
+                    break
+
+                wait_seconds = interval
+                if scheduler and all_matches is not None:
+                    wait_seconds = scheduler.next_interval(all_matches)
+                    decision = scheduler.last_decision
+                    by_reason = self.run_stats.setdefault('polls_by_reason', {})
+                    by_reason[decision['reason']] = by_reason.get(decision['reason'], 0) + 1
+                    next_entry = decision.get('next_entry_in')
+                    log.info("⏱️ Próxima consulta en %.0fs (%s en ventana, %s a punto de entrar%s)",
+                             wait_seconds, decision['in_window'], decision['approaching'],
+                             f", próxima entrada prevista en {next_entry:.0f}s" if next_entry is not None else "",
+                             extra={'reason': decision['reason']})
+                self.save_checkpoint(scheduler)
+                if scheduler and all_matches is not None and scheduler.last_decision['reason'] != 'ventana':
+                    # Nada cerca de la ventana: los cambios de la tabla no justifican despertar antes
+                    time.sleep(wait_seconds)
+                else:
+                    self.wait_for_table_change(wait_seconds)
+                remaining = min_interval - (time.time() - poll_started)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+        except KeyboardInterrupt:
+            log.info("\n👋 Modo continuo detenido")
+        except Exception as e:
+            log.error("❌ Error durante el scraping: %s", e)
+        finally:
+            self.close_browser()
+            if pipeline is not None:
+                # Las alertas ya reclamadas en el anti-duplicados deben enviarse antes de salir
+                if pipeline.pending():
+                    log.info("⏳ Terminando %s lotes pendientes...", pipeline.pending())
+                pipeline.close()
+                self.run_stats['pipeline'] = pipeline.stats()
+            self.cleanup()
+            self.save_checkpoint(scheduler, force=True)
+            self.stream_run_summary(started_at)
+            self.close_exports()
+            self.profiler.finish()
+
+    def close_exports(self):
+        """Cierra el sink NDJSON (escribe lo pendiente y cierra el segmento activo)."""
+        if self.ndjson_sink is not None:
+            self.ndjson_sink.close()
+            self.ndjson_sink = None
+
+    def wait_for_table_change(self, timeout):
+        """
+        Espera a que cambie la tabla de partidos, como máximo `timeout` segundos.
+        Con el backend CDP se usan eventos del DOM; con Selenium simplemente se espera.
+
+        Returns:
+            bool: True si (posiblemente) hubo cambios.
+        """
+        if self.cdp:
+            return self.cdp.wait_for_table_change(timeout)
+        time.sleep(timeout)
+        return True
+
+    def close_browser(self):
+        """Cierra el navegador (los envíos pendientes pueden seguir en curso)"""
+        if self.cdp:
+            self.cdp.close()
+            self.cdp = None
+            browser_log.info("🧹 Navegador cerrado")
         if self.driver:
             self.driver.quit()
-            print("🧹 Navegador cerrado")
-
-def main():
-    """Función principal"""
-    # Configura los filtros aquí
-    MIN_MINUTE_FILTER = 30
-    MAX_MINUTE_FILTER = 60
-    MIN_CORNERS_FILTER = 4  # Número mínimo de córners que debe tener el equipo perdiendo
-
-    print("=" * 50)
-    print("   WEB SCRAPER NOWGOAL.COM")
-    print(f"   (Equipo perdiendo por máximo 1 gol con ≥{MIN_CORNERS_FILTER} córners, Min. {MIN_MINUTE_FILTER}-{MAX_MINUTE_FILTER})")
-    print("=" * 50)
-
-    # Detectar si estamos en GitHub Actions para usar modo headless
-    is_github_actions = os.getenv('GITHUB_ACTIONS', 'false').lower() == 'true'
-    
-    scraper = NowGoalScraper(
-        headless=is_github_actions,  # Headless en GitHub Actions, con ventana en local
-        min_minute=MIN_MINUTE_FILTER,
-        max_minute=MAX_MINUTE_FILTER,
-        min_corners=MIN_CORNERS_FILTER
-    )
-
-    # Opción para resetear el historial de partidos enviados
-    # Descomenta la siguiente línea si quieres limpiar el historial
-    # scraper.reset_sent_matches()
-
-    scraper.run_scraping(export_json=True, send_telegram=True)
-
-    print("\n🎉 Proceso completado!")
+            self.driver = None
+            browser_log.info("🧹 Navegador cerrado")
+
+    def cleanup(self):
+        """Cierra el navegador y limpia recursos (incluida la sesión HTTP de Telegram)"""
+        self.close_browser()
+        self.canonical.save(force=True)
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+            self.dispatcher = None
+
+def main(argv=None):
+    """
+    Punto de entrada heredado (`python telegram.py`): delega en la CLI unificada de main.py,
+    así los filtros, la configuración recargable y el banner son los mismos que en `main.py run`.
+    """
+    import main as cli
+
+    return cli.main(argv)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())